@@ -0,0 +1,166 @@
+"""
+Disk-backed append-only archive for conversation history
+"""
+from typing import List, Dict, Optional, Tuple, Iterator
+import json
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+from models import ChatMessage
+
+# Block layout: magic, conversation id length, payload length, payload crc32,
+# followed by the conversation id and the zlib-compressed JSON payload
+BLOCK_MAGIC = b"CSA1"
+BLOCK_HEADER = struct.Struct(">4sHII")
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".log"
+
+class ConversationArchive:
+    """Append-only segment store for archived conversation messages"""
+
+    def __init__(
+        self,
+        directory: str,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        compression_level: int = 6
+    ):
+        """Initialize the archive and rebuild its offset index from disk"""
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.compression_level = compression_level
+
+        # conversation_id -> (segment number, block offset, block length)
+        self._index: Dict[str, Tuple[int, int, int]] = {}
+        self._lock = threading.Lock()
+        self._segment_number = 0
+        self._segment_size = 0
+
+        if os.path.isdir(self.directory):
+            self._rebuild_index()
+
+    def append(self, conversation_id: str, messages: List[ChatMessage]) -> None:
+        """Append a conversation's messages as one compressed block"""
+
+        payload = json.dumps(
+            [msg.dict() for msg in messages],
+            default=lambda value: value.isoformat(),
+            separators=(",", ":")
+        ).encode("utf-8")
+        compressed = zlib.compress(payload, self.compression_level)
+        key = conversation_id.encode("utf-8")
+
+        block = BLOCK_HEADER.pack(
+            BLOCK_MAGIC, len(key), len(compressed), zlib.crc32(compressed)
+        ) + key + compressed
+
+        with self._lock:
+            os.makedirs(self.directory, exist_ok=True)
+            if self._segment_size and self._segment_size + len(block) > self.max_segment_bytes:
+                self._segment_number += 1
+                self._segment_size = 0
+
+            offset = self._segment_size
+            with open(self._segment_path(self._segment_number), "ab") as segment:
+                segment.write(block)
+
+            self._segment_size += len(block)
+            self._index[conversation_id] = (self._segment_number, offset, len(block))
+
+    def get(self, conversation_id: str) -> Optional[List[ChatMessage]]:
+        """Read an archived conversation back through a memory-mapped segment"""
+
+        location = self._index.get(conversation_id)
+        if location is None:
+            return None
+
+        segment_number, offset, length = location
+        with open(self._segment_path(segment_number), "rb") as segment:
+            with mmap.mmap(segment.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                block = mapped[offset:offset + length]
+
+        _, key_length, payload_length, checksum = BLOCK_HEADER.unpack_from(block)
+        payload_start = BLOCK_HEADER.size + key_length
+        compressed = block[payload_start:payload_start + payload_length]
+        if zlib.crc32(compressed) != checksum:
+            raise ValueError(f"Archive block for {conversation_id} is corrupted")
+
+        records = json.loads(zlib.decompress(compressed))
+        return [ChatMessage(**record) for record in records]
+
+    def __getitem__(self, conversation_id: str) -> List[ChatMessage]:
+        messages = self.get(conversation_id)
+        if messages is None:
+            raise KeyError(conversation_id)
+        return messages
+
+    def __contains__(self, conversation_id: object) -> bool:
+        return conversation_id in self._index
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(list(self._index))
+
+    def disk_usage(self) -> int:
+        """Get the total size of all archive segments in bytes"""
+        return sum(
+            os.path.getsize(self._segment_path(number))
+            for number in self._segment_numbers()
+        )
+
+    def _segment_path(self, segment_number: int) -> str:
+        return os.path.join(
+            self.directory, f"{SEGMENT_PREFIX}{segment_number:06d}{SEGMENT_SUFFIX}"
+        )
+
+    def _segment_numbers(self) -> List[int]:
+        if not os.path.isdir(self.directory):
+            return []
+
+        numbers = []
+        for name in os.listdir(self.directory):
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX):
+                try:
+                    numbers.append(int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)]))
+                except ValueError:
+                    continue
+        return sorted(numbers)
+
+    def _rebuild_index(self) -> None:
+        """Scan block headers of every segment, skipping over the payloads"""
+
+        for segment_number in self._segment_numbers():
+            path = self._segment_path(segment_number)
+            size = os.path.getsize(path)
+            offset = 0
+
+            with open(path, "rb") as segment:
+                while True:
+                    header = segment.read(BLOCK_HEADER.size)
+                    if len(header) < BLOCK_HEADER.size:
+                        break
+
+                    magic, key_length, payload_length, _ = BLOCK_HEADER.unpack(header)
+                    key = segment.read(key_length)
+                    if magic != BLOCK_MAGIC or len(key) < key_length:
+                        break
+
+                    length = BLOCK_HEADER.size + key_length + payload_length
+                    if offset + length > size:
+                        break
+
+                    segment.seek(payload_length, os.SEEK_CUR)
+                    self._index[key.decode("utf-8")] = (segment_number, offset, length)
+                    offset += length
+
+            # A torn write at the tail is dropped; later appends start after it
+            if offset < size:
+                with open(path, "r+b") as segment:
+                    segment.truncate(offset)
+
+            self._segment_number = segment_number
+            self._segment_size = offset
@@ -0,0 +1,55 @@
+"""
+Bulk-load user profiles from NDJSON straight into the profile database
+"""
+import argparse
+import json
+import sys
+
+from profile_ingest import ProfileIngestor
+from profile_repository import ProfileRepository
+from config import Config
+
+def main():
+    """Ingest an NDJSON file (or stdin) from the command line"""
+    parser = argparse.ArgumentParser(description="Bulk-load CeloSoul user profiles from NDJSON")
+    parser.add_argument("input", help="NDJSON file, one CreateUserRequest per line; - for stdin")
+    parser.add_argument("--db", default=Config.PROFILE_DB_PATH, help="Profile database to write to")
+    parser.add_argument("--chunk-size", type=int, default=Config.BULK_INGEST_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=Config.BULK_INGEST_WORKERS,
+                        help="Processes validating chunks in parallel (0 validates in this process)")
+    parser.add_argument("--max-errors", type=int, default=Config.BULK_INGEST_MAX_ERRORS)
+    parser.add_argument("--errors-out", help="Write the per-line errors to this JSON file")
+    args = parser.parse_args()
+
+    repository = ProfileRepository(args.db, cache_size=0)
+    ingestor = ProfileIngestor(
+        repository,
+        chunk_size=args.chunk_size,
+        workers=args.workers,
+        max_errors=args.max_errors
+    )
+
+    try:
+        if args.input == "-":
+            report = ingestor.ingest_file(sys.stdin.buffer)
+        else:
+            with open(args.input, "rb") as f:
+                report = ingestor.ingest_file(f)
+    finally:
+        repository.close()
+
+    result = report.to_dict()
+    print(f"✅ Ingested {result['created']} of {result['received']} profiles "
+          f"in {result['seconds']}s ({result['profiles_per_second']}/s)")
+    if result["failed"]:
+        print(f"⚠️ {result['failed']} lines failed")
+        for error in result["errors"][:10]:
+            print(f"   line {error['line']}: {error['error']}")
+    if args.errors_out:
+        with open(args.errors_out, "w", encoding="utf-8") as f:
+            json.dump(result["errors"], f, indent=2)
+
+    sys.exit(1 if result["failed"] and not result["created"] else 0)
+
+if __name__ == "__main__":
+    main()
@@ -31,9 +31,85 @@ class Config:
         "lifestyle": 0.1
     }
     
+    # User profile storage
+    PROFILE_DB_PATH = os.getenv("PROFILE_DB_PATH", "user_data/profiles.db")
+    PROFILE_CACHE_SIZE = int(os.getenv("PROFILE_CACHE_SIZE", "10000"))
+    
     # Conversation Configuration
     MAX_CONVERSATION_HISTORY = 20
     CONTEXT_WINDOW = 10
+    CONTEXT_WINDOW_CACHE_SIZE = int(os.getenv("CONTEXT_WINDOW_CACHE_SIZE", "10000"))
+    
+    # Flirting templates (hot-reloaded when the file changes; negative interval disables)
+    FLIRTING_TEMPLATES_PATH = os.getenv(
+        "FLIRTING_TEMPLATES_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "flirting_templates.json")
+    )
+    TEMPLATE_RELOAD_INTERVAL = float(os.getenv("TEMPLATE_RELOAD_INTERVAL", "2.0"))
+    # Seed for per-conversation template selection; unset means non-deterministic
+    FLIRTING_SEED = os.getenv("FLIRTING_SEED")
+    
+    # Hybrid replies: send the template reply, then refine it with the LLM in the background
+    HYBRID_REFINEMENT = os.getenv("HYBRID_REFINEMENT", "false").lower() == "true"
+    REFINEMENT_CONCURRENCY = int(os.getenv("REFINEMENT_CONCURRENCY", "4"))
+    REFINEMENT_TIMEOUT = float(os.getenv("REFINEMENT_TIMEOUT", "30"))
+    REFINEMENT_CACHE_SIZE = int(os.getenv("REFINEMENT_CACHE_SIZE", "10000"))
+    
+    # Idempotency-Key on /chat and starters: how long a key's response is kept, and how many keys
+    IDEMPOTENCY_TTL = float(os.getenv("IDEMPOTENCY_TTL", "3600"))
+    IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", "100000"))
+    
+    # Local tone classifier; below the confidence threshold the LLM is asked instead
+    TONE_MODEL_PATH = os.getenv(
+        "TONE_MODEL_PATH",
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "tone_model.json")
+    )
+    TONE_CONFIDENCE_THRESHOLD = float(os.getenv("TONE_CONFIDENCE_THRESHOLD", "0.75"))
+    CONVERSATION_SHARDS = int(os.getenv("CONVERSATION_SHARDS", "16"))
+    ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "conversations/archive")
+    ARCHIVE_SEGMENT_BYTES = int(os.getenv("ARCHIVE_SEGMENT_BYTES", str(64 * 1024 * 1024)))
+    
+    # Durable conversation state (disabled unless a WAL directory is set)
+    CONVERSATION_WAL_DIR = os.getenv("CONVERSATION_WAL_DIR")
+    WAL_COMMIT_INTERVAL = float(os.getenv("WAL_COMMIT_INTERVAL", "0.005"))
+    WAL_SNAPSHOT_EVERY = int(os.getenv("WAL_SNAPSHOT_EVERY", "10000"))
+    WAL_MAX_COMMIT_WAIT = float(os.getenv("WAL_MAX_COMMIT_WAIT", "0"))
+    
+    # Shared conversation state for multi-worker deployments (unset: in-process only)
+    CONVERSATION_DB_PATH = os.getenv("CONVERSATION_DB_PATH")
+    TURN_LEASE_SECONDS = float(os.getenv("TURN_LEASE_SECONDS", "30"))  # a crashed worker's /chat turn frees after this
+    SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+    
+    # Multi-worker serving (see prefork.py)
+    WORKERS = int(os.getenv("WORKERS", "1"))
+    HOST = os.getenv("HOST", "0.0.0.0")
+    PORT = int(os.getenv("PORT", "8000"))
+    WARM_PROFILE_COUNT = int(os.getenv("WARM_PROFILE_COUNT", "1000"))
+    # blocking: warm before serving; background: serve while warming; lazy: build on first use
+    STARTUP_WARM_UP = os.getenv("STARTUP_WARM_UP", "background")
+    
+    # Bulk NDJSON user ingestion (POST /users/bulk, bulk_ingest.py)
+    BULK_INGEST_CHUNK_SIZE = int(os.getenv("BULK_INGEST_CHUNK_SIZE", "1000"))
+    BULK_INGEST_WORKERS = int(os.getenv("BULK_INGEST_WORKERS", "0"))
+    BULK_INGEST_MAX_ERRORS = int(os.getenv("BULK_INGEST_MAX_ERRORS", "1000"))
+    
+    # Tracing: share of requests traced, span cap per trace, optional export file
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.01"))
+    TRACE_MAX_SPANS = int(os.getenv("TRACE_MAX_SPANS", "2000"))
+    TRACE_BUFFER_SIZE = int(os.getenv("TRACE_BUFFER_SIZE", "100"))
+    TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH")  # unset keeps traces in memory only
+    TRACE_EXPORT_FORMAT = os.getenv("TRACE_EXPORT_FORMAT", "otlp")  # otlp or json
+    
+    # Admin-only diagnostics; unset disables them entirely
+    ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+    PROFILE_OUTPUT_DIR = os.getenv("PROFILE_OUTPUT_DIR", "profiles")
+    PROFILE_DEFAULT_OUTPUT = os.getenv("PROFILE_DEFAULT_OUTPUT", "attachment")  # attachment or file
+    PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.002"))
+    
+    # Traffic capture for replay (traffic_replay.py); unset disables recording
+    TRAFFIC_RECORD_PATH = os.getenv("TRAFFIC_RECORD_PATH")  # e.g. traffic/{pid}.ndjson.gz
+    TRAFFIC_RECORD_SAMPLE_RATE = float(os.getenv("TRAFFIC_RECORD_SAMPLE_RATE", "1.0"))
+    TRAFFIC_RECORD_MAX_BODY_BYTES = int(os.getenv("TRAFFIC_RECORD_MAX_BODY_BYTES", str(1024 * 1024)))
     
     @classmethod
     def get_agent_system_prompt(cls) -> str:
@@ -0,0 +1,129 @@
+"""
+Lazily built, single-instance application components with a startup timing report
+"""
+from typing import List, Dict, Any, Optional, Callable, Iterable, Iterator
+from contextlib import contextmanager
+import importlib
+import sys
+import threading
+import time
+
+class Container:
+    """Builds each registered component on first access, exactly once, and times every import and init step"""
+
+    def __init__(self):
+        """Initialize an empty container"""
+        self._factories: Dict[str, Callable[["Container"], Any]] = {}
+        self._locks: Dict[str, threading.Lock] = {}
+        self._warm: List[str] = []
+        self._steps: List[Dict[str, Any]] = []
+        self._steps_lock = threading.Lock()
+        self._local = threading.local()
+        self._created = time.perf_counter()
+
+    def register(self, name: str, factory: Callable[["Container"], Any], warm: bool = True) -> None:
+        """Register a factory; it receives the container so it can ask for its dependencies"""
+        if name in self._factories:
+            raise ValueError(f"Component {name} is already registered")
+        self._factories[name] = factory
+        self._locks[name] = threading.Lock()
+        if warm:
+            self._warm.append(name)
+
+    def provide(self, name: str, instance: Any) -> None:
+        """Use an existing instance instead of building one (tests, benchmarks, stub clients)"""
+        if name not in self._factories:
+            raise KeyError(f"Unknown component {name}")
+        with self._locks[name]:
+            if name in self.__dict__:
+                raise RuntimeError(f"Component {name} was already built")
+            setattr(self, name, instance)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached until the component exists; after that it is a plain instance attribute
+        factories = self.__dict__.get("_factories")
+        if factories is None or name not in factories:
+            raise AttributeError(name)
+        return self.get(name)
+
+    def get(self, name: str) -> Any:
+        if name in self.__dict__:
+            return self.__dict__[name]
+        if name not in self._factories:
+            raise KeyError(f"Unknown component {name}")
+        if any(step["kind"] == "init" and step["name"] == name for step in self._stack()):
+            raise RuntimeError(f"Circular dependency while building {name}")
+        with self._locks[name]:
+            # Another thread (e.g. the warm-up) may have built it while we waited
+            if name not in self.__dict__:
+                with self.timed("init", name):
+                    instance = self._factories[name](self)
+                setattr(self, name, instance)
+        return self.__dict__[name]
+
+    def built(self, name: str) -> bool:
+        """Whether the component exists yet (its value may legitimately be None)"""
+        return name in self.__dict__
+
+    def initialized(self, name: str) -> Optional[Any]:
+        """The component if it has been built, without building it"""
+        return self.__dict__.get(name) if name in self._factories else None
+
+    def import_module(self, module: str):
+        """Import a module for a factory, timing it the first time"""
+        if module in sys.modules:
+            return sys.modules[module]
+        with self.timed("import", module):
+            return importlib.import_module(module)
+
+    def warm(self, names: Optional[Iterable[str]] = None) -> float:
+        """Build the given components (default: all registered with warm=True); returns the seconds spent"""
+        started = time.perf_counter()
+        for name in names if names is not None else list(self._warm):
+            self.get(name)
+        return round(time.perf_counter() - started, 4)
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def timed(self, kind: str, name: str) -> Iterator[None]:
+        """Record a startup step; nested steps are subtracted so each reports its own time"""
+
+        stack = self._stack()
+        step = {"kind": kind, "name": name, "nested": 0.0}
+        stack.append(step)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            stack.pop()
+            if stack:
+                stack[-1]["nested"] += elapsed
+            with self._steps_lock:
+                self._steps.append({
+                    "kind": kind,
+                    "name": name,
+                    "seconds": round(elapsed - step["nested"], 4),
+                    "total_seconds": round(elapsed, 4),
+                    "started_at": round(started - self._created, 4),
+                    "thread": threading.current_thread().name
+                })
+
+    def startup_report(self) -> Dict[str, Any]:
+        """Every timed step in start order, with totals per kind and what is still unbuilt"""
+
+        with self._steps_lock:
+            steps = sorted(self._steps, key=lambda step: step["started_at"])
+        totals: Dict[str, float] = {}
+        for step in steps:
+            totals[step["kind"]] = round(totals.get(step["kind"], 0.0) + step["seconds"], 4)
+        return {
+            "steps": steps,
+            "seconds_by_kind": totals,
+            "built": [name for name in self._factories if name in self.__dict__],
+            "pending": [name for name in self._factories if name not in self.__dict__]
+        }
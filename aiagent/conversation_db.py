@@ -0,0 +1,255 @@
+"""
+SQLite conversation store shared by every worker process
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from datetime import datetime
+import json
+
+from models import ConversationContext, ChatMessage
+from message_store import CompactMessage, MessageKey, to_timestamp_us
+from sqlite_connections import SQLiteConnections
+
+SCHEMA_VERSION = 3
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    conversation_id TEXT PRIMARY KEY,
+    participants TEXT NOT NULL,
+    context_json TEXT NOT NULL,
+    conversation_tone TEXT NOT NULL,
+    last_activity_us INTEGER NOT NULL,
+    version INTEGER NOT NULL,
+    archived INTEGER NOT NULL DEFAULT 0
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_conversations_activity ON conversations (archived, last_activity_us);
+CREATE TABLE IF NOT EXISTS conversation_messages (
+    conversation_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    message_id TEXT NOT NULL,
+    sender_id TEXT NOT NULL,
+    receiver_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    timestamp_us INTEGER NOT NULL,
+    message_type TEXT NOT NULL,
+    is_ai_generated INTEGER NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_conversation_messages_cursor
+    ON conversation_messages (conversation_id, timestamp_us, message_id);
+CREATE TABLE IF NOT EXISTS conversation_turns (
+    conversation_id TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_us INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Claims the turn when nobody holds it or the holder's lease ran out
+_CLAIM_TURN = """
+INSERT INTO conversation_turns (conversation_id, owner, expires_us) VALUES (?, ?, ?)
+ON CONFLICT (conversation_id) DO UPDATE SET owner = excluded.owner, expires_us = excluded.expires_us
+WHERE conversation_turns.expires_us < ?
+"""
+
+_MESSAGE_COLUMNS = "message_id, sender_id, receiver_id, content, timestamp_us, message_type, is_ai_generated"
+
+_VERSION = "SELECT version FROM conversations WHERE conversation_id = ? AND archived = 0"
+_BUMP = """
+UPDATE conversations SET version = version + 1, last_activity_us = MAX(last_activity_us, ?)
+WHERE conversation_id = ? AND archived = 0
+"""
+_NEXT_SEQ = "SELECT COALESCE(MAX(seq), 0) + 1 FROM conversation_messages WHERE conversation_id = ?"
+_INSERT_MESSAGE = f"""
+INSERT INTO conversation_messages (conversation_id, seq, {_MESSAGE_COLUMNS})
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+class SharedConversationStore:
+    """Conversation metadata and full message history in one SQLite file"""
+
+    def __init__(self, db_path: str, busy_timeout: float = 5.0, mmap_size: int = 0):
+        """Open (or create) the database and its schema"""
+        self.db_path = db_path
+        self._connections = SQLiteConnections(db_path, busy_timeout, mmap_size)
+
+        connection = self._connections.get()
+        with connection:
+            connection.executescript(_SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def create(self, context: ConversationContext) -> int:
+        """Insert a new conversation; returns its version"""
+
+        data = context.dict(exclude={"messages"})
+        connection = self._connections.get()
+        with connection:
+            connection.execute(
+                "INSERT INTO conversations (conversation_id, participants, context_json, "
+                "conversation_tone, last_activity_us, version) VALUES (?, ?, ?, ?, ?, 1)",
+                (
+                    context.conversation_id,
+                    json.dumps(context.participants),
+                    context.json(exclude={"messages"}),
+                    data["conversation_tone"],
+                    to_timestamp_us(context.last_activity)
+                )
+            )
+        return 1
+
+    def append(self, conversation_id: str, record: CompactMessage) -> int:
+        """Append a message in one write transaction; returns the new version"""
+
+        message = record.to_dict()
+        connection = self._connections.get()
+        with connection:
+            # BEGIN IMMEDIATE takes the write lock up front so seq allocation
+            # cannot race with another worker
+            connection.execute("BEGIN IMMEDIATE")
+            if connection.execute(_BUMP, (record.timestamp_us, conversation_id)).rowcount == 0:
+                raise ValueError(f"Conversation {conversation_id} not found")
+            seq = connection.execute(_NEXT_SEQ, (conversation_id,)).fetchone()[0]
+            connection.execute(_INSERT_MESSAGE, (
+                conversation_id, seq, message["message_id"], message["sender_id"],
+                message["receiver_id"], record.content, record.timestamp_us,
+                message["message_type"], int(record.is_ai_generated)
+            ))
+            return connection.execute(_VERSION, (conversation_id,)).fetchone()[0]
+
+    def set_tone(self, conversation_id: str, tone: str) -> Optional[int]:
+        """Update the conversation tone; returns the new version, None if missing"""
+
+        connection = self._connections.get()
+        with connection:
+            updated = connection.execute(
+                "UPDATE conversations SET conversation_tone = ?, version = version + 1 "
+                "WHERE conversation_id = ? AND archived = 0",
+                (tone, conversation_id)
+            ).rowcount
+            if not updated:
+                return None
+            return connection.execute(_VERSION, (conversation_id,)).fetchone()[0]
+
+    def archive(self, conversation_id: str) -> bool:
+        """Mark a conversation archived; its messages stay in the table"""
+
+        connection = self._connections.get()
+        with connection:
+            return connection.execute(
+                "UPDATE conversations SET archived = 1, version = version + 1 "
+                "WHERE conversation_id = ? AND archived = 0",
+                (conversation_id,)
+            ).rowcount > 0
+
+    def claim_turn(self, conversation_id: str, owner: str, lease: float) -> bool:
+        """Try to take a conversation's turn lease for `lease` seconds; False while another owner holds it"""
+
+        now_us = to_timestamp_us(datetime.now())
+        connection = self._connections.get()
+        with connection:
+            return connection.execute(
+                _CLAIM_TURN, (conversation_id, owner, now_us + int(lease * 1e6), now_us)
+            ).rowcount > 0
+
+    def release_turn(self, conversation_id: str, owner: str) -> None:
+        """Give up a turn lease; a lease that expired and was taken over is left alone"""
+        connection = self._connections.get()
+        with connection:
+            connection.execute(
+                "DELETE FROM conversation_turns WHERE conversation_id = ? AND owner = ?",
+                (conversation_id, owner)
+            )
+
+    def version(self, conversation_id: str) -> Optional[int]:
+        """Get the version of an active conversation, None if missing or archived"""
+        row = self._connections.get().execute(_VERSION, (conversation_id,)).fetchone()
+        return row[0] if row else None
+
+    def load(
+        self,
+        conversation_id: str,
+        max_history: int
+    ) -> Optional[Tuple[ConversationContext, List[CompactMessage], int]]:
+        """Load an active conversation's context, its last messages and version"""
+
+        connection = self._connections.get()
+        # One read transaction so the context and messages match the version
+        with connection:
+            connection.execute("BEGIN")
+            row = connection.execute(
+                "SELECT context_json, conversation_tone, last_activity_us, version "
+                "FROM conversations WHERE conversation_id = ? AND archived = 0",
+                (conversation_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = connection.execute(
+                f"SELECT {_MESSAGE_COLUMNS} FROM conversation_messages "
+                "WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?",
+                (conversation_id, max_history)
+            ).fetchall()
+
+        context_json, tone, last_activity_us, version = row
+        context = ConversationContext.parse_raw(context_json)
+        context.conversation_tone = tone
+        records = [CompactMessage.from_columns(*columns) for columns in reversed(rows)]
+        if records:
+            context.last_activity = records[-1].timestamp
+        return context, records, version
+
+    def messages(self, conversation_id: str) -> List[ChatMessage]:
+        """Get every stored message of a conversation, oldest first"""
+        rows = self._connections.get().execute(
+            f"SELECT {_MESSAGE_COLUMNS} FROM conversation_messages "
+            "WHERE conversation_id = ? ORDER BY seq",
+            (conversation_id,)
+        )
+        return [CompactMessage.from_columns(*columns).to_message() for columns in rows]
+
+    def page(self, conversation_id: str, limit: int, before: Optional[MessageKey] = None) -> List[CompactMessage]:
+        """Get up to `limit` messages older than the `before` key, newest first, from the cursor index"""
+        if before is None:
+            rows = self._connections.get().execute(
+                f"SELECT {_MESSAGE_COLUMNS} FROM conversation_messages WHERE conversation_id = ? "
+                "ORDER BY timestamp_us DESC, message_id DESC LIMIT ?",
+                (conversation_id, limit)
+            )
+        else:
+            rows = self._connections.get().execute(
+                f"SELECT {_MESSAGE_COLUMNS} FROM conversation_messages "
+                "WHERE conversation_id = ? AND (timestamp_us, message_id) < (?, ?) "
+                "ORDER BY timestamp_us DESC, message_id DESC LIMIT ?",
+                (conversation_id, before[0], before[1], limit)
+            )
+        return [CompactMessage.from_columns(*columns) for columns in rows]
+
+    def is_archived(self, conversation_id: str) -> bool:
+        row = self._connections.get().execute(
+            "SELECT archived FROM conversations WHERE conversation_id = ?", (conversation_id,)
+        ).fetchone()
+        return bool(row and row[0])
+
+    def stale_conversation_ids(self, cutoff: datetime) -> List[str]:
+        """Get active conversations with no activity since the cutoff"""
+        rows = self._connections.get().execute(
+            "SELECT conversation_id FROM conversations WHERE archived = 0 AND last_activity_us < ?",
+            (to_timestamp_us(cutoff),)
+        )
+        return [row[0] for row in rows]
+
+    def active_conversation_ids(self, user_id: Optional[str] = None) -> List[str]:
+        """Get active conversation ids, optionally only those a user takes part in"""
+        rows = self._connections.get().execute(
+            "SELECT conversation_id, participants FROM conversations WHERE archived = 0"
+        )
+        return [
+            conversation_id for conversation_id, participants in rows
+            if user_id is None or user_id in json.loads(participants)
+        ]
+
+    def counts(self) -> Dict[str, Any]:
+        active, archived = self._connections.get().execute(
+            "SELECT COALESCE(SUM(archived = 0), 0), COALESCE(SUM(archived = 1), 0) FROM conversations"
+        ).fetchone()
+        return {"active": active, "archived": archived}
+
+    def close(self) -> None:
+        self._connections.close()
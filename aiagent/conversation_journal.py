@@ -0,0 +1,199 @@
+"""
+Write-ahead log and snapshots for durable conversation state
+"""
+from typing import List, Dict, Any, Optional, Callable, Iterator, Tuple
+import json
+import os
+import threading
+import time
+
+SNAPSHOT_FILE = "snapshot.json"
+LOG_PREFIX = "wal-"
+LOG_SUFFIX = ".log"
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, default=lambda item: item.isoformat(), separators=(",", ":"))
+
+class ConversationJournal:
+    """Append-only journal of conversation mutations with group commit"""
+
+    def __init__(
+        self,
+        directory: str,
+        commit_interval: float = 0.005,
+        snapshot_every: int = 10000,
+        fsync: bool = True
+    ):
+        """Initialize the journal directory"""
+        self.directory = directory
+        self.commit_interval = commit_interval
+        self.snapshot_every = snapshot_every
+        self.fsync = fsync
+
+        os.makedirs(self.directory, exist_ok=True)
+
+        self._condition = threading.Condition()
+        self._pending: List[str] = []
+        self._next_seq = 1
+        self._durable_seq = 0
+        self._records_since_snapshot = 0
+        self._log_file = None
+        self._writer: Optional[threading.Thread] = None
+        self._state_provider: Optional[Callable[[], List[Dict[str, Any]]]] = None
+        self._closed = False
+
+    def load(self) -> Tuple[List[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+        """Load the latest snapshot and an iterator over the log tail after it"""
+
+        conversations: List[Dict[str, Any]] = []
+        last_seq = 0
+
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        if os.path.exists(snapshot_path):
+            with open(snapshot_path, "r", encoding="utf-8") as snapshot:
+                data = json.load(snapshot)
+            conversations = data.get("conversations", [])
+            last_seq = data.get("last_seq", 0)
+
+        self._next_seq = last_seq + 1
+        return conversations, self._iter_log_tail(last_seq)
+
+    def start(self, state_provider: Callable[[], List[Dict[str, Any]]]) -> None:
+        """Start the background group-commit writer"""
+
+        self._state_provider = state_provider
+        self._durable_seq = self._next_seq - 1
+        self._open_log(self._next_seq)
+
+        self._writer = threading.Thread(
+            target=self._run_writer, name="conversation-journal", daemon=True
+        )
+        self._writer.start()
+
+    def append(self, op: str, conversation_id: str, data: Dict[str, Any]) -> int:
+        """Queue a record for the next group commit and return its sequence number"""
+
+        with self._condition:
+            seq = self._next_seq
+            self._next_seq += 1
+            self._pending.append(_encode({
+                "seq": seq,
+                "op": op,
+                "conversation_id": conversation_id,
+                "data": data
+            }))
+            self._condition.notify_all()
+        return seq
+
+    def wait_durable(self, seq: int, timeout: Optional[float] = None) -> bool:
+        """Block until a record is on disk, giving up after the timeout"""
+
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: self._durable_seq >= seq or self._closed, timeout
+            )
+
+    def close(self) -> None:
+        """Flush outstanding records and stop the writer"""
+
+        with self._condition:
+            if self._closed:
+                return
+            self._closed = True
+            self._condition.notify_all()
+
+        if self._writer:
+            self._writer.join()
+        if self._log_file:
+            self._log_file.close()
+            self._log_file = None
+
+    def _run_writer(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._closed)
+                if not self._pending and self._closed:
+                    return
+
+            # Let concurrent appends pile up so one fsync covers the whole batch
+            time.sleep(self.commit_interval)
+
+            with self._condition:
+                batch, self._pending = self._pending, []
+                last_seq = self._durable_seq + len(batch)
+
+            self._log_file.write("\n".join(batch) + "\n")
+            self._log_file.flush()
+            if self.fsync:
+                os.fsync(self._log_file.fileno())
+
+            with self._condition:
+                self._durable_seq = last_seq
+                self._condition.notify_all()
+
+            self._records_since_snapshot += len(batch)
+            if self._records_since_snapshot >= self.snapshot_every:
+                self._write_snapshot()
+
+    def _write_snapshot(self) -> None:
+        """Snapshot the in-memory state and start a fresh log file"""
+
+        # Every record up to last_seq was applied before it was appended, so
+        # the captured state already contains it; later records replay on top
+        last_seq = self._durable_seq
+        conversations = self._state_provider() if self._state_provider else []
+
+        snapshot_path = os.path.join(self.directory, SNAPSHOT_FILE)
+        temp_path = snapshot_path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as snapshot:
+            snapshot.write(_encode({"last_seq": last_seq, "conversations": conversations}))
+            snapshot.flush()
+            if self.fsync:
+                os.fsync(snapshot.fileno())
+        os.replace(temp_path, snapshot_path)
+
+        self._log_file.close()
+        self._open_log(last_seq + 1)
+        for name, _ in self._log_files():
+            if name != self._log_name(last_seq + 1):
+                os.remove(os.path.join(self.directory, name))
+
+        self._records_since_snapshot = 0
+
+    def _open_log(self, first_seq: int) -> None:
+        path = os.path.join(self.directory, self._log_name(first_seq))
+        self._log_file = open(path, "a", encoding="utf-8")
+
+        # Terminate a torn tail line so new records start on a fresh line
+        if self._log_file.tell() > 0:
+            with open(path, "rb") as log:
+                log.seek(-1, os.SEEK_END)
+                if log.read(1) != b"\n":
+                    self._log_file.write("\n")
+
+    def _log_name(self, first_seq: int) -> str:
+        return f"{LOG_PREFIX}{first_seq:012d}{LOG_SUFFIX}"
+
+    def _log_files(self) -> List[Tuple[str, int]]:
+        files = []
+        for name in os.listdir(self.directory):
+            if name.startswith(LOG_PREFIX) and name.endswith(LOG_SUFFIX):
+                try:
+                    files.append((name, int(name[len(LOG_PREFIX):-len(LOG_SUFFIX)])))
+                except ValueError:
+                    continue
+        return sorted(files, key=lambda item: item[1])
+
+    def _iter_log_tail(self, last_seq: int) -> Iterator[Dict[str, Any]]:
+        for name, _ in self._log_files():
+            with open(os.path.join(self.directory, name), "r", encoding="utf-8") as log:
+                for line in log:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Torn write from a crash; the record was never committed
+                        continue
+
+                    if record["seq"] > last_seq:
+                        self._next_seq = max(self._next_seq, record["seq"] + 1)
+                        yield record
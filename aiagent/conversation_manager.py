@@ -1,24 +1,75 @@
 """
 Conversation Manager for handling chat history and context
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple
 from datetime import datetime, timedelta
 import uuid
 import json
 
+from config import Config
 from models import (
     ChatMessage, ConversationContext, UserPreferences, 
     PotentialMatch, FlirtingStyle
 )
+from archive_store import ConversationArchive
+from conversation_journal import ConversationJournal
+from message_store import CompactMessage, MessageLog, MessageKey, to_timestamp_us
+from conversation_store import ShardedStore
+from conversation_db import SharedConversationStore
+from keyword_matcher import ordered_hits
+from topic_keywords import TOPIC_KEYWORDS, TOPIC_MATCHER
 
 class ConversationManager:
     """Manages conversation history and context for AI agent"""
     
-    def __init__(self, max_history: int = 20):
+    def __init__(
+        self,
+        max_history: int = 20,
+        archive_dir: Optional[str] = None,
+        journal_dir: Optional[str] = None,
+        shared_db_path: Optional[str] = None
+    ):
         """Initialize conversation manager"""
         self.max_history = max_history
-        self.active_conversations: Dict[str, ConversationContext] = {}
-        self.conversation_archives: Dict[str, List[ChatMessage]] = {}
+        
+        # Contexts hold conversation metadata only; their messages are kept as
+        # compact records and materialized as ChatMessage at the API boundary.
+        # Both stores are lock-striped; a conversation's shard lock in
+        # active_conversations guards every compound operation on it.
+        self.active_conversations: ShardedStore[ConversationContext] = ShardedStore(
+            Config.CONVERSATION_SHARDS
+        )
+        self.message_logs: ShardedStore[MessageLog] = ShardedStore(Config.CONVERSATION_SHARDS)
+        
+        # Archived conversations live in append-only segment files, not in RAM
+        self.conversation_archives = ConversationArchive(
+            archive_dir or Config.ARCHIVE_DIR,
+            max_segment_bytes=Config.ARCHIVE_SEGMENT_BYTES
+        )
+        
+        # Shared mode: the SQLite store is the source of truth for every worker
+        # process and the in-memory stores above are a cache of it, validated
+        # by a per-conversation version number
+        self._shared: Optional[SharedConversationStore] = None
+        self._versions: ShardedStore[int] = ShardedStore(Config.CONVERSATION_SHARDS)
+        shared_db_path = shared_db_path or Config.CONVERSATION_DB_PATH
+        if shared_db_path:
+            self._shared = SharedConversationStore(
+                shared_db_path, mmap_size=Config.SQLITE_MMAP_SIZE
+            )
+        
+        # Durable mode: every mutation is journaled and replayed on startup
+        # (not needed in shared mode, where every write is already durable)
+        self._journal: Optional[ConversationJournal] = None
+        journal_dir = journal_dir or Config.CONVERSATION_WAL_DIR
+        if journal_dir and not self._shared:
+            self._journal = ConversationJournal(
+                journal_dir,
+                commit_interval=Config.WAL_COMMIT_INTERVAL,
+                snapshot_every=Config.WAL_SNAPSHOT_EVERY
+            )
+            self._recover_from_journal()
+            self._journal.start(self._snapshot_state)
     
     def create_conversation(
         self,
@@ -39,7 +90,13 @@ class ConversationManager:
             conversation_tone="casual"
         )
         
-        self.active_conversations[conversation_id] = context
+        with self.active_conversations.locked(conversation_id):
+            if self._shared:
+                self._versions[conversation_id] = self._shared.create(context)
+            self.message_logs[conversation_id] = MessageLog(self.max_history)
+            self.active_conversations[conversation_id] = context
+            seq = self._journal_record("create", conversation_id, context.dict())
+        self._wait_durable(seq)
         return conversation_id
     
     def add_message(
@@ -53,34 +110,125 @@ class ConversationManager:
     ) -> ChatMessage:
         """Add a message to a conversation"""
         
-        if conversation_id not in self.active_conversations:
-            raise ValueError(f"Conversation {conversation_id} not found")
-        
-        message = ChatMessage(
-            message_id=str(uuid.uuid4()),
-            sender_id=sender_id,
-            receiver_id=receiver_id,
-            content=content,
-            message_type=message_type,
-            is_ai_generated=is_ai_generated
+        record = CompactMessage.create(
+            sender_id, receiver_id, content,
+            is_ai_generated=is_ai_generated,
+            message_type=message_type
         )
+        message_data = record.to_dict()
+        
+        seq = None
+        with self.active_conversations.locked(conversation_id):
+            if self._shared:
+                self._append_shared(conversation_id, record)
+            else:
+                if conversation_id not in self.active_conversations:
+                    raise ValueError(f"Conversation {conversation_id} not found")
+                
+                self._append_record(conversation_id, record)
+                seq = self._journal_record("message", conversation_id, message_data)
+        
+        self._wait_durable(seq)
+        return ChatMessage(**message_data)
+    
+    def _append_record(self, conversation_id: str, record: CompactMessage) -> None:
+        """Append a record to a conversation; the log keeps the history limit"""
+        self.message_logs[conversation_id].append(record)
+        self.active_conversations[conversation_id].last_activity = record.timestamp
+    
+    def _sync_shared(self, conversation_id: str) -> bool:
+        """Refresh the cached copy of a conversation if another worker changed it; call under its shard lock"""
+        
+        version = self._shared.version(conversation_id)
+        if version is None:
+            self.active_conversations.pop(conversation_id)
+            self.message_logs.pop(conversation_id)
+            self._versions.pop(conversation_id)
+            return False
         
-        context = self.active_conversations[conversation_id]
-        context.messages.append(message)
-        context.last_activity = datetime.now()
+        if self._versions.get(conversation_id) != version or conversation_id not in self.active_conversations:
+            loaded = self._shared.load(conversation_id, self.max_history)
+            if loaded is None:
+                return self._sync_shared(conversation_id)
+            context, records, version = loaded
+            log = MessageLog(self.max_history)
+            for record in records:
+                log.append(record)
+            self.active_conversations[conversation_id] = context
+            self.message_logs[conversation_id] = log
+            self._versions[conversation_id] = version
+        return True
+    
+    def _append_shared(self, conversation_id: str, record: CompactMessage) -> None:
+        """Write a message to the shared store and apply it to the cached copy"""
         
-        # Maintain conversation history limit
-        if len(context.messages) > self.max_history:
-            context.messages = context.messages[-self.max_history:]
+        if not self._sync_shared(conversation_id):
+            raise ValueError(f"Conversation {conversation_id} not found")
         
-        return message
+        expected = self._versions.get(conversation_id) + 1
+        version = self._shared.append(conversation_id, record)
+        if version == expected:
+            self._append_record(conversation_id, record)
+            self._versions[conversation_id] = version
+        else:
+            # Another worker wrote in between; reload instead of guessing the order
+            self._sync_shared(conversation_id)
+    
+    @property
+    def is_shared(self) -> bool:
+        """Whether conversations live in the SQLite store shared by every worker"""
+        return self._shared is not None
+    
+    def try_begin_turn(self, conversation_id: str, owner: str, lease: float) -> bool:
+        """Claim a conversation's turn across worker processes; always granted outside shared mode"""
+        if not self._shared:
+            return True
+        return self._shared.claim_turn(conversation_id, owner, lease)
+    
+    def end_turn(self, conversation_id: str, owner: str) -> None:
+        """Release a turn claimed with try_begin_turn"""
+        if self._shared:
+            self._shared.release_turn(conversation_id, owner)
     
     def get_conversation_context(
         self, 
         conversation_id: str
     ) -> Optional[ConversationContext]:
-        """Get conversation context by ID"""
-        return self.active_conversations.get(conversation_id)
+        """Get a snapshot of the conversation context with its messages materialized; edits to it are not stored"""
+        
+        with self.active_conversations.locked(conversation_id):
+            if self._shared and not self._sync_shared(conversation_id):
+                return None
+            context = self.active_conversations.get(conversation_id)
+            if not context:
+                return None
+            records = list(self.message_logs[conversation_id])
+        
+        return context.copy(update={"messages": [record.to_message() for record in records]})
+    
+    def get_turn_context(
+        self,
+        conversation_id: str
+    ) -> Tuple[Optional[ConversationContext], List[CompactMessage]]:
+        """Get conversation context without materialized messages, plus its compact records"""
+        
+        with self.active_conversations.locked(conversation_id):
+            if self._shared and not self._sync_shared(conversation_id):
+                return None, []
+            context = self.active_conversations.get(conversation_id)
+            if not context:
+                return None, []
+            records = list(self.message_logs[conversation_id])
+        
+        return context.copy(), records
+    
+    def _records(self, conversation_id: str) -> List[CompactMessage]:
+        """Copy a conversation's records under its shard lock"""
+        with self.active_conversations.locked(conversation_id):
+            if self._shared and not self._sync_shared(conversation_id):
+                return []
+            log = self.message_logs.get(conversation_id)
+            return list(log) if log else []
     
     def get_recent_messages(
         self, 
@@ -89,11 +237,71 @@ class ConversationManager:
     ) -> List[ChatMessage]:
         """Get recent messages from a conversation"""
         
-        context = self.active_conversations.get(conversation_id)
-        if not context:
-            return []
+        # Same slice as before records were compact: limit=0 means the whole history
+        records = self._records(conversation_id)
+        return [record.to_message() for record in records[-limit:]]
+    
+    def get_recent_message_dicts(
+        self,
+        conversation_id: str,
+        limit: int = 10
+    ) -> List[Dict[str, Any]]:
+        """Get recent messages as ChatMessage-shaped dicts, without building models"""
         
-        return context.messages[-limit:] if context.messages else []
+        # Same slice as before records were compact: limit=0 means the whole history
+        records = self._records(conversation_id)
+        return [record.to_dict() for record in records[-limit:]]
+    
+    def get_message_page(
+        self,
+        conversation_id: str,
+        limit: int = 20,
+        before: Optional[MessageKey] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[MessageKey]]:
+        """Get up to `limit` messages older than `before` (the newest if None), oldest first, plus the key of the next older page"""
+        
+        if limit <= 0:
+            return [], None
+        
+        with self.active_conversations.locked(conversation_id):
+            active = not self._shared or self._sync_shared(conversation_id)
+            log = self.message_logs.get(conversation_id) if active else None
+            records = list(log) if log is not None else None
+        
+        if records is not None:
+            older = sorted((record.key, record) for record in records if before is None or record.key < before)
+            # The log is the whole history unless it is full and the shared
+            # store holds older messages (in-process mode keeps no more)
+            complete = not self._shared or len(records) < self.max_history
+            if complete or len(older) > limit:
+                return self._page([(key, record.to_dict()) for key, record in older[-limit - 1:]], limit)
+        
+        if self._shared:
+            # Keyset query on the cursor index: cost follows the page size, not the history
+            newest_first = self._shared.page(conversation_id, limit + 1, before)
+            return self._page([(record.key, record.to_dict()) for record in reversed(newest_first)], limit)
+        
+        # Archived in-process conversations: one block of at most max_history messages
+        archived = self.conversation_archives.get(conversation_id) or []
+        older = sorted(
+            (key, message) for key, message in (
+                ((to_timestamp_us(message.timestamp), message.message_id), message) for message in archived
+            )
+            if before is None or key < before
+        )
+        return self._page([(key, message.dict()) for key, message in older[-limit - 1:]], limit)
+    
+    def _page(
+        self,
+        keyed: List[Tuple[MessageKey, Dict[str, Any]]],
+        limit: int
+    ) -> Tuple[List[Dict[str, Any]], Optional[MessageKey]]:
+        """Trim up to limit + 1 oldest-first messages to a page; an extra one means an older page exists"""
+        next_key = None
+        if len(keyed) > limit:
+            keyed = keyed[-limit:]
+            next_key = keyed[0][0]
+        return [message for _, message in keyed], next_key
     
     def analyze_conversation_flow(
         self, 
@@ -101,8 +309,9 @@ class ConversationManager:
     ) -> Dict[str, Any]:
         """Analyze conversation flow and engagement"""
         
+        messages = self._records(conversation_id)
         context = self.active_conversations.get(conversation_id)
-        if not context or not context.messages:
+        if not context or not messages:
             return {
                 "engagement": "low",
                 "response_time": "slow",
@@ -111,8 +320,6 @@ class ConversationManager:
                 "suggestions": []
             }
         
-        messages = context.messages
-        
         # Calculate engagement metrics
         total_messages = len(messages)
         ai_messages = sum(1 for msg in messages if msg.is_ai_generated)
@@ -121,8 +328,8 @@ class ConversationManager:
         # Calculate response times (simplified)
         response_times = []
         for i in range(1, len(messages)):
-            time_diff = messages[i].timestamp - messages[i-1].timestamp
-            response_times.append(time_diff.total_seconds() / 60)  # minutes
+            time_diff_us = messages[i].timestamp_us - messages[i-1].timestamp_us
+            response_times.append(time_diff_us / 60_000_000)  # minutes
         
         avg_response_time = sum(response_times) / len(response_times) if response_times else 0
         
@@ -172,11 +379,26 @@ class ConversationManager:
     ) -> bool:
         """Update conversation tone based on recent interactions"""
         
-        context = self.active_conversations.get(conversation_id)
-        if not context:
-            return False
-        
-        context.conversation_tone = new_tone
+        with self.active_conversations.locked(conversation_id):
+            if self._shared:
+                if not self._sync_shared(conversation_id):
+                    return False
+                expected = self._versions.get(conversation_id) + 1
+                version = self._shared.set_tone(conversation_id, new_tone)
+                if version is None:
+                    return False
+                if version != expected:
+                    self._sync_shared(conversation_id)
+                    return True
+                self._versions[conversation_id] = version
+            
+            context = self.active_conversations.get(conversation_id)
+            if not context:
+                return False
+            
+            context.conversation_tone = new_tone
+            seq = self._journal_record("tone", conversation_id, {"tone": new_tone})
+        self._wait_durable(seq)
         return True
     
     def get_conversation_summary(
@@ -185,6 +407,7 @@ class ConversationManager:
     ) -> Dict[str, Any]:
         """Get a summary of the conversation"""
         
+        records = self._records(conversation_id)
         context = self.active_conversations.get(conversation_id)
         if not context:
             return {}
@@ -194,9 +417,9 @@ class ConversationManager:
         return {
             "conversation_id": conversation_id,
             "participants": context.participants,
-            "started_at": context.messages[0].timestamp if context.messages else None,
+            "started_at": records[0].timestamp if records else None,
             "last_activity": context.last_activity,
-            "total_messages": len(context.messages),
+            "total_messages": len(records),
             "conversation_tone": context.conversation_tone,
             "engagement_level": analysis["engagement"],
             "topics_discussed": analysis["topics_covered"],
@@ -206,17 +429,126 @@ class ConversationManager:
     def archive_conversation(self, conversation_id: str) -> bool:
         """Archive a conversation"""
         
-        context = self.active_conversations.get(conversation_id)
-        if not context:
-            return False
-        
-        # Move messages to archive
-        self.conversation_archives[conversation_id] = context.messages.copy()
+        with self.active_conversations.locked(conversation_id):
+            if self._shared:
+                # Archived messages stay in the shared store; just drop the cache
+                archived = self._shared.archive(conversation_id)
+                self.active_conversations.pop(conversation_id)
+                self.message_logs.pop(conversation_id)
+                self._versions.pop(conversation_id)
+                return archived
+            
+            context = self.active_conversations.get(conversation_id)
+            if not context:
+                return False
+            
+            # Move messages to the on-disk archive
+            self.conversation_archives.append(
+                conversation_id, self.message_logs[conversation_id].to_messages()
+            )
+            
+            # Remove from active conversations
+            del self.active_conversations[conversation_id]
+            del self.message_logs[conversation_id]
+            seq = self._journal_record("archive", conversation_id, {})
+        
+        self._wait_durable(seq)
+        return True
+    
+    def store_metrics(self) -> Dict[str, Any]:
+        """Get sizes and per-shard lock contention of the conversation stores"""
+        metrics = {
+            "active_conversations": len(self.active_conversations),
+            "archived_conversations": len(self.conversation_archives),
+            "context_shards": self.active_conversations.shard_metrics(),
+            "message_log_shards": self.message_logs.shard_metrics()
+        }
+        if self._shared:
+            counts = self._shared.counts()
+            metrics["cached_conversations"] = metrics["active_conversations"]
+            metrics["active_conversations"] = counts["active"]
+            metrics["archived_conversations"] = counts["archived"]
+        return metrics
+    
+    def close(self) -> None:
+        """Flush and close the journal in durable mode, or the shared store"""
+        if self._journal:
+            self._journal.close()
+        if self._shared:
+            self._shared.close()
+    
+    def _journal_record(self, op: str, conversation_id: str, data: Dict[str, Any]) -> Optional[int]:
+        """Append a mutation to the journal and return its sequence number (None when not durable)"""
+        if not self._journal:
+            return None
+        return self._journal.append(op, conversation_id, data)
+    
+    def _wait_durable(self, seq: Optional[int]) -> None:
+        """Wait at most the configured commit bound for a journaled mutation to reach disk"""
+        # Called after the shard lock is released: a snapshot takes every shard
+        # lock, so a writer waiting under one would stall the commit it waits for
+        if seq is not None and Config.WAL_MAX_COMMIT_WAIT > 0:
+            self._journal.wait_durable(seq, timeout=Config.WAL_MAX_COMMIT_WAIT)
+    
+    def _snapshot_state(self) -> List[Dict[str, Any]]:
+        """Serialize active conversations for a journal snapshot"""
+        
+        state = []
+        for conversation_id, context in self.active_conversations.snapshot():
+            data = context.dict()
+            data["messages"] = [record.to_dict() for record in self._records(conversation_id)]
+            state.append(data)
+        return state
+    
+    def _restore_context(self, data: Dict[str, Any]) -> None:
+        """Restore a serialized context, moving its messages into a compact log"""
         
-        # Remove from active conversations
-        del self.active_conversations[conversation_id]
+        context = ConversationContext(**data)
+        log = MessageLog(self.max_history)
+        for message in context.messages:
+            log.append(CompactMessage.from_message(message))
+        context.messages = []
         
-        return True
+        self.active_conversations[context.conversation_id] = context
+        self.message_logs[context.conversation_id] = log
+    
+    def _recover_from_journal(self) -> None:
+        """Rebuild active conversations from the last snapshot plus the log tail"""
+        
+        conversations, records = self._journal.load()
+        for data in conversations:
+            self._restore_context(data)
+        
+        # Replay is idempotent: the snapshot may already contain some tail records
+        for record in records:
+            op = record["op"]
+            conversation_id = record["conversation_id"]
+            data = record["data"]
+            context = self.active_conversations.get(conversation_id)
+            
+            if op == "create":
+                if not context and conversation_id not in self.conversation_archives:
+                    self._restore_context(data)
+            elif op == "message" and context:
+                if not self.message_logs[conversation_id].contains_id(data["message_id"]):
+                    self._append_record(
+                        conversation_id, CompactMessage.from_message(ChatMessage(**data))
+                    )
+            elif op == "tone" and context:
+                context.conversation_tone = data["tone"]
+            elif op == "archive" and context:
+                if conversation_id not in self.conversation_archives:
+                    self.conversation_archives.append(
+                        conversation_id, self.message_logs[conversation_id].to_messages()
+                    )
+                del self.active_conversations[conversation_id]
+                del self.message_logs[conversation_id]
+    
+    def get_archived_messages(self, conversation_id: str) -> List[ChatMessage]:
+        """Get messages of an archived conversation"""
+        if self._shared:
+            return self._shared.messages(conversation_id) if self._shared.is_archived(conversation_id) else []
+        return self.conversation_archives.get(conversation_id) or []
     
     def get_conversation_history_for_ai(
         self, 
@@ -225,7 +557,7 @@ class ConversationManager:
     ) -> str:
         """Format conversation history for AI agent context"""
         
-        messages = self.get_recent_messages(conversation_id, limit)
+        messages = self._records(conversation_id)[-limit:] if limit > 0 else []
         if not messages:
             return "No conversation history."
         
@@ -239,30 +571,11 @@ class ConversationManager:
     def _extract_topics_from_messages(self, messages: List[ChatMessage]) -> List[str]:
         """Extract topics from conversation messages"""
         
-        topics = []
-        topic_keywords = {
-            "music": ["music", "song", "band", "concert", "artist"],
-            "travel": ["travel", "trip", "vacation", "destination", "country"],
-            "food": ["food", "restaurant", "cooking", "recipe", "meal"],
-            "work": ["work", "job", "career", "office", "business"],
-            "hobbies": ["hobby", "interest", "activity", "fun", "enjoy"],
-            "movies": ["movie", "film", "cinema", "netflix", "watch"],
-            "sports": ["sport", "game", "team", "player", "match"],
-            "books": ["book", "read", "author", "novel", "story"],
-            "defi": ["defi", "yield", "farming", "liquidity", "protocol", "dex", "uniswap", "compound"],
-            "nft": ["nft", "token", "collection", "mint", "opensea", "digital art", "blockchain art"],
-            "coding": ["code", "programming", "smart contract", "solidity", "javascript", "python", "github"],
-            "crypto": ["crypto", "bitcoin", "ethereum", "trading", "hodl", "altcoin", "wallet"],
-            "blockchain": ["blockchain", "web3", "dapp", "dao", "consensus", "mining", "validator"]
-        }
-        
-        all_content = " ".join([msg.content.lower() for msg in messages])
-        
-        for topic, keywords in topic_keywords.items():
-            if any(keyword in all_content for keyword in keywords):
-                topics.append(topic)
+        hits = set()
+        for msg in messages:
+            hits |= TOPIC_MATCHER.categories(msg.content)
         
-        return topics
+        return ordered_hits(TOPIC_KEYWORDS, hits)
     
     def _generate_conversation_suggestions(
         self, 
@@ -296,8 +609,11 @@ class ConversationManager:
     def get_active_conversations(self, user_id: str) -> List[str]:
         """Get all active conversation IDs for a user"""
         
+        if self._shared:
+            return self._shared.active_conversation_ids(user_id)
+        
         user_conversations = []
-        for conv_id, context in self.active_conversations.items():
+        for conv_id, context in self.active_conversations.snapshot():
             if user_id in context.participants:
                 user_conversations.append(conv_id)
         
@@ -309,11 +625,17 @@ class ConversationManager:
         cutoff_date = datetime.now() - timedelta(days=days_old)
         conversations_to_remove = []
         
-        for conv_id, context in self.active_conversations.items():
-            if context.last_activity < cutoff_date:
-                conversations_to_remove.append(conv_id)
+        if self._shared:
+            conversations_to_remove = self._shared.stale_conversation_ids(cutoff_date)
+        else:
+            # Decide from one consistent snapshot; archiving takes each shard lock again
+            for conv_id, context in self.active_conversations.snapshot():
+                if context.last_activity < cutoff_date:
+                    conversations_to_remove.append(conv_id)
         
+        archived = 0
         for conv_id in conversations_to_remove:
-            self.archive_conversation(conv_id)
+            if self.archive_conversation(conv_id):
+                archived += 1
         
-        return len(conversations_to_remove)
+        return archived
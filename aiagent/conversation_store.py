@@ -0,0 +1,136 @@
+"""
+Lock-striped, thread-safe store for conversation state
+"""
+from typing import List, Dict, Any, Optional, Iterator, Tuple, TypeVar, Generic
+from contextlib import contextmanager
+import threading
+import time
+
+V = TypeVar("V")
+
+class _Shard:
+    """One stripe of the store with its own lock and contention counters"""
+
+    __slots__ = ("data", "lock", "acquisitions", "contended", "wait_seconds")
+
+    def __init__(self):
+        self.data: Dict[str, Any] = {}
+        self.lock = threading.RLock()
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_seconds = 0.0
+
+    def acquire(self) -> None:
+        if not self.lock.acquire(blocking=False):
+            started = time.perf_counter()
+            self.lock.acquire()
+            self.contended += 1
+            self.wait_seconds += time.perf_counter() - started
+        self.acquisitions += 1
+
+class ShardedStore(Generic[V]):
+    """Dict-like store split into N shards keyed by the hash of the id"""
+
+    def __init__(self, shard_count: int = 16):
+        """Initialize the shards"""
+        if shard_count < 1:
+            raise ValueError("shard_count must be at least 1")
+        self._shards = [_Shard() for _ in range(shard_count)]
+
+    def _shard(self, key: str) -> _Shard:
+        return self._shards[hash(key) % len(self._shards)]
+
+    @contextmanager
+    def locked(self, key: str) -> Iterator[None]:
+        """Hold the shard lock for a key across a compound operation"""
+        shard = self._shard(key)
+        shard.acquire()
+        try:
+            yield
+        finally:
+            shard.lock.release()
+
+    @contextmanager
+    def _all_locked(self) -> Iterator[None]:
+        # Always lock shards in index order so concurrent snapshots cannot deadlock
+        for shard in self._shards:
+            shard.acquire()
+        try:
+            yield
+        finally:
+            for shard in reversed(self._shards):
+                shard.lock.release()
+
+    def get(self, key: str, default: Optional[V] = None) -> Optional[V]:
+        shard = self._shard(key)
+        shard.acquire()
+        try:
+            return shard.data.get(key, default)
+        finally:
+            shard.lock.release()
+
+    def pop(self, key: str, default: Optional[V] = None) -> Optional[V]:
+        shard = self._shard(key)
+        shard.acquire()
+        try:
+            return shard.data.pop(key, default)
+        finally:
+            shard.lock.release()
+
+    def __getitem__(self, key: str) -> V:
+        value = self.get(key, None)
+        if value is None:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key: str, value: V) -> None:
+        shard = self._shard(key)
+        shard.acquire()
+        try:
+            shard.data[key] = value
+        finally:
+            shard.lock.release()
+
+    def __delitem__(self, key: str) -> None:
+        shard = self._shard(key)
+        shard.acquire()
+        try:
+            del shard.data[key]
+        finally:
+            shard.lock.release()
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key) is not None
+
+    def __len__(self) -> int:
+        return sum(len(shard.data) for shard in self._shards)
+
+    def snapshot(self) -> List[Tuple[str, V]]:
+        """Get a point-in-time copy of every entry across all shards"""
+        with self._all_locked():
+            return [item for shard in self._shards for item in shard.data.items()]
+
+    def items(self) -> List[Tuple[str, V]]:
+        return self.snapshot()
+
+    def keys(self) -> List[str]:
+        return [key for key, _ in self.snapshot()]
+
+    def values(self) -> List[V]:
+        return [value for _, value in self.snapshot()]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+
+    def shard_metrics(self) -> List[Dict[str, Any]]:
+        """Get per-shard size and lock contention counters"""
+        return [
+            {
+                "shard": index,
+                "size": len(shard.data),
+                "acquisitions": shard.acquisitions,
+                "contended": shard.contended,
+                "wait_seconds": round(shard.wait_seconds, 6)
+            }
+            for index, shard in enumerate(self._shards)
+        ]
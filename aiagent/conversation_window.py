@@ -0,0 +1,141 @@
+"""
+Incrementally maintained sliding-window statistics for a conversation
+"""
+from typing import List, Dict, Any, Optional, Callable, Iterable, Set, Sequence
+from collections import deque, OrderedDict
+import threading
+
+ENGAGEMENT_HIGH_WORDS = 15
+ENGAGEMENT_MEDIUM_WORDS = 8
+
+class _WindowEntry:
+    """Per-message contribution to the window aggregates"""
+
+    __slots__ = ("message_id", "word_count", "topics")
+
+    def __init__(self, message_id: str, word_count: int, topics: Set[str]):
+        self.message_id = message_id
+        self.word_count = word_count
+        self.topics = topics
+
+class ConversationWindow:
+    """Engagement and topic aggregates over the last N messages"""
+
+    def __init__(self, size: int, extract_topics: Callable[[str], Set[str]]):
+        """Initialize an empty window"""
+        self.size = size
+        self._extract_topics = extract_topics
+        self._entries: deque = deque()
+        self._total_words = 0
+        self._topic_counts: Dict[str, int] = {}
+        # Held by callers across sync and reads of the aggregates
+        self.lock = threading.Lock()
+        # Per-conversation template selection state, attached by the engine
+        self.selector: Optional[Any] = None
+
+    def push(self, message_id: str, content: str) -> None:
+        """Add one message, evicting the oldest once the window is full"""
+
+        if len(self._entries) == self.size:
+            self._evict(self._entries.popleft())
+
+        entry = _WindowEntry(message_id, len(content.split()), self._extract_topics(content))
+        self._entries.append(entry)
+        self._total_words += entry.word_count
+        for topic in entry.topics:
+            self._topic_counts[topic] = self._topic_counts.get(topic, 0) + 1
+
+    def _evict(self, entry: _WindowEntry) -> None:
+        self._total_words -= entry.word_count
+        for topic in entry.topics:
+            remaining = self._topic_counts[topic] - 1
+            if remaining:
+                self._topic_counts[topic] = remaining
+            else:
+                del self._topic_counts[topic]
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._total_words = 0
+        self._topic_counts.clear()
+
+    def sync(self, messages: Sequence[Any]) -> None:
+        """Catch up with a conversation history (ChatMessages or compact records), touching only unseen messages"""
+
+        # Look for the newest message we already counted among the last
+        # `size` messages; anything after it is new. If it is not there the
+        # history moved past the whole window (or was replaced), so rebuild.
+        new_from = max(len(messages) - self.size, 0)
+        if self._entries:
+            last_seen = self._entries[-1].message_id
+            for index in range(len(messages) - 1, new_from - 1, -1):
+                if messages[index].message_id == last_seen:
+                    new_from = index + 1
+                    break
+            else:
+                self.clear()
+
+        for message in messages[new_from:]:
+            self.push(message.message_id, message.content)
+
+    @property
+    def message_count(self) -> int:
+        return len(self._entries)
+
+    @property
+    def average_words(self) -> float:
+        if not self._entries:
+            return 0.0
+        return self._total_words / len(self._entries)
+
+    @property
+    def engagement_level(self) -> str:
+        average = self.average_words
+        if average > ENGAGEMENT_HIGH_WORDS:
+            return "high"
+        if average > ENGAGEMENT_MEDIUM_WORDS:
+            return "medium"
+        return "low"
+
+    def topics(self, order: Optional[Iterable[str]] = None) -> List[str]:
+        """Get the topics present in the window, optionally in a fixed order"""
+        if order is None:
+            return list(self._topic_counts)
+        return [topic for topic in order if topic in self._topic_counts]
+
+class ConversationWindowCache:
+    """Bounded LRU of conversation windows shared across request threads"""
+
+    def __init__(
+        self,
+        extract_topics: Callable[[str], Set[str]],
+        window_size: int = 5,
+        max_conversations: int = 10000
+    ):
+        """Initialize the cache"""
+        self.extract_topics = extract_topics
+        self.window_size = window_size
+        self.max_conversations = max_conversations
+        self._windows: "OrderedDict[str, ConversationWindow]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, conversation_id: str) -> ConversationWindow:
+        """Get the window for a conversation, creating it on first use"""
+
+        with self._lock:
+            window = self._windows.get(conversation_id)
+            if window is None:
+                window = ConversationWindow(self.window_size, self.extract_topics)
+                self._windows[conversation_id] = window
+                if len(self._windows) > self.max_conversations:
+                    self._windows.popitem(last=False)
+            else:
+                self._windows.move_to_end(conversation_id)
+            return window
+
+    def discard(self, conversation_id: str) -> None:
+        with self._lock:
+            self._windows.pop(conversation_id, None)
+
+    def __len__(self) -> int:
+        return len(self._windows)
@@ -4,6 +4,7 @@ Core Dating AI Agent for CeloSoul
 import openai
 from typing import List, Dict, Optional, Any
 import json
+import time
 from datetime import datetime
 import uuid
 
@@ -12,15 +13,60 @@ from models import (
     UserProfile, PotentialMatch, ChatMessage, ConversationContext,
     FlirtingStyle, MatchAnalysis, UserPreferences
 )
+from tone_classifier import (
+    CascadeMetrics, load_tone_classifier, local_tone_analysis, local_strategy
+)
+from metrics import LLM_LATENCY, LLM_TOKENS, LLM_ERRORS
+from tracing import TRACER
 
 class DatingAgent:
     """Core AI agent for dating assistance and conversation generation"""
     
-    def __init__(self):
-        """Initialize the dating agent with OpenAI client"""
-        self.client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
+    # Most recent messages quoted in prompts (and fed to the local strategy model)
+    PROMPT_HISTORY_MESSAGES = 3
+    
+    def __init__(self, client=None):
+        """Initialize the dating agent with an OpenAI client (a new one unless given)"""
+        self.client = client or openai.OpenAI(api_key=Config.OPENAI_API_KEY)
         self.system_prompt = Config.get_agent_system_prompt()
         
+        # Local classifier answers confident cases; the rest escalate to the LLM
+        self.tone_classifier = load_tone_classifier(Config.TONE_MODEL_PATH)
+        self.cascade_metrics = CascadeMetrics()
+        
+    def _chat_completion(
+        self,
+        task: str,
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int
+    ):
+        """Call the chat completions API, recording latency, token usage and errors"""
+        
+        with TRACER.span(f"llm.{task}", model=Config.DEFAULT_MODEL) as span:
+            started = time.perf_counter()
+            try:
+                response = self.client.chat.completions.create(
+                    model=Config.DEFAULT_MODEL,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens
+                )
+            except Exception:
+                LLM_ERRORS.inc(task)
+                raise
+            finally:
+                LLM_LATENCY.observe(time.perf_counter() - started, task)
+            
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                LLM_TOKENS.inc(task, "prompt", amount=usage.prompt_tokens or 0)
+                LLM_TOKENS.inc(task, "completion", amount=usage.completion_tokens or 0)
+                span.set("prompt_tokens", usage.prompt_tokens or 0)
+                span.set("completion_tokens", usage.completion_tokens or 0)
+            return response
+    
+    @TRACER.traced("agent.generate_flirty_message")
     def generate_flirty_message(
         self, 
         context: ConversationContext, 
@@ -32,9 +78,9 @@ class DatingAgent:
         prompt = self._build_flirting_prompt(context, flirting_style, target_message)
         
         try:
-            response = self.client.chat.completions.create(
-                model=Config.DEFAULT_MODEL,
-                messages=[
+            response = self._chat_completion(
+                "flirty_message",
+                [
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": prompt}
                 ],
@@ -48,6 +94,7 @@ class DatingAgent:
             print(f"Error generating flirty message: {e}")
             return self._get_fallback_message(flirting_style)
     
+    @TRACER.traced("agent.generate_conversation_starter")
     def generate_conversation_starter(
         self, 
         match: PotentialMatch, 
@@ -74,9 +121,9 @@ class DatingAgent:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model=Config.DEFAULT_MODEL,
-                messages=[
+            response = self._chat_completion(
+                "conversation_starters",
+                [
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": prompt}
                 ],
@@ -102,6 +149,7 @@ class DatingAgent:
                 f"Hey there! I couldn't help but notice we share an interest in {match.match_reasons[0] if match.match_reasons else 'some cool stuff'}. Tell me more!"
             ]
     
+    @TRACER.traced("agent.analyze_conversation_tone")
     def analyze_conversation_tone(
         self, 
         messages: List[ChatMessage]
@@ -113,7 +161,20 @@ class DatingAgent:
         
         # Get recent messages for analysis
         recent_messages = messages[-5:] if len(messages) > 5 else messages
-        conversation_text = "\n".join([msg.content for msg in recent_messages])
+        recent_texts = [msg.content for msg in recent_messages]
+        
+        # Fast path: answer locally when the classifier is confident
+        local_label = None
+        if self.tone_classifier:
+            with TRACER.span("tone.local_classifier") as span:
+                analysis, confidence = local_tone_analysis(self.tone_classifier, recent_texts)
+                span.set("confidence", confidence)
+            if confidence >= Config.TONE_CONFIDENCE_THRESHOLD:
+                self.cascade_metrics.record_local("tone")
+                return analysis
+            local_label = analysis["tone"]
+        
+        conversation_text = "\n".join(recent_texts)
         
         prompt = f"""
         Analyze the tone and engagement level of this conversation:
@@ -130,9 +191,9 @@ class DatingAgent:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model=Config.DEFAULT_MODEL,
-                messages=[
+            response = self._chat_completion(
+                "tone_analysis",
+                [
                     {"role": "system", "content": "You are a conversation analyst. Provide accurate, helpful analysis in JSON format."},
                     {"role": "user", "content": prompt}
                 ],
@@ -142,14 +203,20 @@ class DatingAgent:
             
             content = response.choices[0].message.content.strip()
             try:
-                return json.loads(content)
+                analysis = json.loads(content)
             except json.JSONDecodeError:
+                self.cascade_metrics.record_escalation("tone", local_label, None, error=True)
                 return {"tone": "casual", "engagement": "medium", "suggestions": []}
+            
+            self.cascade_metrics.record_escalation("tone", local_label, analysis.get("tone"))
+            return analysis
                 
         except Exception as e:
             print(f"Error analyzing conversation tone: {e}")
+            self.cascade_metrics.record_escalation("tone", local_label, None, error=True)
             return {"tone": "casual", "engagement": "medium", "suggestions": []}
     
+    @TRACER.traced("agent.suggest_response_strategy")
     def suggest_response_strategy(
         self, 
         context: ConversationContext,
@@ -158,11 +225,23 @@ class DatingAgent:
     ) -> Dict[str, Any]:
         """Suggest response strategy based on incoming message and context"""
         
+        # Fast path: answer locally when the classifier is confident
+        local_label = None
+        if self.tone_classifier:
+            history = [msg.content for msg in context.messages[-self.PROMPT_HISTORY_MESSAGES:]]
+            with TRACER.span("tone.local_strategy") as span:
+                strategy, confidence = local_strategy(self.tone_classifier, history, incoming_message)
+                span.set("confidence", confidence)
+            if confidence >= Config.TONE_CONFIDENCE_THRESHOLD:
+                self.cascade_metrics.record_local("strategy")
+                return strategy
+            local_label = strategy["response_type"]
+        
         prompt = f"""
         Given this conversation context and incoming message, suggest the best response strategy:
         
         Conversation history:
-        {self._format_conversation_history(context.messages[-3:])}
+        {self._format_conversation_history(context.messages[-self.PROMPT_HISTORY_MESSAGES:])}
         
         Incoming message: "{incoming_message}"
         
@@ -179,9 +258,9 @@ class DatingAgent:
         """
         
         try:
-            response = self.client.chat.completions.create(
-                model=Config.DEFAULT_MODEL,
-                messages=[
+            response = self._chat_completion(
+                "response_strategy",
+                [
                     {"role": "system", "content": self.system_prompt},
                     {"role": "user", "content": prompt}
                 ],
@@ -191,8 +270,11 @@ class DatingAgent:
             
             content = response.choices[0].message.content.strip()
             try:
-                return json.loads(content)
+                strategy = json.loads(content)
+                self.cascade_metrics.record_escalation("strategy", local_label, strategy.get("response_type"))
+                return strategy
             except json.JSONDecodeError:
+                self.cascade_metrics.record_escalation("strategy", local_label, None, error=True)
                 return {
                     "response_type": "casual",
                     "tone_adjustment": "maintain",
@@ -203,6 +285,7 @@ class DatingAgent:
                 
         except Exception as e:
             print(f"Error suggesting response strategy: {e}")
+            self.cascade_metrics.record_escalation("strategy", local_label, None, error=True)
             return {
                 "response_type": "casual",
                 "tone_adjustment": "maintain",
@@ -233,7 +316,7 @@ class DatingAgent:
             base_prompt += f"""
             
             Recent conversation:
-            {self._format_conversation_history(context.messages[-3:])}
+            {self._format_conversation_history(context.messages[-self.PROMPT_HISTORY_MESSAGES:])}
             """
         
         if target_message:
@@ -0,0 +1,109 @@
+"""
+Fast JSON responses and field projection for large API payloads
+"""
+from typing import Dict, Any, Optional
+from datetime import date, datetime
+from enum import Enum
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+import json
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback, same output shape
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY) if orjson else 0
+
+def _default(obj: Any) -> Any:
+    """Encode the types handlers leave in .dict() output"""
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, BaseModel):
+        return obj.dict()
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "tolist"):  # numpy arrays and scalars
+        return obj.tolist()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps(content: Any) -> bytes:
+    """Serialize to UTF-8 JSON bytes, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content, default=_default, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+class FastJSONResponse(JSONResponse):
+    """JSON response rendered with the fast encoder"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
+
+def fast_response(
+    success: bool,
+    message: str,
+    data: Optional[Dict[str, Any]] = None,
+    status_code: int = 200
+) -> FastJSONResponse:
+    """Build the ResponseModel envelope directly, skipping response validation"""
+    # Returning a Response makes FastAPI bypass response_model checks and
+    # jsonable_encoder; the payload is built from already-validated models
+    return FastJSONResponse(
+        {"success": success, "message": message, "data": data},
+        status_code=status_code
+    )
+
+def parse_projection(spec: Optional[str]) -> Optional[Dict[str, Any]]:
+    """Turn "photos,preferences.web3_preferences" into a pydantic include/exclude dict"""
+
+    if not spec:
+        return None
+
+    projection: Dict[str, Any] = {}
+    for path in spec.split(","):
+        parts = [part for part in path.strip().split(".") if part]
+        if not parts:
+            continue
+        node = projection
+        for part in parts[:-1]:
+            child = node.get(part)
+            if child is True:
+                break
+            if child is None:
+                child = node[part] = {}
+            node = child
+        else:
+            node[parts[-1]] = True
+    return projection or None
+
+def project(
+    model: BaseModel,
+    fields: Optional[Dict[str, Any]] = None,
+    exclude: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Dump a model keeping only the projected fields"""
+    return model.dict(include=fields, exclude=exclude)
+
+def project_dict(
+    data: Dict[str, Any],
+    fields: Optional[Dict[str, Any]] = None,
+    exclude: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Apply the same projection to a plain dict"""
+
+    if fields is not None:
+        data = {
+            key: value if fields[key] is True or not isinstance(value, dict) else project_dict(value, fields[key])
+            for key, value in data.items() if key in fields
+        }
+    if exclude is not None:
+        data = {
+            key: value if not isinstance(exclude.get(key), dict) or not isinstance(value, dict)
+            else project_dict(value, exclude=exclude[key])
+            for key, value in data.items() if exclude.get(key) is not True
+        }
+    return data
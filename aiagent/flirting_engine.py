@@ -1,8 +1,9 @@
 """
 Advanced Flirting Engine for Context-Aware Conversation Generation
 """
-from typing import List, Dict, Any, Optional, Tuple
-import random
+from typing import List, Dict, Any, Optional, Tuple, Set, Sequence
+import itertools
+import threading
 from datetime import datetime
 
 from models import (
@@ -10,302 +11,129 @@ from models import (
     UserPreferences, PotentialMatch
 )
 from dating_agent import DatingAgent
+from message_store import CompactMessage
+from keyword_matcher import KeywordMatcher, grouped_hits
+from conversation_window import ConversationWindowCache
+from template_store import TemplateSet, TemplateSelector, get_template_store
+from tracing import TRACER
+from config import Config
+
+CUE_KEYWORDS = {
+    "question": ["?", "what", "how", "why", "when", "where", "which"],
+    "compliment": ["beautiful", "amazing", "wonderful", "great", "love", "impressed"],
+    "positive": ["happy", "excited", "love", "amazing", "wonderful", "great"],
+    "negative": ["sad", "upset", "disappointed", "frustrated", "angry"],
+    "affection": ["love", "loved", "loving", "enjoy", "enjoyed", "passion", "passionate"]
+}
+
+def _build_cue_matcher(templates: TemplateSet) -> KeywordMatcher:
+    """One automaton for cue words and topic names, built once per template version"""
+    return KeywordMatcher({
+        **CUE_KEYWORDS,
+        **{("topic", topic): [topic] for topic in templates.topics}
+    })
 
 class FlirtingEngine:
     """Advanced engine for generating context-aware flirty messages"""
     
-    def __init__(self):
-        """Initialize the flirting engine"""
-        self.dating_agent = DatingAgent()
-        
-        # Flirting templates organized by style and context
-        self.flirting_templates = {
-            "subtle": {
-                "openers": [
-                    "I couldn't help but notice...",
-                    "There's something intriguing about...",
-                    "I find myself drawn to...",
-                    "You seem like someone who...",
-                    "I have a feeling we'd get along because...",
-                    "I'm getting strong mainnet energy from your profile...",
-                    "Your code commits are giving me serious alpha vibes...",
-                    "I sense some serious Web3 intellect here...",
-                    "Your GitHub activity is making me curious...",
-                    "Your blockchain knowledge is giving me mainnet energy..."
-                ],
-                "playful": [
-                    "You've got me curious about...",
-                    "I'm betting you're the kind of person who...",
-                    "Something tells me you have great taste in...",
-                    "I'm getting the vibe that you...",
-                    "You strike me as someone who knows...",
-                    "I'm betting you have some hot takes on the latest protocol upgrades...",
-                    "Something tells me you're the kind of person who can explain DeFi to anyone...",
-                    "I'm getting excited thinking about our future discussions on tokenomics...",
-                    "You seem like someone who could teach me a thing or two about smart contracts...",
-                    "I'm getting strong builder vibes from your profile..."
-                ],
-                "compliments": [
-                    "Your perspective on {topic} is really refreshing",
-                    "I love how you think about {topic}",
-                    "You have such an interesting take on {topic}",
-                    "The way you describe {topic} is captivating",
-                    "Your insights about {topic} are spot on",
-                    "Your understanding of {topic} is incredibly attractive",
-                    "I love how you think about {topic} - it's giving me serious brain stimulation",
-                    "Your insights on {topic} are pure alpha",
-                    "The way you explain {topic} is making me fall for your intellect",
-                    "Your technical expertise in {topic} is mesmerizing"
-                ]
-            },
-            "moderate": {
-                "openers": [
-                    "You've definitely caught my attention with...",
-                    "I'm genuinely intrigued by your thoughts on...",
-                    "There's something about you that's really appealing...",
-                    "I find your approach to {topic} quite attractive",
-                    "You seem like exactly the kind of person I'd want to...",
-                    "Your Web3 knowledge is definitely catching my attention...",
-                    "I'm genuinely intrigued by your blockchain insights...",
-                    "There's something about your tech stack that's really appealing...",
-                    "I find your approach to DeFi quite attractive",
-                    "You seem like exactly the kind of developer I'd want to collaborate with..."
-                ],
-                "playful": [
-                    "I'm already imagining the conversations we could have about...",
-                    "You seem like someone who could teach me a thing or two about...",
-                    "I'm getting excited just thinking about discussing...",
-                    "Something tells me you're going to be trouble in the best way",
-                    "I can already tell we're going to have some great debates about...",
-                    "I'm already imagining our future hackathons together...",
-                    "You seem like someone who could teach me a thing or two about smart contracts...",
-                    "I'm getting excited just thinking about our technical discussions...",
-                    "Something tells me you're going to be trouble in the best way - like breaking production on a Friday",
-                    "I can already tell we're going to have some great debates about consensus mechanisms..."
-                ],
-                "compliments": [
-                    "Your intelligence about {topic} is incredibly attractive",
-                    "I'm drawn to how passionate you are about {topic}",
-                    "Your confidence when talking about {topic} is magnetic",
-                    "The way you light up when discussing {topic} is captivating",
-                    "Your expertise in {topic} is really impressive",
-                    "Your blockchain intelligence is incredibly attractive",
-                    "I'm drawn to how passionate you are about Web3",
-                    "Your confidence when talking about DeFi is magnetic",
-                    "The way you light up when discussing smart contracts is captivating",
-                    "Your technical expertise is really impressive"
-                ]
-            },
-            "bold": {
-                "openers": [
-                    "I have to say, you're exactly what I've been looking for...",
-                    "There's no way I'm letting someone this interesting slip away...",
-                    "I'm already planning our first date and we haven't even met...",
-                    "You've got me thinking about things I shouldn't be thinking about yet...",
-                    "I'm going to be honest - I'm completely smitten with your approach to...",
-                    "I have to say, your blockchain knowledge is exactly what I've been looking for...",
-                    "There's no way I'm letting someone this technically brilliant slip away...",
-                    "I'm already planning our first hackathon and we haven't even met...",
-                    "You've got me thinking about things I shouldn't be thinking about yet... like our DAO governance strategy...",
-                    "I'm going to be honest - I'm completely smitten with your smart contract skills..."
-                ],
-                "playful": [
-                    "I'm already imagining all the ways we could explore {topic} together",
-                    "You seem like the perfect person to get lost in conversation with about...",
-                    "I'm getting butterflies just thinking about our future discussions on...",
-                    "Something tells me you're going to be absolutely irresistible once we start talking",
-                    "I can already picture us having the most amazing conversations about...",
-                    "I'm already planning our first smart contract deployment together",
-                    "You seem like the perfect person to get lost in code reviews with",
-                    "I'm getting butterflies just thinking about our future technical discussions",
-                    "Something tells me you're going to be absolutely irresistible once we start talking about DeFi",
-                    "I can already picture us having the most amazing debates about consensus mechanisms"
-                ],
-                "compliments": [
-                    "Your passion for {topic} is absolutely intoxicating",
-                    "I'm completely captivated by your knowledge of {topic}",
-                    "Your perspective on {topic} is incredibly sexy",
-                    "The way you engage with {topic} is making me fall for you already",
-                    "Your expertise in {topic} is the most attractive thing about you",
-                    "Your passion for blockchain is absolutely intoxicating",
-                    "I'm completely captivated by your Web3 knowledge",
-                    "Your perspective on DeFi is incredibly sexy",
-                    "The way you engage with smart contracts is making me fall for you already",
-                    "Your technical expertise is the most attractive thing about you"
-                ]
-            }
-        }
+    def __init__(self, dating_agent: Optional[DatingAgent] = None):
+        """Initialize the flirting engine, sharing the app's DatingAgent when given"""
+        self.dating_agent = dating_agent or DatingAgent()
         
-        # Context-aware response patterns
-        self.context_patterns = {
-            "music": {
-                "questions": [
-                    "What's the last song that gave you chills?",
-                    "If you could only listen to one artist for the rest of your life, who would it be?",
-                    "What's a song that perfectly describes your mood right now?",
-                    "Do you have a go-to song for when you need to feel confident?",
-                    "What's the most unexpected genre you've fallen in love with?"
-                ],
-                "flirty_followups": [
-                    "I'm already imagining us sharing headphones and discovering new music together",
-                    "Your music taste is making me want to create the perfect playlist for you",
-                    "I have a feeling our music tastes would create some amazing chemistry",
-                    "I'm getting excited thinking about all the concerts we could go to together",
-                    "Your music preferences are giving me serious butterflies"
-                ]
-            },
-            "travel": {
-                "questions": [
-                    "What's the most spontaneous trip you've ever taken?",
-                    "If you could teleport anywhere right now, where would you go?",
-                    "What's a destination that completely changed your perspective?",
-                    "Do you prefer planned adventures or going with the flow?",
-                    "What's your dream destination that you haven't visited yet?"
-                ],
-                "flirty_followups": [
-                    "I'm already planning all the adventures we could have together",
-                    "Your wanderlust is incredibly attractive - I love that adventurous spirit",
-                    "I can picture us getting lost in amazing places and finding each other",
-                    "Your travel stories are making me want to explore the world with you",
-                    "I'm getting excited thinking about all the memories we could create together"
-                ]
-            },
-            "food": {
-                "questions": [
-                    "What's the most memorable meal you've ever had?",
-                    "If you could have dinner with anyone, living or dead, who would it be?",
-                    "What's your signature dish that always impresses people?",
-                    "Do you prefer cooking together or being surprised with a meal?",
-                    "What's a food experience that completely changed your mind about something?"
-                ],
-                "flirty_followups": [
-                    "I'm already imagining us cooking together and creating something delicious",
-                    "Your food preferences are making me want to cook you the perfect meal",
-                    "I have a feeling we'd have amazing chemistry in the kitchen",
-                    "Your culinary adventures are giving me serious foodie crushes",
-                    "I'm getting excited thinking about all the restaurants we could discover together"
-                ]
-            },
-            "defi": {
-                "questions": [
-                    "What's your go-to DeFi protocol for yield farming?",
-                    "If you could only use one DEX for the rest of your life, which would it be?",
-                    "What's the most innovative DeFi mechanism you've seen recently?",
-                    "Do you prefer automated or manual yield strategies?",
-                    "What's your take on the latest governance token distribution?"
-                ],
-                "flirty_followups": [
-                    "I'm already imagining us optimizing yield strategies together",
-                    "Your DeFi knowledge is making me want to create the perfect portfolio with you",
-                    "I have a feeling our DeFi strategies would create some amazing returns",
-                    "Your yield farming expertise is giving me serious financial butterflies",
-                    "I'm getting excited thinking about all the protocols we could explore together"
-                ]
-            },
-            "nft": {
-                "questions": [
-                    "What's the most meaningful NFT in your collection?",
-                    "If you could mint any NFT right now, what would it be?",
-                    "What's your favorite use case for NFTs beyond art?",
-                    "Do you prefer utility or aesthetic-focused NFTs?",
-                    "What's the most innovative NFT project you've seen?"
-                ],
-                "flirty_followups": [
-                    "I'm already planning our first collaborative NFT project",
-                    "Your NFT taste is incredibly attractive - I love that creative vision",
-                    "I can picture us curating the most amazing collection together",
-                    "Your NFT insights are making me want to create something beautiful with you",
-                    "I'm getting excited thinking about all the art we could discover together"
-                ]
-            },
-            "coding": {
-                "questions": [
-                    "What's your favorite programming language for blockchain development?",
-                    "If you could only use one development framework, what would it be?",
-                    "What's the most challenging smart contract you've written?",
-                    "Do you prefer test-driven or behavior-driven development?",
-                    "What's your go-to debugging strategy?"
-                ],
-                "flirty_followups": [
-                    "I'm already imagining us pairing on some complex smart contracts",
-                    "Your coding style is making me want to collaborate on the perfect dApp",
-                    "I have a feeling we'd have amazing chemistry in the development process",
-                    "Your technical expertise is giving me serious intellectual crushes",
-                    "I'm getting excited thinking about all the projects we could build together"
-                ]
-            },
-            "crypto": {
-                "questions": [
-                    "What's your most successful crypto trade?",
-                    "If you could only hold one crypto for the next 5 years, what would it be?",
-                    "What's your take on the current market cycle?",
-                    "Do you prefer fundamental or technical analysis?",
-                    "What's the most interesting crypto narrative you're following?"
-                ],
-                "flirty_followups": [
-                    "I'm already planning our first crypto research session together",
-                    "Your market insights are incredibly attractive",
-                    "I can picture us analyzing charts and finding the next gem together",
-                    "Your trading strategies are making me want to learn from you",
-                    "I'm getting excited thinking about all the alpha we could discover together"
-                ]
-            },
-            "blockchain": {
-                "questions": [
-                    "What's your favorite blockchain ecosystem and why?",
-                    "If you could improve one blockchain, which would it be and how?",
-                    "What's the most exciting blockchain innovation you've seen?",
-                    "Do you prefer layer 1 or layer 2 solutions?",
-                    "What's your take on the future of blockchain scalability?"
-                ],
-                "flirty_followups": [
-                    "I'm already imagining our future discussions about blockchain architecture",
-                    "Your blockchain insights are making me want to dive deeper into the tech with you",
-                    "I have a feeling we'd have amazing debates about consensus mechanisms",
-                    "Your technical knowledge is giving me serious brain stimulation",
-                    "I'm getting excited thinking about all the blockchain concepts we could explore together"
-                ]
-            }
-        }
+        # Templates and topic patterns come from the shared, versioned store
+        self._templates = get_template_store(
+            Config.FLIRTING_TEMPLATES_PATH, Config.TEMPLATE_RELOAD_INTERVAL
+        )
+        
+        # Engagement/topic aggregates over each conversation's last 5 messages
+        self._windows = ConversationWindowCache(
+            self._extract_topics_from_text,
+            window_size=5,
+            max_conversations=Config.CONTEXT_WINDOW_CACHE_SIZE
+        )
+        
+        # Selection outside a conversation uses a per-thread selector so
+        # threads never contend on one RNG
+        self._thread_selectors = threading.local()
+        self._thread_counter = itertools.count()
+    
+    @property
+    def flirting_templates(self) -> Dict[str, Dict[str, List[str]]]:
+        """Templates organized by style and context (read-only)"""
+        return self._templates.current.flirting_templates
+    
+    @property
+    def context_patterns(self) -> Dict[str, Dict[str, List[str]]]:
+        """Context-aware response patterns by topic (read-only)"""
+        return self._templates.current.context_patterns
+    
+    @property
+    def _cue_matcher(self) -> KeywordMatcher:
+        return self._templates.current.derived("cue_matcher", _build_cue_matcher)
+    
+    def _selector(self, context: Optional[ConversationContext]) -> TemplateSelector:
+        """Get the template selector for a conversation, seeded per conversation"""
+        
+        seed = Config.FLIRTING_SEED
+        
+        if context is None or not context.conversation_id:
+            selector = getattr(self._thread_selectors, "selector", None)
+            if selector is None:
+                thread_seed = None if seed is None else f"{seed}:thread:{next(self._thread_counter)}"
+                selector = self._thread_selectors.selector = TemplateSelector(thread_seed)
+            return selector
+        
+        window = self._windows.get(context.conversation_id)
+        if window.selector is None:
+            window.selector = TemplateSelector(
+                None if seed is None else f"{seed}:{context.conversation_id}"
+            )
+        return window.selector
     
     def generate_contextual_flirty_message(
         self,
         context: ConversationContext,
         flirting_style: FlirtingStyle,
         incoming_message: Optional[str] = None,
-        topic_context: Optional[str] = None
+        topic_context: Optional[str] = None,
+        records: Optional[Sequence[CompactMessage]] = None
     ) -> str:
-        """Generate a context-aware flirty message"""
+        """Generate a context-aware flirty message; records, when given, stand in for context.messages"""
         
-        # Analyze the conversation context
-        conversation_analysis = self._analyze_conversation_context(context)
-        
-        # Determine the appropriate flirting approach
-        approach = self._determine_flirting_approach(
-            conversation_analysis, flirting_style, incoming_message
-        )
-        
-        # Generate the message based on the approach
-        if approach == "question_based":
-            return self._generate_question_based_message(
-                context, flirting_style, topic_context
-            )
-        elif approach == "compliment_based":
-            return self._generate_compliment_based_message(
-                context, flirting_style, incoming_message
-            )
-        elif approach == "playful_teasing":
-            return self._generate_playful_teasing_message(
-                context, flirting_style, conversation_analysis
-            )
-        elif approach == "shared_interest":
-            return self._generate_shared_interest_message(
-                context, flirting_style, conversation_analysis
-            )
-        else:
-            return self._generate_general_flirty_message(
-                context, flirting_style, incoming_message
-            )
+        with TRACER.span("flirt.generate_contextual_message") as span:
+            # Analyze the conversation context
+            with TRACER.span("flirt.analyze_context"):
+                conversation_analysis = self._analyze_conversation_context(context, records)
+            
+            # Determine the appropriate flirting approach
+            with TRACER.span("flirt.determine_approach"):
+                approach = self._determine_flirting_approach(
+                    conversation_analysis, flirting_style, incoming_message
+                )
+            span.set("approach", approach)
+            
+            # Generate the message based on the approach
+            with TRACER.span("flirt.render_template", approach=approach):
+                if approach == "question_based":
+                    return self._generate_question_based_message(
+                        context, flirting_style, topic_context
+                    )
+                elif approach == "compliment_based":
+                    return self._generate_compliment_based_message(
+                        context, flirting_style, incoming_message
+                    )
+                elif approach == "playful_teasing":
+                    return self._generate_playful_teasing_message(
+                        context, flirting_style, conversation_analysis
+                    )
+                elif approach == "shared_interest":
+                    return self._generate_shared_interest_message(
+                        context, flirting_style, conversation_analysis
+                    )
+                else:
+                    return self._generate_general_flirty_message(
+                        context, flirting_style, incoming_message
+                    )
     
     def generate_opening_message(
         self,
@@ -352,11 +180,18 @@ class FlirtingEngine:
         else:
             return self._generate_continuation_message(context, flirting_style, last_message)
     
-    def _analyze_conversation_context(self, context: ConversationContext) -> Dict[str, Any]:
+    def _analyze_conversation_context(
+        self,
+        context: ConversationContext,
+        records: Optional[Sequence[CompactMessage]] = None
+    ) -> Dict[str, Any]:
         """Analyze the current conversation context"""
         
+        # Compact records carry message_id and content too, so the per-turn
+        # path never has to build ChatMessage models for the window
+        messages = context.messages if records is None else records
         analysis = {
-            "message_count": len(context.messages),
+            "message_count": len(messages),
             "conversation_tone": context.conversation_tone,
             "topics_discussed": context.topics_discussed,
             "engagement_level": "low",
@@ -364,21 +199,13 @@ class FlirtingEngine:
             "shared_interests": []
         }
         
-        if context.messages:
-            recent_messages = context.messages[-5:]
-            
-            # Analyze engagement level
-            message_lengths = [len(msg.content.split()) for msg in recent_messages]
-            avg_length = sum(message_lengths) / len(message_lengths)
-            
-            if avg_length > 15:
-                analysis["engagement_level"] = "high"
-            elif avg_length > 8:
-                analysis["engagement_level"] = "medium"
-            
-            # Extract topics from recent messages
-            topics = self._extract_topics_from_messages(recent_messages)
-            analysis["topics_discussed"] = topics
+        if messages:
+            # Window aggregates are updated only with messages not seen yet
+            window = self._windows.get(context.conversation_id)
+            with window.lock:
+                window.sync(messages)
+                analysis["engagement_level"] = window.engagement_level
+                analysis["topics_discussed"] = window.topics(self.context_patterns)
             
             # Find shared interests
             if context.match_profile:
@@ -407,7 +234,7 @@ class FlirtingEngine:
         
         # Medium engagement - use compliments and playful teasing
         elif engagement_level == "medium":
-            if incoming_message and any(word in incoming_message.lower() for word in ["love", "enjoy", "passion"]):
+            if incoming_message and "affection" in self._cue_matcher.categories(incoming_message):
                 return "compliment_based"
             else:
                 return "playful_teasing"
@@ -431,12 +258,20 @@ class FlirtingEngine:
         """Generate a question-based flirty message"""
         
         # Get relevant questions based on topic
-        if topic_context and topic_context in self.context_patterns:
-            questions = self.context_patterns[topic_context]["questions"]
-            flirty_followups = self.context_patterns[topic_context]["flirty_followups"]
-            
-            question = random.choice(questions)
-            followup = random.choice(flirty_followups)
+        templates = self._templates.current
+        questions = templates.pool("topic", topic_context, "questions") if topic_context else ()
+        flirty_followups = templates.pool("topic", topic_context, "flirty_followups") if topic_context else ()
+        
+        selector = self._selector(context)
+        
+        if questions and flirty_followups:
+            question = templates.pick(
+                questions, selector.position(("topic", topic_context, "questions"), len(questions))
+            ).text
+            followup = templates.pick(
+                flirty_followups,
+                selector.position(("topic", topic_context, "flirty_followups"), len(flirty_followups))
+            ).text
             
             return f"{question} {followup}"
         
@@ -449,7 +284,7 @@ class FlirtingEngine:
             "What's something that always makes you smile, no matter what?"
         ]
         
-        question = random.choice(generic_questions)
+        question = selector.choice("generic_questions", generic_questions)
         
         # Add flirty followup based on style
         if flirting_style.intensity == "bold":
@@ -474,13 +309,15 @@ class FlirtingEngine:
         
         # Get appropriate compliment templates
         intensity = flirting_style.intensity
-        templates = self.flirting_templates[intensity]["compliments"]
+        templates = self._templates.current
+        compliments = templates.pool("style", intensity, "compliments")
         
         # Find a topic to compliment about
         topic = self._extract_compliment_topic(incoming_message, context)
         
-        if topic and templates:
-            compliment = random.choice(templates).format(topic=topic)
+        if topic and compliments:
+            position = self._selector(context).position(("style", intensity, "compliments"), len(compliments))
+            compliment = templates.pick(compliments, position).render(topic=topic)
             return compliment
         
         # Fallback compliments
@@ -516,7 +353,7 @@ class FlirtingEngine:
                 "You seem like exactly the kind of person who'd keep me on my toes.",
                 "I'm already imagining all the interesting conversations we could have."
             ]
-            return random.choice(playful_messages)
+            return self._selector(context).choice("playful_messages", playful_messages)
     
     def _generate_shared_interest_message(
         self,
@@ -549,10 +386,12 @@ class FlirtingEngine:
         """Generate a general flirty message"""
         
         intensity = flirting_style.intensity
-        templates = self.flirting_templates[intensity]["openers"]
+        templates = self._templates.current
+        openers = templates.pool("style", intensity, "openers")
         
-        if templates:
-            opener = random.choice(templates)
+        if openers:
+            position = self._selector(context).position(("style", intensity, "openers"), len(openers))
+            opener = templates.pick(openers, position).text
             
             # Add personalization based on match profile
             if context.match_profile:
@@ -600,28 +439,26 @@ class FlirtingEngine:
     def _analyze_message_for_cues(self, message: str) -> Dict[str, Any]:
         """Analyze a message for response cues"""
         
-        message_lower = message.lower()
+        hits = self._cue_matcher.categories(message)
         
         cues = {
-            "question_asked": any(word in message_lower for word in ["?", "what", "how", "why", "when", "where", "which"]),
-            "compliment_given": any(word in message_lower for word in ["beautiful", "amazing", "wonderful", "great", "love", "impressed"]),
+            "question_asked": "question" in hits,
+            "compliment_given": "compliment" in hits,
             "topic_introduced": None,
             "emotional_tone": "neutral"
         }
         
         # Detect topic introduction
-        for topic, pattern in self.context_patterns.items():
-            if topic in message_lower:
+        topics = grouped_hits(hits, "topic")
+        for topic in self.context_patterns:
+            if topic in topics:
                 cues["topic_introduced"] = topic
                 break
         
         # Detect emotional tone
-        positive_words = ["happy", "excited", "love", "amazing", "wonderful", "great"]
-        negative_words = ["sad", "upset", "disappointed", "frustrated", "angry"]
-        
-        if any(word in message_lower for word in positive_words):
+        if "positive" in hits:
             cues["emotional_tone"] = "positive"
-        elif any(word in message_lower for word in negative_words):
+        elif "negative" in hits:
             cues["emotional_tone"] = "negative"
         
         return cues
@@ -634,8 +471,9 @@ class FlirtingEngine:
         """Extract a topic for complimenting from the message or context"""
         
         if message:
-            for topic in self.context_patterns.keys():
-                if topic in message.lower():
+            topics = grouped_hits(self._cue_matcher.categories(message), "topic")
+            for topic in self.context_patterns:
+                if topic in topics:
                     return topic
         
         # Use topics from conversation context
@@ -648,14 +486,15 @@ class FlirtingEngine:
         
         return None
     
+    def _extract_topics_from_text(self, text: str) -> Set[str]:
+        """Get the set of known topics mentioned in a text"""
+        return grouped_hits(self._cue_matcher.categories(text), "topic")
+    
     def _extract_topics_from_messages(self, messages: List[ChatMessage]) -> List[str]:
         """Extract topics from a list of messages"""
         
-        topics = []
-        all_content = " ".join([msg.content.lower() for msg in messages])
-        
-        for topic in self.context_patterns.keys():
-            if topic in all_content:
-                topics.append(topic)
+        hits = set()
+        for msg in messages:
+            hits |= self._extract_topics_from_text(msg.content)
         
-        return topics
+        return [topic for topic in self.context_patterns if topic in hits]
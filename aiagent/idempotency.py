@@ -0,0 +1,88 @@
+"""
+Idempotency-Key support: a retried request gets the original response instead of running again
+"""
+from typing import Any, Callable, Awaitable, Dict, Optional, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
+import json
+import time
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request"""
+
+class _Entry:
+    """Result (or pending result) of the latest request made with a key"""
+
+    __slots__ = ("fingerprint", "future", "expires_at", "state")
+
+    def __init__(self, fingerprint: str, future: "Optional[asyncio.Future[Any]]", expires_at: float):
+        self.fingerprint = fingerprint
+        self.future = future
+        self.expires_at = expires_at
+        self.state: Dict[str, Any] = {}
+
+    def failed(self) -> bool:
+        return self.future.done() and (self.future.cancelled() or self.future.exception() is not None)
+
+def request_fingerprint(*parts: Any) -> str:
+    """Stable digest of a request's path and body, to catch a key reused for something else"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(payload.encode("utf-8"), digest_size=16).hexdigest()
+
+class IdempotencyStore:
+    """Short-lived key -> response store; duplicates arriving while the first runs wait for it"""
+
+    def __init__(self, ttl: float = 3600.0, max_entries: int = 100000):
+        """Initialize the store; keys live for ttl seconds, the oldest are dropped past max_entries"""
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def _prune(self, now: float) -> None:
+        # Every entry gets the same TTL, so insertion order is expiry order. Entries
+        # still running are kept: duplicates are waiting on them
+        excess = len(self._entries) - self.max_entries + 1
+        evict = []
+        for key, entry in self._entries.items():
+            if entry.expires_at > now and len(evict) >= excess:
+                break
+            if entry.future.done():
+                evict.append(key)
+        for key in evict:
+            del self._entries[key]
+
+    async def run(
+        self,
+        key: str,
+        fingerprint: str,
+        compute: Callable[[Dict[str, Any]], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Return (result, replayed): compute(state) runs only until one request with this key succeeds"""
+
+        # A failed attempt is run again by the client's retry, with the same state
+        # dict, so work it already did (e.g. storing the user's message) is reused
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is not None and entry.expires_at <= now and entry.future.done():
+            del self._entries[key]
+            entry = None
+
+        if entry is not None:
+            if entry.fingerprint != fingerprint:
+                raise IdempotencyConflict(f"Idempotency key {key!r} was used for a different request")
+            if not entry.failed():
+                return await asyncio.shield(entry.future), True
+            self._entries.move_to_end(key)
+            entry.expires_at = now + self.ttl
+        else:
+            self._prune(now)
+            entry = self._entries[key] = _Entry(fingerprint, None, now + self.ttl)
+
+        # A task of its own, so a client that disconnects mid-request does not
+        # cancel the work its retry is about to wait for
+        entry.future = asyncio.ensure_future(compute(entry.state))
+        return await asyncio.shield(entry.future), False
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,48 @@
+"""
+Keyed async locks for serializing work per conversation
+"""
+from typing import Dict, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+
+class _KeyedEntry:
+    """Lock plus the number of tasks holding or waiting on it"""
+
+    __slots__ = ("lock", "users")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.users = 0
+
+class KeyedAsyncLock:
+    """One FIFO lock per key, created on demand and dropped when idle"""
+
+    def __init__(self):
+        """Initialize the lock table"""
+        self._entries: Dict[str, _KeyedEntry] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        """Hold the lock for a key; tasks on other keys are never blocked"""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _KeyedEntry()
+        entry.users += 1
+
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            # Nobody holds or waits on the key any more, so drop its entry
+            if entry.users == 0 and self._entries.get(key) is entry:
+                del self._entries[key]
+
+    def is_locked(self, key: str) -> bool:
+        """Check whether a key is currently held"""
+        entry = self._entries.get(key)
+        return bool(entry and entry.lock.locked())
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,127 @@
+"""
+Compiled multi-pattern keyword matcher (Aho-Corasick) for text classification
+"""
+from typing import List, Dict, Set, Tuple, Hashable, Iterable, Iterator, Mapping
+from collections import deque
+
+class KeywordMatcher:
+    """Finds every keyword category present in a text in one linear pass"""
+
+    def __init__(
+        self,
+        tables: Mapping[Hashable, Iterable[str]],
+        word_boundary: bool = True,
+        allow_plural: bool = True
+    ):
+        """Compile the automaton from a category -> keywords table"""
+        self.word_boundary = word_boundary
+        self.allow_plural = allow_plural
+
+        # Trie transitions, failure links and per-state outputs of
+        # (keyword, categories) for every keyword ending in that state
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[Tuple[str, Tuple[Hashable, ...]]]] = [[]]
+
+        keyword_categories: Dict[str, List[Hashable]] = {}
+        for category, keywords in tables.items():
+            for keyword in keywords:
+                keyword = keyword.lower()
+                if keyword:
+                    keyword_categories.setdefault(keyword, []).append(category)
+
+        for keyword, categories in keyword_categories.items():
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[state][char] = next_state
+                state = next_state
+            self._output[state].append((keyword, tuple(categories)))
+
+        self._build_failure_links()
+
+    def _build_failure_links(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+
+                # Inherit the outputs of the longest proper suffix state
+                self._output[next_state] = (
+                    self._output[next_state] + self._output[self._fail[next_state]]
+                )
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str, Tuple[Hashable, ...]]]:
+        """Yield (start, end, keyword, categories) for every accepted match"""
+
+        text = text.lower()
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+
+        for index, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+
+            for keyword, categories in output[state]:
+                start = index - len(keyword) + 1
+                end = index + 1
+                if self.word_boundary:
+                    end = self._boundary_end(text, start, end, keyword)
+                    if end < 0:
+                        continue
+                yield start, end, keyword, categories
+
+    def _boundary_end(self, text: str, start: int, end: int, keyword: str) -> int:
+        """Get the match end if it sits on word boundaries, else -1"""
+
+        # Like regex \b: only alphanumeric keyword edges need a boundary
+        if keyword[0].isalnum() and start > 0 and text[start - 1].isalnum():
+            return -1
+
+        if keyword[-1].isalnum() and end < len(text) and text[end].isalnum():
+            plural_end = end + 1
+            if not (
+                self.allow_plural
+                and text[end] == "s"
+                and (plural_end == len(text) or not text[plural_end].isalnum())
+            ):
+                return -1
+            end = plural_end
+
+        return end
+
+    def categories(self, text: str) -> Set[Hashable]:
+        """Get every category with at least one keyword in the text"""
+        found: Set[Hashable] = set()
+        for _, _, _, categories in self.iter_matches(text):
+            found.update(categories)
+        return found
+
+    def keywords(self, text: str) -> Set[str]:
+        """Get every distinct keyword found in the text"""
+        return {keyword for _, _, keyword, _ in self.iter_matches(text)}
+
+    def __contains__(self, text: str) -> bool:
+        return next(self.iter_matches(text), None) is not None
+
+def ordered_hits(table: Mapping[Hashable, Iterable[str]], hits: Set[Hashable]) -> List[Hashable]:
+    """Get the categories of a table that were hit, in table order"""
+    return [category for category in table if category in hits]
+
+def grouped_hits(hits: Set[Hashable], group: Hashable) -> Set[Hashable]:
+    """Get the names of (group, name) categories hit within one group"""
+    return {category[1] for category in hits if isinstance(category, tuple) and category[0] == group}
@@ -0,0 +1,326 @@
+"""
+In-process load test of the full API with a stubbed LLM backend
+"""
+from typing import List, Dict, Any, Optional, Callable, Tuple
+from types import SimpleNamespace
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from matching_benchmark import percentile
+from synthetic_profiles import SyntheticProfileGenerator
+
+DEFAULT_MIX = {
+    "create_user": 1,
+    "analyze": 2,
+    "create_conversation": 1,
+    "chat": 6,
+    "starters": 1
+}
+
+STUB_REPLIES = [
+    "You seem like someone with great taste in music. What's on repeat this week? 🎶",
+    "I have a feeling our conversations could go all night. Coffee first? ☕",
+    "Okay, you win the best bio award. What's the story behind it?",
+    "Bold move opening with that. I like it 😉"
+]
+STUB_STARTERS = json.dumps([
+    "What's the best concert you've ever been to?",
+    "If you could build any dApp, what would it be?",
+    "Beach weekend or mountain cabin?"
+])
+
+class StubLLMClient:
+    """Stands in for openai.OpenAI: blocks for a configurable latency, never touches the network"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.02, seed: int = 42):
+        """Initialize the stub; latency and jitter are in seconds"""
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model: str, messages: List[Dict[str, str]], **kwargs):
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self._rng.gauss(self.latency, self.jitter)) if self.latency else 0.0
+            reply = self._rng.choice(STUB_REPLIES)
+        if delay:
+            time.sleep(delay)  # the real client blocks its thread the same way
+
+        prompt = messages[-1]["content"] if messages else ""
+        content = STUB_STARTERS if "starter" in prompt.lower() else reply
+        prompt_tokens = sum(len(message["content"]) for message in messages) // 4
+        return SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(prompt_tokens=prompt_tokens, completion_tokens=len(content) // 4)
+        )
+
+# Durable stores and recorders load tests never write to: in-memory conversations only
+SCRATCH_DISABLED = ("CONVERSATION_WAL_DIR", "CONVERSATION_DB_PATH", "TRAFFIC_RECORD_PATH", "TRACE_EXPORT_PATH")
+
+def load_app(workdir: Optional[str] = None, client: Optional[StubLLMClient] = None):
+    """Import main.py against scratch storage and route every LLM call to the stub"""
+
+    workdir = workdir or tempfile.mkdtemp(prefix="celosoul-load-")
+    # Storage paths are read when config is imported, so they must be set first.
+    # They are assigned outright, so neither the shell nor .env can point a test
+    # at real data; an empty value also stops load_dotenv() filling the variable
+    os.environ["PROFILE_DB_PATH"] = os.path.join(workdir, "profiles.db")
+    os.environ["ARCHIVE_DIR"] = os.path.join(workdir, "archive")
+    for name in SCRATCH_DISABLED:
+        os.environ[name] = ""
+    os.environ.setdefault("OPENAI_API_KEY", "load-test")
+    if "main" in sys.modules:
+        print("⚠️  main.py was already imported; its storage paths are not scratch paths")
+
+    import main
+
+    client = client or StubLLMClient()
+    if main.components.initialized("llm_client") is None:
+        # Components stay unbuilt, so startup costs are still measured cold
+        main.components.provide("llm_client", client)
+    else:
+        main.components.dating_agent.client = client
+    return main, client
+
+class EndpointStats:
+    """Latencies and status codes for one operation"""
+
+    def __init__(self):
+        """Initialize empty stats"""
+        self.latencies: List[float] = []
+        self.statuses: Dict[int, int] = {}
+        self.errors = 0
+
+    def record(self, seconds: float, status: int) -> None:
+        self.latencies.append(seconds)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if status >= 400:
+            self.errors += 1
+
+    def to_dict(self, elapsed: float) -> Dict[str, Any]:
+        latencies = sorted(self.latencies)
+        return {
+            "requests": len(latencies),
+            "errors": self.errors,
+            "statuses": {str(status): count for status, count in sorted(self.statuses.items())},
+            "throughput_per_second": round(len(latencies) / elapsed, 1) if elapsed > 0 else None,
+            "p50_ms": round(percentile(latencies, 0.50) * 1e3, 2),
+            "p90_ms": round(percentile(latencies, 0.90) * 1e3, 2),
+            "p99_ms": round(percentile(latencies, 0.99) * 1e3, 2),
+            "max_ms": round(latencies[-1] * 1e3, 2) if latencies else None
+        }
+
+class LoadTest:
+    """Drives a weighted mix of API operations through an in-process ASGI client"""
+
+    def __init__(
+        self,
+        app,
+        concurrency: int = 20,
+        mix: Optional[Dict[str, float]] = None,
+        seed_users: int = 200,
+        candidate_limit: int = 200,
+        seed: int = 42
+    ):
+        """Initialize the load test"""
+        self.app = app
+        self.concurrency = concurrency
+        self.mix = mix or dict(DEFAULT_MIX)
+        self.seed_users = seed_users
+        self.candidate_limit = candidate_limit
+        self.generator = SyntheticProfileGenerator(seed)
+        self.rng = random.Random(seed)
+        self.stats: Dict[str, EndpointStats] = {name: EndpointStats() for name in self.mix}
+        self.user_ids: List[str] = []
+        self.conversations: List[Tuple[str, str, str]] = []  # (conversation id, user id, match id)
+        self.operations: Dict[str, Callable] = {
+            "create_user": self._create_user,
+            "analyze": self._analyze,
+            "create_conversation": self._create_conversation,
+            "chat": self._chat,
+            "starters": self._starters
+        }
+        unknown = set(self.mix) - set(self.operations)
+        if unknown:
+            raise ValueError(f"Unknown operations in mix: {', '.join(sorted(unknown))}")
+
+    async def _timed(self, name: str, request) -> Optional[Dict[str, Any]]:
+        started = time.perf_counter()
+        response = await request
+        self.stats.setdefault(name, EndpointStats()).record(time.perf_counter() - started, response.status_code)
+        if response.status_code >= 400:
+            return None
+        return response.json()
+
+    async def _create_user(self, client) -> None:
+        body = await self._timed("create_user", client.post("/users", json=self.generator.create_user_request()))
+        if body:
+            self.user_ids.append(body["data"]["user_id"])
+
+    async def _analyze(self, client) -> None:
+        await self._timed("analyze", client.post("/matches/analyze", json={
+            "user_id": self.rng.choice(self.user_ids),
+            "candidate_limit": self.candidate_limit
+        }))
+
+    async def _create_conversation(self, client) -> None:
+        user_id, match_id = self.rng.sample(self.user_ids, 2)
+        body = await self._timed("create_conversation", client.post(
+            "/conversations",
+            params={"user_id": user_id, "match_user_id": match_id},
+            json={"intensity": self.rng.choice(["subtle", "moderate", "bold"])}
+        ))
+        if body:
+            self.conversations.append((body["data"]["conversation_id"], user_id, match_id))
+
+    async def _chat(self, client) -> None:
+        if not self.conversations:
+            await self._create_conversation(client)
+            return
+        conversation_id, user_id, match_id = self.rng.choice(self.conversations)
+        await self._timed("chat", client.post("/chat", json={
+            "conversation_id": conversation_id,
+            "sender_id": user_id,
+            "receiver_id": match_id,
+            "message": self.rng.choice([
+                "Hey! How's your week going?",
+                "I saw you like hiking, any favourite trails?",
+                "Haha that's hilarious 😂",
+                "What are you building at the moment?",
+                "Would you be up for coffee this weekend?"
+            ])
+        }))
+
+    async def _starters(self, client) -> None:
+        candidate = self.generator.candidate()
+        await self._timed("starters", client.post(
+            f"/conversations/{self.rng.choice(self.user_ids)}/starters",
+            json={
+                "match_profile": {**candidate, "compatibility_score": round(self.rng.uniform(0.5, 0.95), 2)},
+                "user_preferences": {
+                    "music_genres": candidate["music_genres"],
+                    "hobbies": candidate["hobbies"],
+                    "personality_types": candidate["personality_types"]
+                },
+                "flirting_style": {"intensity": "moderate", "humor_level": "high"}
+            }
+        ))
+
+    async def run(self, duration: float = 30.0, max_requests: Optional[int] = None) -> Dict[str, Any]:
+        """Seed users, then run the mix until the duration or request budget is spent"""
+
+        import httpx
+
+        names = list(self.mix)
+        weights = [self.mix[name] for name in names]
+        issued = 0
+
+        async with self.app.router.lifespan_context(self.app):
+            transport = httpx.ASGITransport(app=self.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://load-test", timeout=None) as client:
+                seeding = time.perf_counter()
+                for _ in range(max(2, self.seed_users)):
+                    await self._create_user(client)
+                seed_seconds = time.perf_counter() - seeding
+                if len(self.user_ids) < 2:
+                    raise RuntimeError("Could not seed users; is the app healthy?")
+                # Seeding is setup, not part of the measured mix
+                self.stats = {name: EndpointStats() for name in self.mix}
+
+                deadline = time.perf_counter() + duration
+
+                async def worker() -> None:
+                    nonlocal issued
+                    while time.perf_counter() < deadline and (max_requests is None or issued < max_requests):
+                        issued += 1
+                        name = self.rng.choices(names, weights=weights)[0]
+                        await self.operations[name](client)
+
+                started = time.perf_counter()
+                await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+                elapsed = time.perf_counter() - started
+
+        total = sum(len(stats.latencies) for stats in self.stats.values())
+        return {
+            "benchmark": "load",
+            "created_at": datetime.now().isoformat(),
+            "concurrency": self.concurrency,
+            "mix": self.mix,
+            "seed_users": len(self.user_ids),
+            "seed_seconds": round(seed_seconds, 3),
+            "seconds": round(elapsed, 3),
+            "requests": total,
+            "throughput_per_second": round(total / elapsed, 1) if elapsed > 0 else None,
+            "endpoints": {name: stats.to_dict(elapsed) for name, stats in self.stats.items()}
+        }
+
+def parse_mix(spec: Optional[str]) -> Dict[str, float]:
+    """Turn "chat=6,analyze=2" into operation weights"""
+    if not spec:
+        return dict(DEFAULT_MIX)
+    mix = {}
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight or 1)
+    return {name: weight for name, weight in mix.items() if weight > 0}
+
+def main():
+    """Run the load test from the command line"""
+    parser = argparse.ArgumentParser(description="CeloSoul in-process API load test")
+    parser.add_argument("--concurrency", type=int, default=20, help="Concurrent virtual clients")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run the mix")
+    parser.add_argument("--requests", type=int, help="Stop after this many requests")
+    parser.add_argument("--mix", help=f"Operation weights, default {','.join(f'{k}={v}' for k, v in DEFAULT_MIX.items())}")
+    parser.add_argument("--seed-users", type=int, default=200, help="Users created before measuring")
+    parser.add_argument("--candidate-limit", type=int, default=200, help="Stored candidates per analyze call")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Mean stub LLM latency in seconds")
+    parser.add_argument("--llm-jitter", type=float, default=0.02)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--workdir", help="Directory for scratch databases (default: a new temp dir)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    stub = StubLLMClient(args.llm_latency, args.llm_jitter, args.seed)
+    app_module, stub = load_app(args.workdir, stub)
+    test = LoadTest(
+        app_module.app,
+        concurrency=args.concurrency,
+        mix=parse_mix(args.mix),
+        seed_users=args.seed_users,
+        candidate_limit=args.candidate_limit,
+        seed=args.seed
+    )
+    report = asyncio.run(test.run(args.duration, args.requests))
+    report["llm_calls"] = stub.calls
+    report["llm_latency"] = {"mean": args.llm_latency, "jitter": args.llm_jitter}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f"🚀 {report['requests']} requests in {report['seconds']}s "
+          f"({report['throughput_per_second']}/s, concurrency {report['concurrency']}, "
+          f"{report['llm_calls']} stub LLM calls)")
+    for name, stats in report["endpoints"].items():
+        print(f"   {name:<20} {stats['requests']:>6} req  {stats['throughput_per_second']}/s  "
+              f"p50 {stats['p50_ms']} ms  p90 {stats['p90_ms']} ms  p99 {stats['p99_ms']} ms  "
+              f"errors {stats['errors']}")
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,17 @@
 """
 Main API Interface for CeloSoul Dating AI Agent
 """
-from fastapi import FastAPI, HTTPException, Depends
+from fastapi import FastAPI, HTTPException, Depends, Request, Response, Header
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from pydantic import BaseModel
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import os
+import time
+import tracemalloc
 import uuid
 from datetime import datetime
 
@@ -12,17 +19,25 @@ from models import (
     UserProfile, UserPreferences, PotentialMatch, ChatMessage, 
     ConversationContext, FlirtingStyle, MatchAnalysis
 )
-from dating_agent import DatingAgent
-from preference_manager import PreferenceManager
-from matching_engine import MatchingEngine
-from conversation_manager import ConversationManager
-from flirting_engine import FlirtingEngine
+from container import Container
+from keyed_lock import KeyedAsyncLock
+from idempotency import IdempotencyStore, IdempotencyConflict, request_fingerprint
+from profile_ingest import CreateUserRequest, ProfileIngestor, build_profile, create_executor
+from fast_json import FastJSONResponse, fast_response, parse_projection, project, project_dict
+from metrics import REGISTRY, MetricsMiddleware, IDEMPOTENT_REPLAYS
+from tracing import TRACER, TracingMiddleware, MemoryExporter, JSONFileExporter, OTLPFileExporter
+from request_profiler import RequestProfilerMiddleware, is_admin
+from memory_report import memory_report
+from message_store import encode_cursor, decode_cursor
+from traffic_recorder import TrafficRecorderMiddleware, TrafficLogWriter
+from config import Config
 
 # Initialize FastAPI app
 app = FastAPI(
     title="CeloSoul Dating AI Agent",
     description="AI-powered dating assistant for matching and flirting",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=FastJSONResponse
 )
 
 # Add CORS middleware
@@ -33,42 +48,126 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(TracingMiddleware, admin_token=Config.ADMIN_TOKEN)
+app.add_middleware(MetricsMiddleware)
 
-# Initialize core components
-dating_agent = DatingAgent()
-preference_manager = PreferenceManager()
-matching_engine = MatchingEngine()
-conversation_manager = ConversationManager()
-flirting_engine = FlirtingEngine()
+# Per-request profiling exists only when an admin token is configured
+if Config.ADMIN_TOKEN:
+    app.add_middleware(
+        RequestProfilerMiddleware,
+        admin_token=Config.ADMIN_TOKEN,
+        output_dir=Config.PROFILE_OUTPUT_DIR,
+        default_output=Config.PROFILE_DEFAULT_OUTPUT,
+        sample_interval=Config.PROFILE_SAMPLE_INTERVAL
+    )
 
-# Request/Response Models
-class CreateUserRequest(BaseModel):
-    name: str
-    age: int
-    location: str
-    bio: str
-    interests: List[str] = []
-    photos: List[str] = []
-    personality_types: List[str] = []
-    music_genres: List[str] = []
-    hobbies: List[str] = []
-    behavior_signals: List[str] = []
-    age_range: Optional[tuple] = None
-    lifestyle_preferences: List[str] = []
-    deal_breakers: List[str] = []
-    must_haves: List[str] = []
-    web3_preferences: Optional[Dict[str, Any]] = None
+# Sanitized traffic capture for performance replays
+traffic_writer = TrafficLogWriter(Config.TRAFFIC_RECORD_PATH) if Config.TRAFFIC_RECORD_PATH else None
+if traffic_writer is not None:
+    app.add_middleware(
+        TrafficRecorderMiddleware,
+        writer=traffic_writer,
+        sample_rate=Config.TRAFFIC_RECORD_SAMPLE_RATE,
+        max_body_bytes=Config.TRAFFIC_RECORD_MAX_BODY_BYTES
+    )
+
+# Sampled traces stay in memory for /debug/traces and optionally go to a file
+trace_buffer = MemoryExporter(Config.TRACE_BUFFER_SIZE)
+trace_exporters = [trace_buffer]
+if Config.TRACE_EXPORT_PATH:
+    file_exporter = OTLPFileExporter if Config.TRACE_EXPORT_FORMAT == "otlp" else JSONFileExporter
+    trace_exporters.append(file_exporter(Config.TRACE_EXPORT_PATH))
+TRACER.configure(
+    sample_rate=Config.TRACE_SAMPLE_RATE,
+    exporters=trace_exporters,
+    max_spans=Config.TRACE_MAX_SPANS
+)
+
+# Core components are built on first use (or by the startup warm-up), once per process
+components = Container()
+components.register("llm_client", lambda c: c.import_module("openai").OpenAI(api_key=Config.OPENAI_API_KEY))
+components.register("dating_agent", lambda c: c.import_module("dating_agent").DatingAgent(c.llm_client))
+components.register("preference_manager", lambda c: c.import_module("preference_manager").PreferenceManager())
+components.register("matching_engine", lambda c: c.import_module("matching_engine").MatchingEngine())
+components.register("conversation_manager", lambda c: c.import_module("conversation_manager").ConversationManager())
+# One DatingAgent (client, tone model) serves the API and the flirting engine
+components.register("flirting_engine", lambda c: c.import_module("flirting_engine").FlirtingEngine(c.dating_agent))
+components.register("profile_repository", lambda c: c.import_module("profile_repository").ProfileRepository(
+    Config.PROFILE_DB_PATH,
+    cache_size=Config.PROFILE_CACHE_SIZE,
+    mmap_size=Config.SQLITE_MMAP_SIZE,
+    shared=Config.WORKERS > 1
+))
+# LLM rewrites of template replies, offered as suggested edits
+components.register("refinement_manager", lambda c: c.import_module("refinement_manager").RefinementManager(
+    max_concurrency=Config.REFINEMENT_CONCURRENCY,
+    max_records=Config.REFINEMENT_CACHE_SIZE,
+    timeout=Config.REFINEMENT_TIMEOUT
+))
+# One process pool for every bulk ingest, created on the first one (None: convert in-process)
+components.register(
+    "bulk_ingest_executor",
+    lambda c: create_executor(Config.BULK_INGEST_WORKERS) if Config.BULK_INGEST_WORKERS > 0 else None,
+    warm=False  # never built by warm-up, so a pre-fork master does not carry a pool across fork
+)
+
+async def require_admin(request: Request) -> None:
+    """Route dependency refusing requests without a valid X-Admin-Token; list it before needs(...)"""
+    if not is_admin(request.headers, Config.ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+def needs(*names: str):
+    """Route dependency building the named components in a worker thread, never on the event loop"""
+
+    # A component being built by the warm-up thread holds its lock until done; waiting
+    # for it here would stall every request on this worker, health checks included
+    async def build() -> None:
+        missing = [name for name in names if not components.built(name)]
+        if missing:
+            await asyncio.to_thread(components.warm, missing)
+
+    return Depends(build)
+
+# Turns within a conversation run one at a time, in arrival order
+conversation_locks = KeyedAsyncLock()
+
+@asynccontextmanager
+async def conversation_turn(conversation_id: str) -> AsyncIterator[None]:
+    """Hold a conversation's turn: in this worker, and in shared mode across every worker"""
+
+    # Local waiters queue on the async lock, so only the head of the queue
+    # polls the shared store for the lease
+    async with conversation_locks.hold(conversation_id):
+        manager = components.conversation_manager
+        if not manager.is_shared:
+            yield
+            return
+        owner = f"{os.getpid()}:{uuid.uuid4().hex}"
+        delay = 0.005
+        while not await asyncio.to_thread(manager.try_begin_turn, conversation_id, owner, Config.TURN_LEASE_SECONDS):
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 0.1)
+        try:
+            yield
+        finally:
+            await asyncio.to_thread(manager.end_turn, conversation_id, owner)
 
+# Retried /chat and starter requests carrying the same Idempotency-Key get the first response
+idempotency_store = IdempotencyStore(ttl=Config.IDEMPOTENCY_TTL, max_entries=Config.IDEMPOTENCY_MAX_KEYS)
+
+# Request/Response Models
 class ChatRequest(BaseModel):
     conversation_id: str
     sender_id: str
     receiver_id: str
     message: str
     flirting_style: Optional[Dict[str, str]] = None
+    refine_with_llm: Optional[bool] = None  # Defaults to Config.HYBRID_REFINEMENT
 
 class MatchAnalysisRequest(BaseModel):
     user_id: str
-    potential_matches: List[Dict[str, Any]]
+    potential_matches: List[Dict[str, Any]] = []  # Empty: use stored profiles as candidates
+    candidate_limit: int = 1000
 
 class ConversationStarterRequest(BaseModel):
     match_profile: Dict[str, Any]
@@ -80,10 +179,132 @@ class ResponseModel(BaseModel):
     message: str
     data: Optional[Dict[str, Any]] = None
 
-# In-memory storage (replace with database in production)
-user_profiles: Dict[str, UserProfile] = {}
 potential_matches: List[Dict[str, Any]] = []
 
+# Gauges report only components that exist; a scrape never builds one
+def _cache_hit_ratios() -> Dict[str, Optional[float]]:
+    repository = components.initialized("profile_repository")
+    if repository is None:
+        return {}
+    stats = repository.cache_stats()
+    lookups = stats["hits"] + stats["misses"]
+    return {"profiles": stats["hits"] / lookups if lookups else None}
+
+def _cascade_escalation_ratios() -> Dict[str, float]:
+    agent = components.initialized("dating_agent")
+    if agent is None:
+        return {}
+    return {task: stats["escalation_rate"] for task, stats in agent.cascade_metrics.snapshot().items()}
+
+def _conversation_counts() -> Dict[str, int]:
+    manager = components.initialized("conversation_manager")
+    if manager is None:
+        return {}
+    metrics = manager.store_metrics()
+    return {"active": metrics["active_conversations"], "archived": metrics["archived_conversations"]}
+
+def _cache_entries() -> Dict[str, Optional[int]]:
+    repository = components.initialized("profile_repository")
+    engine = components.initialized("flirting_engine")
+    return {
+        "profiles": repository.cache_stats()["cached_profiles"] if repository is not None else None,
+        "context_windows": len(engine._windows) if engine is not None else None
+    }
+
+def _stored_profiles() -> Optional[int]:
+    repository = components.initialized("profile_repository")
+    return repository.count() if repository is not None else None
+
+def _refinements_tracked() -> Optional[int]:
+    manager = components.initialized("refinement_manager")
+    return len(manager) if manager is not None else None
+
+# Subsystem gauges, read in a worker thread when /metrics is scraped
+REGISTRY.callback_gauge("celosoul_conversations", "Conversations in the store by state", _conversation_counts, ("state",))
+REGISTRY.callback_gauge("celosoul_profiles_stored", "Profiles in the profile database", _stored_profiles)
+REGISTRY.callback_gauge("celosoul_cache_entries", "Entries held by in-memory caches", _cache_entries, ("cache",))
+REGISTRY.callback_gauge("celosoul_cache_hit_ratio", "Hit ratio of in-memory caches since start", _cache_hit_ratios, ("cache",))
+REGISTRY.callback_gauge(
+    "celosoul_tone_cascade_escalation_ratio", "Share of tone/strategy requests escalated to the LLM",
+    _cascade_escalation_ratios, ("task",)
+)
+REGISTRY.callback_gauge("celosoul_refinements_tracked", "LLM refinement records held in memory", _refinements_tracked)
+REGISTRY.callback_gauge("celosoul_idempotency_keys", "Idempotency keys held in memory", lambda: len(idempotency_store))
+
+# Readiness of this worker; /ready stays 503 until its caches are warm
+worker_state: Dict[str, Any] = {"ready": False, "pid": os.getpid(), "warm_up": None}
+warm_up_task: Optional[asyncio.Task] = None
+
+def warm_caches() -> Dict[str, Any]:
+    """Build every component and load read-only assets and hot profiles so first requests skip the cold path"""
+    
+    started = time.perf_counter()
+    components.warm()
+    with components.timed("warm", "templates"):
+        templates = components.flirting_engine._templates.current
+        components.flirting_engine._cue_matcher
+    with components.timed("warm", "bio_similarity"):
+        components.matching_engine.warm_up()
+    with components.timed("warm", "profiles"):
+        profiles = components.profile_repository.warm(Config.WARM_PROFILE_COUNT)
+    
+    return {
+        "templates": len(templates.templates),
+        "tone_model": components.dating_agent.tone_classifier is not None,
+        "profiles": profiles,
+        "seconds": round(time.perf_counter() - started, 4)
+    }
+
+def release_connections() -> None:
+    """Close database connections, e.g. in a pre-fork master before forking"""
+    for name in ("profile_repository", "conversation_manager"):
+        component = components.initialized(name)
+        if component is not None:
+            component.close()
+
+async def _warm_up() -> None:
+    worker_state["warm_up"] = await asyncio.to_thread(warm_caches)
+    worker_state["ready"] = True
+
+def _warm_up_done(task: asyncio.Task) -> None:
+    if not task.cancelled() and task.exception() is not None:
+        print(f"Background warm-up failed: {task.exception()}")
+        worker_state["ready"] = True  # components still build on first use
+
+@app.on_event("startup")
+async def startup():
+    """Warm this worker's caches (per STARTUP_WARM_UP), then report ready"""
+    global warm_up_task
+    worker_state["pid"] = os.getpid()
+    worker_state["warm_up_mode"] = Config.STARTUP_WARM_UP
+    if Config.STARTUP_WARM_UP == "background":
+        # Serve at once; a request needing a component still being built waits for it in a thread
+        warm_up_task = asyncio.create_task(_warm_up())
+        warm_up_task.add_done_callback(_warm_up_done)
+    elif Config.STARTUP_WARM_UP == "lazy":
+        # Every component is built by the first request that needs it
+        worker_state["ready"] = True
+    else:
+        await _warm_up()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Flush durable state on shutdown"""
+    if warm_up_task is not None and not warm_up_task.done():
+        await asyncio.wait([warm_up_task])
+    refinements = components.initialized("refinement_manager")
+    if refinements is not None:
+        await refinements.close()
+    bulk_executor = components.initialized("bulk_ingest_executor")
+    if bulk_executor is not None:
+        bulk_executor.shutdown(wait=False)
+    release_connections()
+    for exporter in trace_exporters:
+        if hasattr(exporter, "close"):
+            exporter.close()
+    if traffic_writer is not None:
+        traffic_writer.close()
+
 @app.get("/")
 async def root():
     """Root endpoint"""
@@ -94,41 +315,61 @@ async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "timestamp": datetime.now()}
 
-@app.post("/users", response_model=ResponseModel)
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus text-format metrics for this worker"""
+    # Off the loop: callback gauges run SQL counts against the profile and shared conversation stores
+    body = await asyncio.to_thread(REGISTRY.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4; charset=utf-8")
+
+@app.get("/debug/traces", response_model=ResponseModel, dependencies=[Depends(require_admin)])
+async def get_traces(limit: int = 20, name: Optional[str] = None):
+    """Get the most recent sampled traces, newest first; admins send X-Trace-Sample: 1 to force one (admin only)"""
+    return fast_response(
+        success=True,
+        message="Traces retrieved successfully",
+        data={"sample_rate": TRACER.sample_rate, "traces": trace_buffer.recent(limit, name)}
+    )
+
+@app.get("/debug/memory", response_model=ResponseModel, dependencies=[Depends(require_admin), needs("conversation_manager", "profile_repository")])
+async def get_memory(top: int = 15, sample: int = 50, trace: Optional[str] = None):
+    """Memory held by this worker's stores; trace=start|stop toggles tracemalloc allocation sites (admin only)"""
+
+    if trace == "start" and not tracemalloc.is_tracing():
+        tracemalloc.start(10)
+    elif trace == "stop" and tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+    # Walks every live object; keep it off the event loop
+    report = await asyncio.to_thread(
+        memory_report, components.conversation_manager, components.profile_repository, top, sample
+    )
+    return fast_response(success=True, message="Memory report generated", data=report)
+
+@app.get("/debug/startup", response_model=ResponseModel)
+async def get_startup_report():
+    """Time spent per import, component init and warm-up step in this worker, in start order"""
+    return fast_response(
+        success=True,
+        message="Startup report retrieved successfully",
+        data={**components.startup_report(), "ready": worker_state["ready"], "warm_up_mode": Config.STARTUP_WARM_UP}
+    )
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint; 503 until this worker's caches are warm"""
+    if not worker_state["ready"]:
+        raise HTTPException(status_code=503, detail="Warming up")
+    return {"status": "ready", **worker_state}
+
+@app.post("/users", response_model=ResponseModel, dependencies=[needs("preference_manager", "profile_repository")])
 async def create_user(request: CreateUserRequest):
     """Create a new user profile"""
     try:
         user_id = str(uuid.uuid4())
+        profile = build_profile(request, components.preference_manager, user_id)
         
-        # Create user preferences
-        preferences = preference_manager.create_user_preferences(
-            personality_types=request.personality_types,
-            music_genres=request.music_genres,
-            hobbies=request.hobbies,
-            behavior_signals=request.behavior_signals,
-            age_range=request.age_range,
-            lifestyle_preferences=request.lifestyle_preferences,
-            deal_breakers=request.deal_breakers,
-            must_haves=request.must_haves
-        )
-        
-        # Add Web3 preferences if provided
-        if hasattr(request, 'web3_preferences') and request.web3_preferences:
-            preferences.web3_preferences = preference_manager.create_web3_preferences(**request.web3_preferences)
-        
-        # Create user profile
-        profile = UserProfile(
-            user_id=user_id,
-            name=request.name,
-            age=request.age,
-            location=request.location,
-            bio=request.bio,
-            preferences=preferences,
-            interests=request.interests,
-            photos=request.photos
-        )
-        
-        user_profiles[user_id] = profile
+        components.profile_repository.save(profile)
         
         return ResponseModel(
             success=True,
@@ -139,40 +380,77 @@ async def create_user(request: CreateUserRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating user: {str(e)}")
 
-@app.get("/users/{user_id}", response_model=ResponseModel)
-async def get_user(user_id: str):
-    """Get user profile by ID"""
-    if user_id not in user_profiles:
-        raise HTTPException(status_code=404, detail="User not found")
+@app.post("/users/bulk", response_model=ResponseModel, dependencies=[Depends(require_admin), needs("profile_repository", "bulk_ingest_executor")])
+async def bulk_create_users(request: Request):
+    """Create or update users from an NDJSON body, one CreateUserRequest per line (admin only: lines may overwrite by user_id)"""
+    ingestor = ProfileIngestor(
+        components.profile_repository,
+        chunk_size=Config.BULK_INGEST_CHUNK_SIZE,
+        max_errors=Config.BULK_INGEST_MAX_ERRORS,
+        executor=components.bulk_ingest_executor
+    )
+    report = await ingestor.ingest_stream(request.stream())
     
     return ResponseModel(
+        success=report.created > 0 or report.failed == 0,
+        message=f"Ingested {report.created} users, {report.failed} lines failed",
+        data=report.to_dict()
+    )
+
+@app.get("/users/{user_id}", response_model=ResponseModel, dependencies=[needs("profile_repository")])
+async def get_user(user_id: str, fields: Optional[str] = None, exclude: Optional[str] = None):
+    """Get user profile by ID; fields/exclude take comma-separated (dotted) field names"""
+    profile = components.profile_repository.get(user_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return fast_response(
         success=True,
         message="User retrieved successfully",
-        data={"profile": user_profiles[user_id].dict()}
+        data={"profile": project(profile, parse_projection(fields), parse_projection(exclude))}
     )
 
-@app.post("/matches/analyze", response_model=ResponseModel)
-async def analyze_matches(request: MatchAnalysisRequest):
-    """Analyze compatibility with potential matches"""
+@app.post("/matches/analyze", response_model=ResponseModel, dependencies=[needs("profile_repository", "matching_engine")])
+async def analyze_matches(
+    request: MatchAnalysisRequest,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    """Analyze compatibility with potential matches; fields/exclude project each match"""
     try:
-        if request.user_id not in user_profiles:
+        user_profile = components.profile_repository.get(request.user_id)
+        if not user_profile:
             raise HTTPException(status_code=404, detail="User not found")
         
-        user_profile = user_profiles[request.user_id]
-        
-        # Find best matches
-        best_matches = matching_engine.find_best_matches(
-            user_profile, 
-            request.potential_matches, 
+        # Without explicit candidates, score stored profiles in the user's age range
+        candidates = request.potential_matches
+        if not candidates:
+            # Profiles stored before age_range was validated may hold any tuple
+            age_range = user_profile.preferences.age_range
+            min_age, max_age = age_range if age_range and len(age_range) == 2 else (None, None)
+            candidates = components.profile_repository.load_candidates(
+                min_age=min_age,
+                max_age=max_age,
+                exclude_user_id=user_profile.user_id,
+                limit=request.candidate_limit
+            )
+        
+        # Find best matches; off the loop, as the first call may still import the vectorizer
+        best_matches = await asyncio.to_thread(
+            components.matching_engine.find_best_matches,
+            user_profile,
+            candidates,
             limit=10
         )
         
-        return ResponseModel(
+        include_fields, exclude_fields = parse_projection(fields), parse_projection(exclude)
+        
+        return fast_response(
             success=True,
             message="Matches analyzed successfully",
             data={
-                "matches": [match.dict() for match in best_matches],
-                "total_analyzed": len(request.potential_matches),
+                "matches": [project(match, include_fields, exclude_fields) for match in best_matches],
+                "total_analyzed": len(candidates),
                 "compatible_matches": len(best_matches)
             }
         )
@@ -180,7 +458,7 @@ async def analyze_matches(request: MatchAnalysisRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing matches: {str(e)}")
 
-@app.post("/conversations", response_model=ResponseModel)
+@app.post("/conversations", response_model=ResponseModel, dependencies=[needs("profile_repository", "conversation_manager")])
 async def create_conversation(
     user_id: str,
     match_user_id: str,
@@ -188,11 +466,10 @@ async def create_conversation(
 ):
     """Create a new conversation"""
     try:
-        if user_id not in user_profiles:
+        user_profile = components.profile_repository.get(user_id)
+        if not user_profile:
             raise HTTPException(status_code=404, detail="User not found")
         
-        user_profile = user_profiles[user_id]
-        
         # Create match profile (simplified for demo)
         match_profile = PotentialMatch(
             user_id=match_user_id,
@@ -215,8 +492,9 @@ async def create_conversation(
             nerd_factor=flirting_style.get("nerd_factor", "medium")
         )
         
-        # Create conversation
-        conversation_id = conversation_manager.create_conversation(
+        # Create conversation (in a thread: durable mode may wait for the journal commit)
+        conversation_id = await asyncio.to_thread(
+            components.conversation_manager.create_conversation,
             user_id, match_profile, user_profile.preferences, style
         )
         
@@ -229,75 +507,135 @@ async def create_conversation(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error creating conversation: {str(e)}")
 
-@app.post("/chat", response_model=ResponseModel)
-async def send_message(request: ChatRequest):
-    """Send a message and get AI response"""
+async def _idempotent(route: str, key: Optional[str], response: Response, fingerprint: str, compute):
+    """Run compute once per Idempotency-Key (again after a failure); repeats get the stored result with Idempotent-Replayed: true"""
+    if not key:
+        return await compute({})
     try:
-        # Add the user's message to conversation
-        user_message = conversation_manager.add_message(
-            request.conversation_id,
-            request.sender_id,
-            request.receiver_id,
-            request.message,
-            is_ai_generated=False
-        )
-        
-        # Get conversation context
-        context = conversation_manager.get_conversation_context(request.conversation_id)
-        if not context:
-            raise HTTPException(status_code=404, detail="Conversation not found")
-        
-        # Create flirting style
-        style_data = request.flirting_style or {}
-        flirting_style = FlirtingStyle(
-            intensity=style_data.get("intensity", "moderate"),
-            humor_level=style_data.get("humor_level", "medium"),
-            directness=style_data.get("directness", "balanced"),
-            emoji_usage=style_data.get("emoji_usage", "moderate"),
-            tech_level=style_data.get("tech_level", "balanced"),
-            web3_knowledge=style_data.get("web3_knowledge", "intermediate"),
-            crypto_enthusiasm=style_data.get("crypto_enthusiasm", "moderate"),
-            nerd_factor=style_data.get("nerd_factor", "medium")
-        )
-        
-        # Generate AI response
-        ai_response = flirting_engine.generate_contextual_flirty_message(
-            context, flirting_style, request.message
-        )
-        
-        # Add AI response to conversation
-        ai_message = conversation_manager.add_message(
-            request.conversation_id,
-            "ai_agent",
-            request.sender_id,
-            ai_response,
-            is_ai_generated=True
-        )
-        
-        return ResponseModel(
-            success=True,
-            message="Message sent and response generated",
-            data={
+        result, replayed = await idempotency_store.run(f"{route}:{key}", fingerprint, compute)
+    except IdempotencyConflict:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    if replayed:
+        IDEMPOTENT_REPLAYS.inc(route)
+        response.headers["Idempotent-Replayed"] = "true"
+    return result
+
+@app.post("/chat", response_model=ResponseModel, dependencies=[needs("conversation_manager", "flirting_engine", "refinement_manager", "dating_agent")])
+async def send_message(
+    request: ChatRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
+):
+    """Send a message and get AI response; a retry with the same Idempotency-Key is not stored or generated twice"""
+    return await _idempotent(
+        "chat", idempotency_key, response, request_fingerprint(request.dict()), lambda state: _send_message(request, state)
+    )
+
+async def _send_message(request: ChatRequest, state: Dict[str, Any]) -> ResponseModel:
+    try:
+        async with conversation_turn(request.conversation_id):
+            # Add the user's message to conversation, unless an earlier attempt
+            # with this Idempotency-Key already did and then failed
+            user_message = state.get("user_message")
+            if user_message is None:
+                # In a thread: durable mode may wait for the journal's group commit,
+                # which then batches the records of concurrent turns
+                with TRACER.span("chat.store_user_message"):
+                    user_message = await asyncio.to_thread(
+                        components.conversation_manager.add_message,
+                        request.conversation_id,
+                        request.sender_id,
+                        request.receiver_id,
+                        request.message,
+                        is_ai_generated=False
+                    )
+                state["user_message"] = user_message
+        
+            # Get conversation context; its messages stay compact records
+            with TRACER.span("chat.load_context"):
+                context, records = components.conversation_manager.get_turn_context(request.conversation_id)
+            if not context:
+                raise HTTPException(status_code=404, detail="Conversation not found")
+        
+            # Create flirting style
+            style_data = request.flirting_style or {}
+            flirting_style = FlirtingStyle(
+                intensity=style_data.get("intensity", "moderate"),
+                humor_level=style_data.get("humor_level", "medium"),
+                directness=style_data.get("directness", "balanced"),
+                emoji_usage=style_data.get("emoji_usage", "moderate"),
+                tech_level=style_data.get("tech_level", "balanced"),
+                web3_knowledge=style_data.get("web3_knowledge", "intermediate"),
+                crypto_enthusiasm=style_data.get("crypto_enthusiasm", "moderate"),
+                nerd_factor=style_data.get("nerd_factor", "medium")
+            )
+        
+            # Generate AI response off the event loop so other conversations keep moving
+            ai_response = await asyncio.to_thread(
+                components.flirting_engine.generate_contextual_flirty_message,
+                context, flirting_style, request.message, records=records
+            )
+        
+            # Add AI response to conversation
+            with TRACER.span("chat.store_ai_message"):
+                ai_message = await asyncio.to_thread(
+                    components.conversation_manager.add_message,
+                    request.conversation_id,
+                    "ai_agent",
+                    request.sender_id,
+                    ai_response,
+                    is_ai_generated=True
+                )
+        
+            data = {
                 "user_message": user_message.dict(),
                 "ai_response": ai_message.dict(),
                 "conversation_id": request.conversation_id
             }
-        )
+        
+            # Hybrid mode: the template reply goes out now and the LLM version
+            # arrives later as a suggested edit
+            refine = request.refine_with_llm
+            if refine is None:
+                refine = Config.HYBRID_REFINEMENT
+            if refine:
+                # Only the LLM prompt needs ChatMessages, and only its last few
+                history = records[-components.dating_agent.PROMPT_HISTORY_MESSAGES:]
+                context = context.copy(update={"messages": [message.to_message() for message in history]})
+                record = components.refinement_manager.schedule(
+                    request.conversation_id,
+                    ai_message.message_id,
+                    ai_response,
+                    components.dating_agent.generate_flirty_message,
+                    context, flirting_style, request.message
+                )
+                data["refinement"] = {"message_id": ai_message.message_id, "status": record["status"]}
+        
+            return ResponseModel(
+                success=True,
+                message="Message sent and response generated",
+                data=data
+            )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing message: {str(e)}")
 
-@app.post("/conversations/{conversation_id}/starters", response_model=ResponseModel)
+@app.post("/conversations/{conversation_id}/starters", response_model=ResponseModel, dependencies=[needs("preference_manager", "dating_agent")])
 async def generate_conversation_starters(
     conversation_id: str,
-    request: ConversationStarterRequest
+    request: ConversationStarterRequest,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key", max_length=255)
 ):
     """Generate conversation starters for a match"""
+    return await _idempotent(
+        "starters", idempotency_key, response,
+        request_fingerprint(conversation_id, request.dict()),
+        lambda state: _generate_conversation_starters(request)
+    )
+
+async def _generate_conversation_starters(request: ConversationStarterRequest) -> ResponseModel:
     try:
-        # Debug: Print the request data
-        print(f"DEBUG: match_profile data: {request.match_profile}")
-        print(f"DEBUG: compatibility_score in data: {request.match_profile.get('compatibility_score')}")
-        
         # Create flirting style
         flirting_style = FlirtingStyle(
             intensity=request.flirting_style.get("intensity", "moderate"),
@@ -324,7 +662,7 @@ async def generate_conversation_starters(
         )
         
         # Create user preferences
-        preferences = preference_manager.create_user_preferences(
+        preferences = components.preference_manager.create_user_preferences(
             personality_types=request.user_preferences.get("personality_types", []),
             music_genres=request.user_preferences.get("music_genres", []),
             hobbies=request.user_preferences.get("hobbies", []),
@@ -334,7 +672,7 @@ async def generate_conversation_starters(
         )
         
         # Generate conversation starters
-        starters = dating_agent.generate_conversation_starter(
+        starters = components.dating_agent.generate_conversation_starter(
             match_profile, preferences, flirting_style
         )
         
@@ -347,15 +685,15 @@ async def generate_conversation_starters(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating starters: {str(e)}")
 
-@app.get("/conversations/{conversation_id}", response_model=ResponseModel)
+@app.get("/conversations/{conversation_id}", response_model=ResponseModel, dependencies=[needs("conversation_manager")])
 async def get_conversation(conversation_id: str):
     """Get conversation details and history"""
     try:
-        context = conversation_manager.get_conversation_context(conversation_id)
+        context = components.conversation_manager.get_conversation_context(conversation_id)
         if not context:
             raise HTTPException(status_code=404, detail="Conversation not found")
         
-        summary = conversation_manager.get_conversation_summary(conversation_id)
+        summary = components.conversation_manager.get_conversation_summary(conversation_id)
         
         return ResponseModel(
             success=True,
@@ -366,26 +704,72 @@ async def get_conversation(conversation_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving conversation: {str(e)}")
 
-@app.get("/conversations/{conversation_id}/messages", response_model=ResponseModel)
-async def get_conversation_messages(conversation_id: str, limit: int = 20):
-    """Get conversation messages"""
+@app.get("/conversations/{conversation_id}/messages", response_model=ResponseModel, dependencies=[needs("conversation_manager")])
+async def get_conversation_messages(
+    conversation_id: str,
+    limit: int = 20,
+    before: Optional[str] = None,
+    fields: Optional[str] = None,
+    exclude: Optional[str] = None
+):
+    """Get conversation messages, newest page first; pass next_cursor back as `before` for older pages"""
+    try:
+        before_key = decode_cursor(before) if before else None
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
     try:
-        messages = conversation_manager.get_recent_messages(conversation_id, limit)
+        messages, next_key = components.conversation_manager.get_message_page(conversation_id, limit, before_key)
+        include_fields, exclude_fields = parse_projection(fields), parse_projection(exclude)
+        if include_fields or exclude_fields:
+            messages = [project_dict(message, include_fields, exclude_fields) for message in messages]
         
-        return ResponseModel(
+        return fast_response(
             success=True,
             message="Messages retrieved successfully",
-            data={"messages": [msg.dict() for msg in messages]}
+            data={"messages": messages, "next_cursor": encode_cursor(next_key) if next_key else None}
         )
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving messages: {str(e)}")
 
-@app.get("/conversations/{conversation_id}/analysis", response_model=ResponseModel)
+@app.get("/conversations/{conversation_id}/refinements", response_model=ResponseModel, dependencies=[needs("refinement_manager")])
+async def get_conversation_refinements(conversation_id: str):
+    """Get LLM refinements suggested for a conversation's AI replies"""
+    return ResponseModel(
+        success=True,
+        message="Refinements retrieved successfully",
+        data={"refinements": components.refinement_manager.for_conversation(conversation_id)}
+    )
+
+@app.get("/conversations/{conversation_id}/refinements/stream", dependencies=[needs("refinement_manager")])
+async def stream_conversation_refinements(conversation_id: str):
+    """Push LLM refinements for a conversation as server-sent events"""
+    
+    async def events():
+        async for record in components.refinement_manager.subscribe(conversation_id):
+            yield f"event: refinement\ndata: {json.dumps(record)}\n\n"
+    
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+@app.get("/conversations/{conversation_id}/messages/{message_id}/refinement", response_model=ResponseModel, dependencies=[needs("refinement_manager")])
+async def get_message_refinement(conversation_id: str, message_id: str):
+    """Get the LLM refinement suggested for one AI reply"""
+    record = components.refinement_manager.get(message_id)
+    if not record or record["conversation_id"] != conversation_id:
+        raise HTTPException(status_code=404, detail="Refinement not found")
+    
+    return ResponseModel(
+        success=True,
+        message="Refinement retrieved successfully",
+        data=record
+    )
+
+@app.get("/conversations/{conversation_id}/analysis", response_model=ResponseModel, dependencies=[needs("conversation_manager")])
 async def analyze_conversation(conversation_id: str):
     """Analyze conversation flow and engagement"""
     try:
-        analysis = conversation_manager.analyze_conversation_flow(conversation_id)
+        analysis = components.conversation_manager.analyze_conversation_flow(conversation_id)
         
         return ResponseModel(
             success=True,
@@ -396,7 +780,22 @@ async def analyze_conversation(conversation_id: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing conversation: {str(e)}")
 
-@app.post("/preferences/analyze-behavior", response_model=ResponseModel)
+@app.get("/classifier/metrics", response_model=ResponseModel, dependencies=[needs("dating_agent")])
+async def get_classifier_metrics():
+    """Get local-classifier vs LLM cascade metrics"""
+    classifier = components.dating_agent.tone_classifier
+    return ResponseModel(
+        success=True,
+        message="Classifier metrics retrieved successfully",
+        data={
+            "model_loaded": classifier is not None,
+            "confidence_threshold": Config.TONE_CONFIDENCE_THRESHOLD,
+            "offline_cv_accuracy": classifier.metadata.get("cv_accuracy") if classifier else None,
+            "tasks": components.dating_agent.cascade_metrics.snapshot()
+        }
+    )
+
+@app.post("/preferences/analyze-behavior", response_model=ResponseModel, dependencies=[needs("profile_repository", "preference_manager")])
 async def analyze_user_behavior(
     user_id: str,
     messages: List[str],
@@ -404,10 +803,10 @@ async def analyze_user_behavior(
 ):
     """Analyze user behavior from messages and profile"""
     try:
-        if user_id not in user_profiles:
+        if user_id not in components.profile_repository:
             raise HTTPException(status_code=404, detail="User not found")
         
-        behavior_signals = preference_manager.analyze_user_behavior(messages, profile_data)
+        behavior_signals = components.preference_manager.analyze_user_behavior(messages, profile_data)
         
         return ResponseModel(
             success=True,
@@ -418,15 +817,16 @@ async def analyze_user_behavior(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing behavior: {str(e)}")
 
-@app.get("/users/{user_id}/preferences", response_model=ResponseModel)
+@app.get("/users/{user_id}/preferences", response_model=ResponseModel, dependencies=[needs("profile_repository", "preference_manager")])
 async def get_user_preferences(user_id: str):
     """Get user preferences summary"""
     try:
-        if user_id not in user_profiles:
+        user_profile = components.profile_repository.get(user_id)
+        if not user_profile:
             raise HTTPException(status_code=404, detail="User not found")
         
-        preferences = user_profiles[user_id].preferences
-        summary = preference_manager.get_preference_summary(preferences)
+        preferences = user_profile.preferences
+        summary = components.preference_manager.get_preference_summary(preferences)
         
         return ResponseModel(
             success=True,
@@ -0,0 +1,257 @@
+"""
+Matching engine benchmarks over seeded synthetic candidate pools
+"""
+from typing import List, Dict, Any, Callable, Optional, Sequence
+from datetime import datetime
+import argparse
+import gc
+import json
+import platform
+import resource
+import sys
+import time
+import tracemalloc
+
+from matching_engine import MatchingEngine
+from synthetic_profiles import SyntheticProfileGenerator
+
+DEFAULT_SIZES = (1000, 10000, 100000, 1000000)
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted sequence"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(maxrss / (1 << 20 if sys.platform == "darwin" else 1 << 10), 1)
+
+def _latency_summary(durations_ns: List[int]) -> Dict[str, Any]:
+    durations = sorted(durations_ns)
+    total_seconds = sum(durations) / 1e9
+    return {
+        "calls": len(durations),
+        "throughput_per_second": round(len(durations) / total_seconds, 1) if total_seconds > 0 else None,
+        "mean_ms": round(total_seconds * 1e3 / len(durations), 4) if durations else None,
+        "p50_ms": round(percentile(durations, 0.50) / 1e6, 4),
+        "p99_ms": round(percentile(durations, 0.99) / 1e6, 4),
+        "max_ms": round(durations[-1] / 1e6, 4) if durations else None
+    }
+
+def _peak_bytes(run: Callable[[], Any]) -> int:
+    """Peak traced allocation while run() executes, above what was live before"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - baseline
+
+def _per_call(
+    call: Callable[[int], Any],
+    sample: int,
+    memory_sample: int
+) -> Dict[str, Any]:
+    """Time call(i) for each sampled index, then trace a shorter pass for peak memory"""
+
+    durations = []
+    perf_counter_ns = time.perf_counter_ns
+    for i in range(sample):
+        started = perf_counter_ns()
+        call(i)
+        durations.append(perf_counter_ns() - started)
+
+    result = _latency_summary(durations)
+    result["peak_bytes"] = _peak_bytes(lambda: [call(i) for i in range(min(sample, memory_sample))])
+    result["memory_calls"] = min(sample, memory_sample)
+    return result
+
+def benchmark_size(
+    size: int,
+    seed: int = 42,
+    sample: int = 1000,
+    memory_sample: int = 200,
+    users: int = 20,
+    max_scan: Optional[int] = 100000,
+    scan_repeats: int = 1
+) -> Dict[str, Any]:
+    """Benchmark the matching engine against a pool of size candidates"""
+
+    engine = MatchingEngine()
+    generator = SyntheticProfileGenerator(seed)
+    # Alternate web3 and plain users so both scoring paths are measured
+    profiles = [generator.user_profile(f"bench-user-{i}", web3=i % 2 == 0) for i in range(users)]
+
+    gc.collect()
+    tracemalloc.start()
+    started = time.perf_counter()
+    pool = list(generator.candidates(size))
+    generation_seconds = time.perf_counter() - started
+    pool_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    # Sampled calls stride across the pool so every size sees the same mix
+    stride = max(1, size // sample)
+    picks = [pool[(i * stride) % size] for i in range(sample)]
+
+    # The vectorizer (and sklearn) load on first use; pay that before timing
+    engine.warm_up()
+    engine.analyze_compatibility(profiles[0], picks[0])
+
+    result: Dict[str, Any] = {
+        "candidates": size,
+        "pool": {
+            "generation_seconds": round(generation_seconds, 3),
+            "bytes": pool_bytes,
+            "bytes_per_candidate": round(pool_bytes / size, 1),
+            "web3_share": round(sum(1 for c in pool if c["web3_preferences"]) / size, 3)
+        },
+        "analyze_compatibility": _per_call(
+            lambda i: engine.analyze_compatibility(profiles[i % users], picks[i]), sample, memory_sample
+        ),
+        "bio_similarity": _per_call(
+            lambda i: engine._calculate_bio_similarity(profiles[i % users].bio, picks[i]["bio"]),
+            sample, memory_sample
+        )
+    }
+
+    if max_scan and size > max_scan:
+        result["find_best_matches"] = {"skipped": f"pool larger than --max-scan {max_scan}"}
+    else:
+        durations = []
+        matched = 0
+        for repeat in range(scan_repeats):
+            started = time.perf_counter_ns()
+            matched = len(engine.find_best_matches(profiles[repeat % users], pool, limit=10))
+            durations.append(time.perf_counter_ns() - started)
+        scan = _latency_summary(durations)
+        scan["candidates_per_second"] = round(size * len(durations) / (sum(durations) / 1e9), 1)
+        scan["returned"] = matched
+        result["find_best_matches"] = scan
+
+    result["max_rss_mb"] = _max_rss_mb()
+    del pool, picks
+    gc.collect()
+    return result
+
+def run_benchmarks(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    seed: int = 42,
+    sample: int = 1000,
+    memory_sample: int = 200,
+    users: int = 20,
+    max_scan: Optional[int] = 100000,
+    scan_repeats: int = 1,
+    progress: Callable[[str], None] = lambda message: None
+) -> Dict[str, Any]:
+    """Run every size and return one JSON-ready report"""
+
+    results = []
+    for size in sizes:
+        progress(f"⏱️  {size} candidates...")
+        results.append(benchmark_size(size, seed, sample, memory_sample, users, max_scan, scan_repeats))
+
+    return {
+        "benchmark": "matching",
+        "created_at": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": seed,
+        "sample": sample,
+        "results": results
+    }
+
+# (section, metric, higher is better) pairs checked against a baseline report
+TRACKED_METRICS = [
+    ("analyze_compatibility", "throughput_per_second", True),
+    ("analyze_compatibility", "p99_ms", False),
+    ("bio_similarity", "throughput_per_second", True),
+    ("bio_similarity", "p99_ms", False),
+    ("find_best_matches", "candidates_per_second", True)
+]
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """Describe every tracked metric that got worse than the baseline by more than tolerance"""
+
+    previous = {result["candidates"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["candidates"])
+        if before is None:
+            continue
+        for section, metric, higher_is_better in TRACKED_METRICS:
+            old = before.get(section, {}).get(metric)
+            new = result.get(section, {}).get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if (higher_is_better and change < -tolerance) or (not higher_is_better and change > tolerance):
+                regressions.append(
+                    f"{result['candidates']} candidates {section}.{metric}: {old} -> {new} ({change:+.1%})"
+                )
+    return regressions
+
+def main():
+    """Run the matching benchmarks from the command line"""
+    parser = argparse.ArgumentParser(description="CeloSoul matching engine benchmarks")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="Comma-separated candidate pool sizes")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--sample", type=int, default=1000, help="Timed calls per per-candidate benchmark")
+    parser.add_argument("--memory-sample", type=int, default=200, help="Calls traced for peak memory")
+    parser.add_argument("--users", type=int, default=20, help="Distinct users the calls rotate through")
+    parser.add_argument("--max-scan", type=int, default=100000,
+                        help="Largest pool scored end to end by find_best_matches (0 = no limit)")
+    parser.add_argument("--scan-repeats", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    report = run_benchmarks(
+        sizes, args.seed, args.sample, args.memory_sample, args.users, args.max_scan or None, args.scan_repeats,
+        progress=(lambda message: None) if args.json else print
+    )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_reports(json.load(f), report, args.tolerance)
+        report["regressions"] = regressions
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for result in report["results"]:
+            pool = result["pool"]
+            print(f"📊 {result['candidates']} candidates "
+                  f"({pool['bytes_per_candidate']} bytes/candidate, {pool['web3_share']:.0%} web3, "
+                  f"max RSS {result['max_rss_mb']} MB)")
+            for section in ("analyze_compatibility", "bio_similarity"):
+                stats = result[section]
+                print(f"   {section}: {stats['throughput_per_second']}/s, "
+                      f"p50 {stats['p50_ms']} ms, p99 {stats['p99_ms']} ms, peak {stats['peak_bytes']} bytes")
+            scan = result["find_best_matches"]
+            if "skipped" in scan:
+                print(f"   find_best_matches: skipped ({scan['skipped']})")
+            else:
+                print(f"   find_best_matches: {scan['candidates_per_second']} candidates/s, "
+                      f"p50 {scan['p50_ms']} ms per scan")
+        for regression in regressions:
+            print(f"❌ Regression: {regression}")
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -3,14 +3,15 @@ Matching Engine for Compatibility Analysis
 """
 from typing import List, Dict, Any, Tuple, Optional
 import numpy as np
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
 from datetime import datetime
+import time
 
 from models import (
     UserProfile, UserPreferences, PotentialMatch, MatchAnalysis,
-    PersonalityType, MusicGenre, BehaviorSignal
+    PersonalityType, MusicGenre, BehaviorSignal, Web3Preferences
 )
+from metrics import MATCH_CANDIDATES, MATCH_SCORING_SECONDS
+from tracing import TRACER
 
 class MatchingEngine:
     """Engine for analyzing compatibility between users and potential matches"""
@@ -25,12 +26,29 @@ class MatchingEngine:
             "lifestyle": 0.1
         }
         
-        # Initialize text vectorizer for bio similarity
-        self.vectorizer = TfidfVectorizer(
-            max_features=100,
-            stop_words='english',
-            ngram_range=(1, 2)
-        )
+        # Text vectorizer for bio similarity; sklearn takes over a second to
+        # import, so it is loaded on first use (or by warm_up) rather than here
+        self._vectorizer = None
+        self._cosine_similarity = None
+    
+    @property
+    def vectorizer(self):
+        """TF-IDF vectorizer for bio similarity, importing sklearn on first use"""
+        if self._vectorizer is None:
+            from sklearn.feature_extraction.text import TfidfVectorizer
+            from sklearn.metrics.pairwise import cosine_similarity
+            
+            self._cosine_similarity = cosine_similarity
+            self._vectorizer = TfidfVectorizer(
+                max_features=100,
+                stop_words='english',
+                ngram_range=(1, 2)
+            )
+        return self._vectorizer
+    
+    def warm_up(self) -> None:
+        """Load the bio similarity model now instead of on the first analysis"""
+        self.vectorizer
     
     def analyze_compatibility(
         self, 
@@ -39,125 +57,123 @@ class MatchingEngine:
     ) -> MatchAnalysis:
         """Analyze compatibility between user and potential match"""
         
-        # Calculate individual compatibility scores
-        music_score = self._calculate_music_compatibility(
-            user_profile.preferences.music_genres,
-            potential_match.get("music_genres", [])
-        )
-        
-        hobby_score = self._calculate_hobby_compatibility(
-            user_profile.preferences.hobbies,
-            potential_match.get("hobbies", [])
-        )
-        
-        personality_score = self._calculate_personality_compatibility(
-            user_profile.preferences.personality_types,
-            potential_match.get("personality_types", [])
-        )
-        
-        behavior_score = self._calculate_behavior_compatibility(
-            user_profile.preferences.behavior_signals,
-            potential_match.get("behavior_signals", [])
-        )
-        
-        lifestyle_score = self._calculate_lifestyle_compatibility(
-            user_profile.preferences.lifestyle_preferences,
-            potential_match.get("lifestyle_preferences", [])
-        )
-        
-        # Calculate bio similarity
-        bio_similarity = self._calculate_bio_similarity(
-            user_profile.bio,
-            potential_match.get("bio", "")
-        )
-        
-        # Calculate tech compatibility if Web3 preferences exist
-        tech_score = 0.0
-        blockchain_score = 0.0
-        dev_synergy = 0.0
-        trading_alignment = 0.0
-        community_overlap = 0.0
-        
-        if user_profile.preferences.web3_preferences and potential_match.get("web3_preferences"):
-            tech_score = self._calculate_tech_compatibility(
-                user_profile.preferences.web3_preferences,
-                potential_match.get("web3_preferences")
-            )
-            blockchain_score = self._calculate_blockchain_compatibility(
-                user_profile.preferences.web3_preferences,
-                potential_match.get("web3_preferences")
-            )
-            dev_synergy = self._calculate_dev_synergy(
-                user_profile.preferences.web3_preferences,
-                potential_match.get("web3_preferences")
-            )
-            trading_alignment = self._calculate_trading_alignment(
-                user_profile.preferences.web3_preferences,
-                potential_match.get("web3_preferences")
-            )
-            community_overlap = self._calculate_community_overlap(
-                user_profile.preferences.web3_preferences,
-                potential_match.get("web3_preferences")
+        with TRACER.span("match.analyze_compatibility"):
+            # Calculate individual compatibility scores
+            with TRACER.span("match.preference_scores"):
+                music_score = self._calculate_music_compatibility(
+                    user_profile.preferences.music_genres,
+                    potential_match.get("music_genres", [])
+                )
+                
+                hobby_score = self._calculate_hobby_compatibility(
+                    user_profile.preferences.hobbies,
+                    potential_match.get("hobbies", [])
+                )
+                
+                personality_score = self._calculate_personality_compatibility(
+                    user_profile.preferences.personality_types,
+                    potential_match.get("personality_types", [])
+                )
+                
+                behavior_score = self._calculate_behavior_compatibility(
+                    user_profile.preferences.behavior_signals,
+                    potential_match.get("behavior_signals", [])
+                )
+                
+                lifestyle_score = self._calculate_lifestyle_compatibility(
+                    user_profile.preferences.lifestyle_preferences,
+                    potential_match.get("lifestyle_preferences", [])
+                )
+            
+            # Calculate bio similarity
+            with TRACER.span("match.bio_similarity"):
+                bio_similarity = self._calculate_bio_similarity(
+                    user_profile.bio,
+                    potential_match.get("bio", "")
+                )
+            
+            # Calculate tech compatibility if Web3 preferences exist
+            tech_score = 0.0
+            blockchain_score = 0.0
+            dev_synergy = 0.0
+            trading_alignment = 0.0
+            community_overlap = 0.0
+            
+            user_web3 = user_profile.preferences.web3_preferences
+            match_web3 = self._web3_model(potential_match.get("web3_preferences")) if user_web3 else None
+            if user_web3 and match_web3:
+                with TRACER.span("match.web3_scores"):
+                    tech_score = self._calculate_tech_compatibility(user_web3, match_web3)
+                    blockchain_score = self._calculate_blockchain_compatibility(user_web3, match_web3)
+                    dev_synergy = self._calculate_dev_synergy(user_web3, match_web3)
+                    trading_alignment = self._calculate_trading_alignment(user_web3, match_web3)
+                    community_overlap = self._calculate_community_overlap(user_web3, match_web3)
+            
+            # Weighted overall compatibility score
+            overall_score = (
+                music_score * self.preference_weights["music_taste"] +
+                hobby_score * self.preference_weights["hobbies"] +
+                behavior_score * self.preference_weights["behavior_signals"] +
+                personality_score * self.preference_weights["personality"] +
+                lifestyle_score * self.preference_weights["lifestyle"] +
+                bio_similarity * 0.1 +  # Bio similarity as additional factor
+                tech_score * 0.2  # Tech compatibility weight
             )
-        
-        # Weighted overall compatibility score
-        overall_score = (
-            music_score * self.preference_weights["music_taste"] +
-            hobby_score * self.preference_weights["hobbies"] +
-            behavior_score * self.preference_weights["behavior_signals"] +
-            personality_score * self.preference_weights["personality"] +
-            lifestyle_score * self.preference_weights["lifestyle"] +
-            bio_similarity * 0.1 +  # Bio similarity as additional factor
-            tech_score * 0.2  # Tech compatibility weight
-        )
-        
-        # Find shared interests
-        shared_interests = self._find_shared_interests(user_profile, potential_match)
-        
-        # Generate match reasons
-        match_reasons = self._generate_match_reasons(
-            music_score, hobby_score, personality_score, 
-            behavior_score, lifestyle_score, shared_interests
-        )
-        
-        # Identify potential issues
-        potential_issues = self._identify_potential_issues(
-            user_profile.preferences, potential_match
-        )
-        
-        # Generate conversation suggestions
-        conversation_suggestions = self._generate_conversation_suggestions(
-            shared_interests, potential_match
-        )
-        
-        # Recommend approach
-        recommended_approach = self._recommend_approach(
-            behavior_score, personality_score, overall_score
-        )
-        
-        return MatchAnalysis(
-            compatibility_score=overall_score,
-            shared_interests=shared_interests,
-            personality_compatibility=personality_score,
-            lifestyle_compatibility=lifestyle_score,
-            communication_style_match=behavior_score,
-            potential_issues=potential_issues,
-            conversation_suggestions=conversation_suggestions,
-            recommended_approach=recommended_approach,
             
-            # Web3/tech compatibility
-            tech_compatibility_score=tech_score,
-            blockchain_ecosystem_match=blockchain_score,
-            development_synergy=dev_synergy,
-            trading_philosophy_alignment=trading_alignment,
-            community_overlap=community_overlap,
+            with TRACER.span("match.insights"):
+                # Find shared interests
+                shared_interests = self._find_shared_interests(user_profile, potential_match)
+                
+                # Generate match reasons
+                match_reasons = self._generate_match_reasons(
+                    music_score, hobby_score, personality_score, 
+                    behavior_score, lifestyle_score, shared_interests
+                )
+                
+                # Identify potential issues
+                potential_issues = self._identify_potential_issues(
+                    user_profile.preferences, potential_match
+                )
+                
+                # Generate conversation suggestions
+                conversation_suggestions = self._generate_conversation_suggestions(
+                    shared_interests, potential_match
+                )
+                
+                # Recommend approach
+                recommended_approach = self._recommend_approach(
+                    behavior_score, personality_score, overall_score
+                )
             
-            # Web3-specific insights
-            shared_protocols=self._find_shared_protocols(user_profile, potential_match),
-            complementary_skills=self._find_complementary_skills(user_profile, potential_match),
-            potential_collaborations=self._suggest_collaborations(user_profile, potential_match),
-            web3_conversation_starters=self._generate_web3_starters(user_profile, potential_match)
-        )
+            with TRACER.span("match.web3_insights"):
+                shared_protocols = self._find_shared_protocols(user_profile, potential_match)
+                complementary_skills = self._find_complementary_skills(user_profile, potential_match)
+                potential_collaborations = self._suggest_collaborations(user_profile, potential_match)
+                web3_conversation_starters = self._generate_web3_starters(user_profile, potential_match)
+            
+            return MatchAnalysis(
+                compatibility_score=overall_score,
+                shared_interests=shared_interests,
+                personality_compatibility=personality_score,
+                lifestyle_compatibility=lifestyle_score,
+                communication_style_match=behavior_score,
+                potential_issues=potential_issues,
+                conversation_suggestions=conversation_suggestions,
+                recommended_approach=recommended_approach,
+                
+                # Web3/tech compatibility
+                tech_compatibility_score=tech_score,
+                blockchain_ecosystem_match=blockchain_score,
+                development_synergy=dev_synergy,
+                trading_philosophy_alignment=trading_alignment,
+                community_overlap=community_overlap,
+                
+                # Web3-specific insights
+                shared_protocols=shared_protocols,
+                complementary_skills=complementary_skills,
+                potential_collaborations=potential_collaborations,
+                web3_conversation_starters=web3_conversation_starters
+            )
     
     def find_best_matches(
         self, 
@@ -168,25 +184,33 @@ class MatchingEngine:
         """Find the best matches for a user from a list of potential matches"""
         
         scored_matches = []
+        started = time.perf_counter()
         
-        for match_data in potential_matches:
-            analysis = self.analyze_compatibility(user_profile, match_data)
-            
-            if analysis.compatibility_score >= 0.3:  # Minimum threshold
-                potential_match = PotentialMatch(
-                    user_id=match_data.get("user_id", ""),
-                    name=match_data.get("name", ""),
-                    age=match_data.get("age", 0),
-                    location=match_data.get("location", ""),
-                    bio=match_data.get("bio", ""),
-                    photos=match_data.get("photos", []),
-                    compatibility_score=analysis.compatibility_score,
-                    match_reasons=analysis.conversation_suggestions[:3],
-                    conversation_starters=self._generate_conversation_starters(
-                        analysis.shared_interests, match_data
+        with TRACER.span("match.find_best_matches", candidates=len(potential_matches)) as span:
+            for match_data in potential_matches:
+                analysis = self.analyze_compatibility(user_profile, match_data)
+                
+                if analysis.compatibility_score >= 0.3:  # Minimum threshold
+                    with TRACER.span("match.conversation_starters"):
+                        conversation_starters = self._generate_conversation_starters(
+                            analysis.shared_interests, match_data
+                        )
+                    potential_match = PotentialMatch(
+                        user_id=match_data.get("user_id", ""),
+                        name=match_data.get("name", ""),
+                        age=match_data.get("age", 0),
+                        location=match_data.get("location", ""),
+                        bio=match_data.get("bio", ""),
+                        photos=match_data.get("photos", []),
+                        compatibility_score=analysis.compatibility_score,
+                        match_reasons=analysis.conversation_suggestions[:3],
+                        conversation_starters=conversation_starters
                     )
-                )
-                scored_matches.append(potential_match)
+                    scored_matches.append(potential_match)
+            span.set("compatible", len(scored_matches))
+        
+        MATCH_CANDIDATES.inc(amount=len(potential_matches))
+        MATCH_SCORING_SECONDS.inc(amount=time.perf_counter() - started)
         
         # Sort by compatibility score and return top matches
         scored_matches.sort(key=lambda x: x.compatibility_score, reverse=True)
@@ -329,7 +353,7 @@ class MatchingEngine:
             tfidf_matrix = self.vectorizer.fit_transform(bios)
             
             # Calculate cosine similarity
-            similarity = cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
+            similarity = self._cosine_similarity(tfidf_matrix[0:1], tfidf_matrix[1:2])[0][0]
             return similarity
         except:
             return 0.5  # Fallback if vectorization fails
@@ -499,6 +523,15 @@ class MatchingEngine:
         
         return starters[:3]  # Return top 3 starters
     
+    def _web3_model(self, web3_prefs) -> Optional[Web3Preferences]:
+        """Candidates carry web3 preferences as plain dicts; the score helpers need the model"""
+        if not web3_prefs or isinstance(web3_prefs, Web3Preferences):
+            return web3_prefs or None
+        try:
+            return Web3Preferences(**web3_prefs)
+        except (TypeError, ValueError):
+            return None
+    
     def _calculate_tech_compatibility(self, user_web3_prefs, match_web3_prefs):
         """Calculate overall tech compatibility score"""
         if not user_web3_prefs or not match_web3_prefs:
@@ -0,0 +1,335 @@
+"""
+Memory benchmarks for profiles, conversations and hot message storage
+"""
+from typing import List, Dict, Any, Callable
+import argparse
+import gc
+import json
+import random
+import shutil
+import tempfile
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta
+
+from models import ChatMessage, PotentialMatch, FlirtingStyle
+from message_store import CompactMessage
+from memory_report import top_allocations, object_counts
+from synthetic_profiles import SyntheticProfileGenerator
+
+CHAT_LINES = [
+    "Hey! How's your week going?",
+    "I saw you like hiking, any favourite trails?",
+    "Haha that's hilarious",
+    "What are you building at the moment? I'm deep into a Celo side project.",
+    "Would you be up for coffee this weekend?",
+    "That concert sounds amazing, who else was on the lineup?"
+]
+
+def _measure(build: Callable[[], Any]) -> int:
+    """Measure bytes retained by the object graph that build() returns"""
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    retained = build()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del retained
+    gc.collect()
+    return current - baseline
+
+def benchmark_message_storage(
+    message_count: int = 100000,
+    participant_count: int = 1000,
+    seed: int = 42
+) -> Dict[str, Any]:
+    """Compare per-message memory of pydantic messages and compact records"""
+
+    rng = random.Random(seed)
+    participant_ids = [str(uuid.UUID(int=rng.getrandbits(128))) for _ in range(participant_count)]
+    started = datetime.now()
+
+    # Content strings are shared by both layouts so only the overhead differs
+    rows = []
+    for i in range(message_count):
+        sender, receiver = rng.sample(participant_ids, 2)
+        rows.append((
+            sender, receiver,
+            f"message {i} about music and travel plans",
+            started + timedelta(seconds=i),
+            i % 2 == 0
+        ))
+
+    def build_pydantic() -> List[ChatMessage]:
+        return [
+            ChatMessage(
+                message_id=str(uuid.uuid4()),
+                sender_id=sender,
+                receiver_id=receiver,
+                content=content,
+                timestamp=timestamp,
+                is_ai_generated=is_ai
+            )
+            for sender, receiver, content, timestamp, is_ai in rows
+        ]
+
+    def build_compact() -> List[CompactMessage]:
+        return [
+            CompactMessage.create(sender, receiver, content, is_ai_generated=is_ai, timestamp=timestamp)
+            for sender, receiver, content, timestamp, is_ai in rows
+        ]
+
+    # Warm the participant interner so both runs see the same steady state
+    build_compact()
+
+    pydantic_bytes = _measure(build_pydantic)
+    compact_bytes = _measure(build_compact)
+
+    pydantic_per_message = pydantic_bytes / message_count
+    compact_per_message = compact_bytes / message_count
+
+    return {
+        "messages": message_count,
+        "participants": participant_count,
+        "chat_message_bytes_per_message": round(pydantic_per_message, 1),
+        "compact_bytes_per_message": round(compact_per_message, 1),
+        "bytes_saved_per_message": round(pydantic_per_message - compact_per_message, 1),
+        "reduction_percent": round(100 * (1 - compact_per_message / pydantic_per_message), 1)
+    }
+
+def benchmark_profiles(profile_count: int = 10000, seed: int = 42, top: int = 10) -> Dict[str, Any]:
+    """Bytes per UserProfile as held in the repository cache, with the largest allocation sites"""
+
+    generator = SyntheticProfileGenerator(seed)
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    profiles = [generator.user_profile() for _ in range(profile_count)]
+    current = tracemalloc.get_traced_memory()[0]
+    snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    web3_profiles = sum(1 for profile in profiles if profile.preferences.web3_preferences)
+    del profiles
+    gc.collect()
+    return {
+        "profiles": profile_count,
+        "web3_share": round(web3_profiles / profile_count, 3),
+        "bytes_per_profile": round((current - baseline) / profile_count, 1),
+        "top_sites": top_allocations(top, snapshot=snapshot)
+    }
+
+def _conversation_manager(workdir: str, max_history: int):
+    from conversation_manager import ConversationManager
+    return ConversationManager(max_history=max_history, archive_dir=workdir)
+
+def benchmark_conversations(
+    conversation_count: int = 10000,
+    messages_per_conversation: int = 20,
+    max_history: int = 20,
+    seed: int = 42,
+    top: int = 10
+) -> Dict[str, Any]:
+    """Bytes per conversation (context and log) and per stored message in ConversationManager"""
+
+    rng = random.Random(seed)
+    generator = SyntheticProfileGenerator(seed)
+    workdir = tempfile.mkdtemp(prefix="celosoul-memory-")
+    users = [generator.user_profile() for _ in range(min(conversation_count, 2000))]
+    style = FlirtingStyle()
+
+    try:
+        gc.collect()
+        tracemalloc.start()
+        manager = _conversation_manager(workdir, max_history)
+        gc.collect()
+        empty = tracemalloc.get_traced_memory()[0]
+
+        conversation_ids = []
+        pairs = []
+        for i in range(conversation_count):
+            user = users[i % len(users)]
+            match = users[(i * 7 + 1) % len(users)]
+            match_profile = PotentialMatch(
+                user_id=match.user_id, name=match.name, age=match.age, location=match.location,
+                bio=match.bio, photos=match.photos, compatibility_score=round(rng.uniform(0.3, 1.0), 3)
+            )
+            conversation_ids.append(manager.create_conversation(user.user_id, match_profile, user.preferences, style))
+            pairs.append((user.user_id, match.user_id))
+        gc.collect()
+        with_contexts = tracemalloc.get_traced_memory()[0]
+
+        for conversation_id, (user_id, match_id) in zip(conversation_ids, pairs):
+            for turn in range(messages_per_conversation):
+                sender, receiver = (user_id, match_id) if turn % 2 == 0 else (match_id, user_id)
+                manager.add_message(conversation_id, sender, receiver, rng.choice(CHAT_LINES), is_ai_generated=turn % 2 == 1)
+        gc.collect()
+        with_messages = tracemalloc.get_traced_memory()[0]
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        retained = conversation_count * min(messages_per_conversation, max_history)
+        result = {
+            "conversations": conversation_count,
+            "messages_per_conversation": messages_per_conversation,
+            "max_history": max_history,
+            "bytes_per_conversation": round((with_contexts - empty) / conversation_count, 1),
+            "bytes_per_retained_message": round((with_messages - with_contexts) / retained, 1) if retained else None,
+            "bytes_per_conversation_with_history": round((with_messages - empty) / conversation_count, 1),
+            "objects": object_counts(),
+            "top_sites": top_allocations(top, snapshot=snapshot)
+        }
+        manager.close()
+        del manager
+        gc.collect()
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def simulate_day(
+    users_per_day: int = 5000,
+    conversations_per_day: int = 8000,
+    messages_per_day: int = 80000,
+    hours: int = 24,
+    seed: int = 42,
+    top: int = 10
+) -> Dict[str, Any]:
+    """Replay a compressed day of signups, conversations and chat, sampling memory every hour"""
+
+    from profile_repository import ProfileRepository
+
+    rng = random.Random(seed)
+    generator = SyntheticProfileGenerator(seed)
+    workdir = tempfile.mkdtemp(prefix="celosoul-day-")
+    style = FlirtingStyle()
+    # Evening-heavy traffic: share of the day's activity per hour
+    weights = [2.0 if 18 <= hour % 24 <= 23 else 1.5 if 8 <= hour % 24 <= 17 else 0.8 for hour in range(hours)]
+    shares = [weight / sum(weights) for weight in weights]
+
+    try:
+        gc.collect()
+        tracemalloc.start()
+        repository = ProfileRepository(f"{workdir}/profiles.db", cache_size=users_per_day)
+        manager = _conversation_manager(f"{workdir}/archive", 20)
+        gc.collect()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+
+        user_ids: List[str] = []
+        conversations: List[tuple] = []
+        timeline = []
+        for hour, share in enumerate(shares):
+            for _ in range(max(1, round(users_per_day * share))):
+                profile = generator.user_profile()
+                repository.save(profile)
+                user_ids.append(profile.user_id)
+            for _ in range(round(conversations_per_day * share)):
+                user_id, match_id = rng.sample(user_ids, 2) if len(user_ids) > 1 else (user_ids[0], user_ids[0])
+                user = repository.get(user_id)
+                match_profile = PotentialMatch(user_id=match_id, name="Match", age=25, location="Unknown",
+                                               bio="Potential match", compatibility_score=0.8)
+                conversations.append((manager.create_conversation(user_id, match_profile, user.preferences, style),
+                                      user_id, match_id))
+            for turn in range(round(messages_per_day * share) if conversations else 0):
+                conversation_id, user_id, match_id = rng.choice(conversations)
+                sender, receiver = (user_id, match_id) if turn % 2 == 0 else (match_id, user_id)
+                manager.add_message(conversation_id, sender, receiver, rng.choice(CHAT_LINES), is_ai_generated=turn % 2 == 1)
+
+            gc.collect()
+            current = tracemalloc.get_traced_memory()[0]
+            timeline.append({
+                "hour": hour,
+                "users": len(user_ids),
+                "conversations": len(conversations),
+                "bytes": current - start_bytes
+            })
+
+        snapshot = tracemalloc.take_snapshot()
+        tracemalloc.stop()
+
+        growth = [later["bytes"] - earlier["bytes"] for earlier, later in zip(timeline, timeline[1:])]
+        result = {
+            "hours": hours,
+            "users": len(user_ids),
+            "conversations": len(conversations),
+            "messages": sum(round(messages_per_day * share) for share in shares),
+            "end_of_day_bytes": timeline[-1]["bytes"] if timeline else 0,
+            "peak_hourly_growth_bytes": max(growth) if growth else None,
+            "timeline": timeline,
+            "top_sites": top_allocations(top, snapshot=snapshot)
+        }
+        repository.close()
+        manager.close()
+        return result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+SUITES = ("messages", "profiles", "conversations", "day")
+
+def main():
+    """Run the memory benchmarks from the command line"""
+    parser = argparse.ArgumentParser(description="CeloSoul memory benchmarks")
+    parser.add_argument("--suites", default="messages", help=f"Comma-separated, from: {', '.join(SUITES)}, all")
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--participants", type=int, default=1000)
+    parser.add_argument("--profiles", type=int, default=10000)
+    parser.add_argument("--conversations", type=int, default=10000)
+    parser.add_argument("--messages-per-conversation", type=int, default=20)
+    parser.add_argument("--day-users", type=int, default=5000)
+    parser.add_argument("--day-conversations", type=int, default=8000)
+    parser.add_argument("--day-messages", type=int, default=80000)
+    parser.add_argument("--top", type=int, default=10, help="Allocation sites to report")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    args = parser.parse_args()
+
+    suites = SUITES if args.suites == "all" else [suite.strip() for suite in args.suites.split(",")]
+    results: Dict[str, Any] = {}
+    if "messages" in suites:
+        results["messages"] = benchmark_message_storage(args.messages, args.participants)
+    if "profiles" in suites:
+        results["profiles"] = benchmark_profiles(args.profiles, top=args.top)
+    if "conversations" in suites:
+        results["conversations"] = benchmark_conversations(
+            args.conversations, args.messages_per_conversation, top=args.top
+        )
+    if "day" in suites:
+        results["day"] = simulate_day(args.day_users, args.day_conversations, args.day_messages, top=args.top)
+
+    if args.json:
+        # A lone message suite keeps its original flat output
+        print(json.dumps(results["messages"] if list(results) == ["messages"] else results))
+        return
+
+    if "messages" in results:
+        result = results["messages"]
+        print(f"📊 Message storage ({result['messages']} messages, {result['participants']} participants)")
+        print(f"   ChatMessage: {result['chat_message_bytes_per_message']} bytes/message")
+        print(f"   Compact:     {result['compact_bytes_per_message']} bytes/message")
+        print(f"   Saved:       {result['bytes_saved_per_message']} bytes/message ({result['reduction_percent']}%)")
+    if "profiles" in results:
+        result = results["profiles"]
+        print(f"📊 Profiles ({result['profiles']}, {result['web3_share']:.0%} with web3 preferences)")
+        print(f"   UserProfile: {result['bytes_per_profile']} bytes/profile")
+        _print_sites(result["top_sites"])
+    if "conversations" in results:
+        result = results["conversations"]
+        print(f"📊 Conversations ({result['conversations']} x {result['messages_per_conversation']} messages, "
+              f"history {result['max_history']})")
+        print(f"   Context and log: {result['bytes_per_conversation']} bytes/conversation")
+        print(f"   Messages:        {result['bytes_per_retained_message']} bytes/retained message")
+        print(f"   With history:    {result['bytes_per_conversation_with_history']} bytes/conversation")
+        _print_sites(result["top_sites"])
+    if "day" in results:
+        result = results["day"]
+        print(f"📊 Simulated day ({result['users']} users, {result['conversations']} conversations, "
+              f"{result['messages']} messages)")
+        for point in result["timeline"]:
+            print(f"   {point['hour']:02d}:00  {point['bytes'] / (1 << 20):8.1f} MB  "
+                  f"({point['users']} users, {point['conversations']} conversations)")
+        _print_sites(result["top_sites"])
+
+def _print_sites(sites: List[Dict[str, Any]]) -> None:
+    for site in sites:
+        print(f"      {site['bytes'] / 1024:10.1f} KiB  {site['blocks']:>8} blocks  {site['site']}")
+
+if __name__ == "__main__":
+    main()
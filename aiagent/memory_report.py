@@ -0,0 +1,167 @@
+"""
+Memory introspection shared by GET /debug/memory and memory_benchmark.py
+"""
+from typing import List, Dict, Any, Optional, Callable, Iterable, Sequence
+from enum import Enum
+import gc
+import os
+import resource
+import sys
+import tracemalloc
+import types
+
+# Classes whose live instance counts say where memory goes
+TRACKED_TYPES = (
+    "UserProfile", "UserPreferences", "Web3Preferences", "ConversationContext", "PotentialMatch",
+    "ChatMessage", "CompactMessage", "MessageLog", "FlirtingStyle"
+)
+
+_SHARED_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType, Enum)
+
+def deep_size(obj: Any, seen: Optional[set] = None) -> int:
+    """Bytes reachable from obj, skipping classes, modules, functions and enum members"""
+
+    seen = set() if seen is None else seen
+    total = 0
+    pending = [obj]
+    while pending:
+        item = pending.pop()
+        if id(item) in seen or isinstance(item, _SHARED_TYPES):
+            continue
+        seen.add(id(item))
+        total += sys.getsizeof(item)
+        pending.extend(gc.get_referents(item))
+    return total
+
+def mean_deep_size(
+    objects: Iterable[Any],
+    sample: int = 50,
+    shared: Optional[Callable[[Any], Iterable[Any]]] = None
+) -> Optional[float]:
+    """Average deep size over the first `sample` objects, leaving out what shared(obj) says is owned elsewhere"""
+    sizes = []
+    for obj in objects:
+        seen = {id(item) for item in shared(obj)} if shared is not None else None
+        sizes.append(deep_size(obj, seen))
+        if len(sizes) >= sample:
+            break
+    return round(sum(sizes) / len(sizes), 1) if sizes else None
+
+def object_counts(type_names: Sequence[str] = TRACKED_TYPES) -> Dict[str, int]:
+    """Live instances per tracked class name, from the garbage collector's view"""
+    wanted = set(type_names)
+    counts = {name: 0 for name in type_names}
+    for obj in gc.get_objects():
+        name = type(obj).__name__
+        if name in wanted:
+            counts[name] += 1
+    return counts
+
+def rss_bytes() -> Dict[str, Optional[int]]:
+    """Current and peak resident set size of this process"""
+    current = None
+    try:
+        with open("/proc/self/statm") as f:
+            current = int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"rss_bytes": current, "max_rss_bytes": peak if sys.platform == "darwin" else peak * 1024}
+
+def top_allocations(
+    limit: int = 15,
+    group_by: str = "lineno",
+    snapshot: Optional[tracemalloc.Snapshot] = None
+) -> List[Dict[str, Any]]:
+    """Largest allocation sites from a tracemalloc snapshot (taken now if not given)"""
+
+    if snapshot is None:
+        if not tracemalloc.is_tracing():
+            return []
+        snapshot = tracemalloc.take_snapshot()
+    snapshot = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>")
+    ))
+    sites = []
+    for stat in snapshot.statistics(group_by)[:limit]:
+        frame = stat.traceback[0]
+        sites.append({
+            # Parent directory too, so pydantic/main.py is not mistaken for ours
+            "site": f"{os.path.join(*frame.filename.split(os.sep)[-2:])}:{frame.lineno}",
+            "file": frame.filename,
+            "bytes": stat.size,
+            "blocks": stat.count
+        })
+    return sites
+
+def store_estimates(conversation_manager, profile_repository, sample: int = 50) -> Dict[str, Any]:
+    """Estimated bytes held by the profile cache and the conversation stores, from sampled entries"""
+
+    cached_profiles = profile_repository.cache_sample(sample)
+    profile_count = profile_repository.cache_stats()["cached_profiles"]
+
+    contexts = conversation_manager.active_conversations.snapshot()
+    logs = conversation_manager.message_logs.snapshot()
+    records = [record for _, log in logs[:sample] for record in log]
+    record_count = sum(len(log) for _, log in logs)
+
+    per_profile = mean_deep_size(cached_profiles, sample)
+    per_context = mean_deep_size((context for _, context in contexts), sample)
+    # A record's participant handles are the interner's int objects and its
+    # flags a cached small int, so they are left out of the per-record bytes
+    per_record = mean_deep_size(records, sample, lambda record: (record.sender, record.receiver, record.flags))
+    # The log shell only; its records are counted under messages
+    shells = [sys.getsizeof(log) + sys.getsizeof(log.records) for _, log in logs[:sample]]
+    per_log = round(sum(shells) / len(shells), 1) if shells else None
+
+    def total(per_item: Optional[float], count: int) -> Optional[int]:
+        return int(per_item * count) if per_item is not None else None
+
+    return {
+        "profiles": {
+            "cached": profile_count,
+            "bytes_per_profile": per_profile,
+            "estimated_bytes": total(per_profile, profile_count)
+        },
+        "conversations": {
+            "active": len(contexts),
+            "bytes_per_context": per_context,
+            "bytes_per_message_log": per_log,
+            "estimated_bytes": total((per_context or 0) + (per_log or 0), len(contexts)) if contexts else 0
+        },
+        "messages": {
+            "in_memory": record_count,
+            "bytes_per_message": per_record,
+            "estimated_bytes": total(per_record, record_count)
+        }
+    }
+
+def memory_report(
+    conversation_manager,
+    profile_repository,
+    top: int = 15,
+    sample: int = 50,
+    count_objects: bool = True
+) -> Dict[str, Any]:
+    """Everything GET /debug/memory returns"""
+
+    report: Dict[str, Any] = {
+        "pid": os.getpid(),
+        "process": rss_bytes(),
+        "gc": {"counts": gc.get_count(), "tracked_objects": len(gc.get_objects()) if count_objects else None},
+        "stores": store_estimates(conversation_manager, profile_repository, sample),
+        "tracemalloc": {"tracing": tracemalloc.is_tracing()}
+    }
+    if count_objects:
+        report["objects"] = object_counts()
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        report["tracemalloc"].update({
+            "current_bytes": current,
+            "peak_bytes": peak,
+            "top_sites": top_allocations(top)
+        })
+    return report
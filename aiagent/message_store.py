@@ -0,0 +1,228 @@
+"""
+Compact in-memory message representation for hot conversation storage
+"""
+from typing import List, Dict, Any, Iterator, Optional, Tuple
+from collections import deque
+from datetime import datetime, timedelta
+import base64
+import threading
+import uuid
+
+from models import ChatMessage
+
+EPOCH = datetime(1970, 1, 1)
+AI_GENERATED_FLAG = 1
+
+def to_timestamp_us(value: datetime) -> int:
+    """Convert a naive datetime to integer microseconds"""
+    return (value - EPOCH) // timedelta(microseconds=1)
+
+def from_timestamp_us(value: int) -> datetime:
+    """Convert integer microseconds back to a naive datetime"""
+    return EPOCH + timedelta(microseconds=value)
+
+# Messages are paged by (timestamp in microseconds, message id): new messages
+# sort after every cursor already handed out, so pages never shift
+MessageKey = Tuple[int, str]
+
+def encode_cursor(key: MessageKey) -> str:
+    """Opaque, URL-safe cursor for a message key"""
+    raw = f"{key[0]}:{key[1]}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+def decode_cursor(cursor: str) -> MessageKey:
+    """Turn a cursor back into a message key; raises ValueError if it is malformed"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode("utf-8")
+        timestamp_us, message_id = raw.split(":", 1)
+        return int(timestamp_us), message_id
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+class StringInterner:
+    """Maps repeated strings such as participant ids to small integers"""
+
+    def __init__(self):
+        """Initialize the interner"""
+        self._ids: Dict[str, int] = {}
+        self._values: List[str] = []
+        self._lock = threading.Lock()
+
+    def intern(self, value: str) -> int:
+        """Get the integer handle for a string, assigning one if needed"""
+        handle = self._ids.get(value)
+        if handle is not None:
+            return handle
+
+        with self._lock:
+            handle = self._ids.get(value)
+            if handle is None:
+                handle = len(self._values)
+                self._values.append(value)
+                self._ids[value] = handle
+        return handle
+
+    def lookup(self, handle: int) -> str:
+        """Get the string for an integer handle"""
+        return self._values[handle]
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+# Shared across all conversations so each participant id is stored once
+participants = StringInterner()
+message_types = StringInterner()
+
+class CompactMessage:
+    """Slotted message record with interned ids and an integer timestamp"""
+
+    __slots__ = ("message_id", "sender", "receiver", "content", "timestamp_us", "flags")
+
+    def __init__(
+        self,
+        message_id: Any,
+        sender: int,
+        receiver: int,
+        content: str,
+        timestamp_us: int,
+        flags: int
+    ):
+        self.message_id = message_id  # 16 raw uuid bytes, or str for foreign ids
+        self.sender = sender
+        self.receiver = receiver
+        self.content = content
+        self.timestamp_us = timestamp_us
+        self.flags = flags  # bit 0: AI generated, higher bits: interned message type
+
+    @classmethod
+    def create(
+        cls,
+        sender_id: str,
+        receiver_id: str,
+        content: str,
+        is_ai_generated: bool = False,
+        message_type: str = "text",
+        timestamp: Optional[datetime] = None
+    ) -> "CompactMessage":
+        """Create a new record with a fresh message id"""
+        return cls(
+            uuid.uuid4().bytes,
+            participants.intern(sender_id),
+            participants.intern(receiver_id),
+            content,
+            to_timestamp_us(timestamp or datetime.now()),
+            (message_types.intern(message_type) << 1) | (AI_GENERATED_FLAG if is_ai_generated else 0)
+        )
+
+    @classmethod
+    def from_message(cls, message: ChatMessage) -> "CompactMessage":
+        """Compact a pydantic message"""
+        try:
+            message_id = uuid.UUID(message.message_id).bytes
+        except ValueError:
+            message_id = message.message_id
+
+        return cls(
+            message_id,
+            participants.intern(message.sender_id),
+            participants.intern(message.receiver_id),
+            message.content,
+            to_timestamp_us(message.timestamp),
+            (message_types.intern(message.message_type) << 1)
+            | (AI_GENERATED_FLAG if message.is_ai_generated else 0)
+        )
+
+    @classmethod
+    def from_columns(
+        cls,
+        message_id: str,
+        sender_id: str,
+        receiver_id: str,
+        content: str,
+        timestamp_us: int,
+        message_type: str,
+        is_ai_generated: bool
+    ) -> "CompactMessage":
+        """Build a record from stored column values"""
+        try:
+            compact_id = uuid.UUID(message_id).bytes
+        except ValueError:
+            compact_id = message_id
+
+        return cls(
+            compact_id,
+            participants.intern(sender_id),
+            participants.intern(receiver_id),
+            content,
+            timestamp_us,
+            (message_types.intern(message_type) << 1) | (AI_GENERATED_FLAG if is_ai_generated else 0)
+        )
+
+    @property
+    def id(self) -> str:
+        """Get the message id as a string"""
+        if isinstance(self.message_id, bytes):
+            return str(uuid.UUID(bytes=self.message_id))
+        return self.message_id
+
+    @property
+    def is_ai_generated(self) -> bool:
+        return bool(self.flags & AI_GENERATED_FLAG)
+
+    @property
+    def timestamp(self) -> datetime:
+        return from_timestamp_us(self.timestamp_us)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the record in ChatMessage field layout"""
+        return {
+            "message_id": self.id,
+            "sender_id": participants.lookup(self.sender),
+            "receiver_id": participants.lookup(self.receiver),
+            "content": self.content,
+            "timestamp": self.timestamp,
+            "message_type": message_types.lookup(self.flags >> 1),
+            "is_ai_generated": self.is_ai_generated
+        }
+
+    def to_message(self) -> ChatMessage:
+        """Materialize a pydantic message for the API boundary"""
+        return ChatMessage(**self.to_dict())
+
+    @property
+    def key(self) -> MessageKey:
+        """Position of this message in cursor order"""
+        return self.timestamp_us, self.id
+
+class MessageLog:
+    """Bounded per-conversation sequence of compact message records"""
+
+    __slots__ = ("records",)
+
+    def __init__(self, max_history: int):
+        self.records: deque = deque(maxlen=max_history)
+
+    def append(self, record: CompactMessage) -> None:
+        self.records.append(record)
+
+    def recent(self, limit: int) -> List[CompactMessage]:
+        """Get up to `limit` of the newest records, oldest first"""
+        if limit <= 0:
+            return []
+        if limit >= len(self.records):
+            return list(self.records)
+        return [self.records[i] for i in range(len(self.records) - limit, len(self.records))]
+
+    def to_messages(self, limit: Optional[int] = None) -> List[ChatMessage]:
+        """Materialize records as pydantic messages"""
+        records = self.records if limit is None else self.recent(limit)
+        return [record.to_message() for record in records]
+
+    def contains_id(self, message_id: str) -> bool:
+        return any(record.id == message_id for record in self.records)
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[CompactMessage]:
+        return iter(self.records)
@@ -0,0 +1,326 @@
+"""
+In-process metrics with Prometheus text exposition
+"""
+from typing import List, Dict, Any, Optional, Tuple, Callable, Sequence, Iterator
+from bisect import bisect_left
+import math
+import threading
+import time
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+class _Shards:
+    """Per-thread value tables; writers never share a table, so they never lock"""
+
+    def __init__(self):
+        self._local = threading.local()
+        self._tables: List[Dict[LabelValues, Any]] = []
+        self._lock = threading.Lock()  # only taken when a thread writes for the first time
+
+    def table(self) -> Dict[LabelValues, Any]:
+        table = getattr(self._local, "table", None)
+        if table is None:
+            table = self._local.table = {}
+            with self._lock:
+                self._tables.append(table)
+        return table
+
+    def tables(self) -> List[Dict[LabelValues, Any]]:
+        with self._lock:
+            return list(self._tables)
+
+class Metric:
+    """Base class: a named metric family with fixed label names"""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        """Initialize the metric"""
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        """Yield (suffix, label values, value) for exposition"""
+        return iter(())
+
+class Counter(Metric):
+    """Monotonic total, summed across threads at scrape time"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._shards = _Shards()
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        table = self._shards.table()
+        table[labels] = table.get(labels, 0.0) + amount
+
+    def values(self) -> Dict[LabelValues, float]:
+        totals: Dict[LabelValues, float] = {}
+        for table in self._shards.tables():
+            for labels, value in list(table.items()):
+                totals[labels] = totals.get(labels, 0.0) + value
+        return totals
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        for labels, value in sorted(self.values().items()):
+            yield "_total", labels, value
+
+class Gauge(Counter):
+    """Value that goes up and down (e.g. in-flight requests); inc and dec may run on different threads"""
+
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        for labels, value in sorted(self.values().items()):
+            yield "", labels, value
+
+class CallbackGauge(Metric):
+    """Gauge read from a callback at scrape time (store sizes, cache hit rates)"""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Any],
+        labelnames: Sequence[str] = ()
+    ):
+        """collect returns a number, or a {label values: number} dict when labelnames are set"""
+        super().__init__(name, documentation, labelnames)
+        self.collect = collect
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        try:
+            value = self.collect()
+        except Exception as e:
+            print(f"Metric {self.name} collection failed: {e}")
+            return
+        if isinstance(value, dict):
+            for labels, number in sorted(value.items()):
+                if number is not None:
+                    yield "", labels if isinstance(labels, tuple) else (labels,), float(number)
+        elif value is not None:
+            yield "", (), float(value)
+
+class Histogram(Metric):
+    """Bucketed observations with sum and count, Prometheus-style cumulative buckets"""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._shards = _Shards()
+
+    def observe(self, value: float, *labels: str) -> None:
+        table = self._shards.table()
+        state = table.get(labels)
+        if state is None:
+            # One slot per bucket plus +Inf, then sum
+            state = table[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        state[bisect_left(self.buckets, value)] += 1
+        state[-1] += value
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing the elapsed seconds"""
+        return _Timer(self, labels)
+
+    def merged(self) -> Dict[LabelValues, List[float]]:
+        merged: Dict[LabelValues, List[float]] = {}
+        for table in self._shards.tables():
+            for labels, state in list(table.items()):
+                totals = merged.get(labels)
+                if totals is None:
+                    merged[labels] = list(state)
+                else:
+                    for index, value in enumerate(state):
+                        totals[index] += value
+        return merged
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        for labels, state in sorted(self.merged().items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state):
+                cumulative += count
+                yield "_bucket", labels + (_format_bound(bound),), cumulative
+            yield "_sum", labels, state[-1]
+            yield "_count", labels, cumulative
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "started")
+
+    def __init__(self, histogram: Histogram, labels: LabelValues):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> "_Timer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == math.inf else repr(float(bound))
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if value != value:
+        return "NaN"
+    return repr(int(value)) if float(value).is_integer() and abs(value) < 1e15 else repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text format"""
+
+    def __init__(self):
+        """Initialize an empty registry"""
+        self._metrics: Dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: Metric) -> Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                # Re-registration (e.g. a module re-import) keeps the live series
+                if isinstance(metric, CallbackGauge) and isinstance(existing, CallbackGauge):
+                    existing.collect = metric.collect
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def callback_gauge(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Any],
+        labelnames: Sequence[str] = ()
+    ) -> CallbackGauge:
+        return self.register(CallbackGauge(name, documentation, collect, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Render every metric family in Prometheus text exposition format 0.0.4"""
+
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines: List[str] = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.documentation)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            labelnames = metric.labelnames + (("le",) if metric.kind == "histogram" else ())
+            for suffix, labels, value in metric.samples():
+                names = labelnames if suffix == "_bucket" else metric.labelnames
+                if labels:
+                    pairs = ",".join(f'{name}="{_escape(label)}"' for name, label in zip(names, labels))
+                    lines.append(f"{metric.name}{suffix}{{{pairs}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{metric.name}{suffix} {_format_value(value)}")
+        lines.append("")
+        return "\n".join(lines)
+
+# Process-wide registry and the metrics shared by the agent's modules
+REGISTRY = MetricsRegistry()
+
+HTTP_REQUESTS = REGISTRY.counter(
+    "celosoul_http_requests", "HTTP requests by route and status code", ("method", "route", "status")
+)
+HTTP_LATENCY = REGISTRY.histogram(
+    "celosoul_http_request_duration_seconds", "HTTP request latency by route", ("method", "route")
+)
+HTTP_IN_FLIGHT = REGISTRY.gauge(
+    "celosoul_http_requests_in_flight", "HTTP requests currently being served", ("method",)
+)
+LLM_LATENCY = REGISTRY.histogram(
+    "celosoul_llm_request_duration_seconds", "LLM call latency by task", ("task",)
+)
+LLM_TOKENS = REGISTRY.counter(
+    "celosoul_llm_tokens", "LLM tokens used by task and kind (prompt/completion)", ("task", "kind")
+)
+LLM_ERRORS = REGISTRY.counter(
+    "celosoul_llm_errors", "Failed LLM calls by task", ("task",)
+)
+IDEMPOTENT_REPLAYS = REGISTRY.counter(
+    "celosoul_idempotent_replays", "Requests answered from an earlier response with the same Idempotency-Key", ("route",)
+)
+MATCH_CANDIDATES = REGISTRY.counter(
+    "celosoul_match_candidates_scored", "Candidates scored by the matching engine"
+)
+MATCH_SCORING_SECONDS = REGISTRY.counter(
+    "celosoul_match_scoring_seconds", "Time spent scoring candidates; rate(candidates)/rate(seconds) is throughput"
+)
+
+class MetricsMiddleware:
+    """ASGI middleware recording per-route latency, status codes and in-flight requests"""
+
+    def __init__(self, app, registry: MetricsRegistry = REGISTRY):
+        """Wrap an ASGI app"""
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method = scope["method"]
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        HTTP_IN_FLIGHT.inc(method)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            HTTP_IN_FLIGHT.dec(method)
+            # The router leaves the matched route in the scope; label by its
+            # template so path parameters don't explode the series count
+            route = scope.get("route")
+            route_label = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+            HTTP_LATENCY.observe(elapsed, method, route_label)
+            HTTP_REQUESTS.inc(method, route_label, str(status["code"]))
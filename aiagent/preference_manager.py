@@ -10,6 +10,99 @@ from models import (
     BehaviorSignal, FlirtingStyle, Web3Preferences, BlockchainChain,
     TradingStyle, Web3Experience, ProgrammingLanguage
 )
+from keyword_matcher import KeywordMatcher, ordered_hits, grouped_hits
+
+# Behavior signals detected from a user's messages
+MESSAGE_BEHAVIOR_KEYWORDS = {
+    BehaviorSignal.HUMOROUS: ["lol", "haha", "😂", "funny", "joke"],
+    BehaviorSignal.INTELLECTUAL: ["why", "how", "what", "analyze", "think"],
+    BehaviorSignal.EMOTIONAL: ["feel", "emotion", "heart", "love"],
+    BehaviorSignal.DIRECT: ["yes", "no", "definitely", "absolutely", "sure"]
+}
+
+# Behavior signals detected from a profile bio
+BIO_BEHAVIOR_KEYWORDS = {
+    BehaviorSignal.PLAYFUL: ["adventure", "travel", "explore", "new"],
+    BehaviorSignal.SERIOUS: ["serious", "focused", "career", "goals"],
+    BehaviorSignal.WEB3_ENTHUSIAST: ["smart contract", "blockchain", "defi", "nft", "crypto", "solidity"],
+    BehaviorSignal.TECH_SAVVY: ["code", "programming", "github", "tech", "developer"],
+    BehaviorSignal.NERDY: ["algorithm", "data", "analysis", "technical", "nerd"]
+}
+
+MUSIC_KEYWORDS = {
+    "pop": ["pop music", "taylor swift", "beyonce", "pop songs"],
+    "rock": ["rock music", "guitar", "band", "concert", "rock"],
+    "hip_hop": ["hip hop", "rap", "hip-hop", "rapper"],
+    "electronic": ["edm", "electronic", "dance music", "techno", "house"],
+    "jazz": ["jazz", "saxophone", "blues"],
+    "classical": ["classical", "orchestra", "piano", "violin"],
+    "country": ["country", "guitar", "nashville", "country music"],
+    "r_and_b": ["r&b", "rnb", "soul", "r and b"],
+    "alternative": ["alternative", "indie", "underground"],
+    "indie": ["indie", "independent", "small venue", "local band"]
+}
+
+HOBBY_KEYWORDS = [
+    "reading", "books", "writing", "photography", "cooking", "baking",
+    "fitness", "gym", "running", "hiking", "travel", "traveling",
+    "movies", "films", "netflix", "art", "painting", "drawing",
+    "music", "singing", "playing", "instrument", "gaming", "games",
+    "sports", "football", "basketball", "soccer", "tennis", "swimming",
+    "dancing", "yoga", "meditation", "gardening", "pets", "animals"
+]
+
+PERSONALITY_INDICATORS = {
+    "extrovert": ["outgoing", "social", "party", "friends", "crowd"],
+    "introvert": ["quiet", "home", "alone", "peaceful", "solitude"],
+    "analytical": ["logic", "analysis", "data", "science", "research"],
+    "creative": ["creative", "art", "design", "imagination", "innovative"],
+    "adventurous": ["adventure", "travel", "explore", "new", "experience"],
+    "conservative": ["traditional", "classic", "stable", "consistent"]
+}
+
+LIFESTYLE_KEYWORDS = [
+    "vegan", "vegetarian", "organic", "healthy", "fitness",
+    "night owl", "early bird", "workout", "meditation",
+    "minimalist", "luxury", "budget", "travel", "homebody"
+]
+
+BLOCKCHAIN_KEYWORDS = {
+    "celo": ["celo", "celo ecosystem", "celo dapp"],
+    "ethereum": ["ethereum", "eth", "mainnet", "layer 1"],
+    "polygon": ["polygon", "matic", "layer 2"],
+    "arbitrum": ["arbitrum", "arb"],
+    "optimism": ["optimism", "op"],
+    "solana": ["solana", "sol"],
+    "avalanche": ["avalanche", "avax"],
+    "cosmos": ["cosmos", "atom"]
+}
+
+PROGRAMMING_KEYWORDS = {
+    "solidity": ["solidity", "smart contract", "ethereum development"],
+    "javascript": ["javascript", "js", "node.js", "react"],
+    "python": ["python", "py", "django", "flask"],
+    "rust": ["rust", "solana development"],
+    "go": ["go", "golang", "cosmos development"]
+}
+
+NFT_KEYWORDS = ["nft", "non-fungible", "digital art", "opensea", "collection"]
+
+COMMUNITY_KEYWORDS = ["gitcoin", "dappcon", "ethglobal", "hackathon", "dao", "governance"]
+
+# Compiled once at import. Whole-word matching keeps "go" out of "good" and
+# "art" out of "party"; every bio is scanned once for all profile tables.
+MESSAGE_BEHAVIOR_MATCHER = KeywordMatcher(MESSAGE_BEHAVIOR_KEYWORDS)
+BIO_BEHAVIOR_MATCHER = KeywordMatcher(BIO_BEHAVIOR_KEYWORDS)
+PROFILE_MATCHER = KeywordMatcher({
+    **{("music", genre): keywords for genre, keywords in MUSIC_KEYWORDS.items()},
+    **{("hobby", hobby): [hobby] for hobby in HOBBY_KEYWORDS},
+    **{("personality", personality): indicators for personality, indicators in PERSONALITY_INDICATORS.items()},
+    **{("lifestyle", lifestyle): [lifestyle] for lifestyle in LIFESTYLE_KEYWORDS},
+    **{("chain", chain): keywords for chain, keywords in BLOCKCHAIN_KEYWORDS.items()},
+    **{("language", lang): keywords for lang, keywords in PROGRAMMING_KEYWORDS.items()},
+    ("nft", "art"): NFT_KEYWORDS,
+    **{("community", keyword): [keyword] for keyword in COMMUNITY_KEYWORDS}
+})
 
 class PreferenceManager:
     """Manages user preferences and matching criteria"""
@@ -86,48 +179,29 @@ class PreferenceManager:
         
         # Analyze message patterns
         if messages:
-            combined_text = " ".join(messages).lower()
-            
-            # Detect behavior signals from text patterns
-            if any(word in combined_text for word in ["lol", "haha", "😂", "funny", "joke"]):
-                behavior_signals.append(BehaviorSignal.HUMOROUS)
-            
-            if any(word in combined_text for word in ["why", "how", "what", "analyze", "think"]):
-                behavior_signals.append(BehaviorSignal.INTELLECTUAL)
-            
-            if any(word in combined_text for word in ["feel", "emotion", "heart", "love"]):
-                behavior_signals.append(BehaviorSignal.EMOTIONAL)
+            # Detect behavior signals from text patterns in a single pass
+            hits = MESSAGE_BEHAVIOR_MATCHER.categories(" ".join(messages))
+            behavior_signals.extend(
+                signal for signal in ordered_hits(MESSAGE_BEHAVIOR_KEYWORDS, hits)
+                if signal != BehaviorSignal.DIRECT
+            )
             
             if len(messages) > 5:  # User is responsive
                 behavior_signals.append(BehaviorSignal.RESPONSIVE)
             
             # Check for directness
-            direct_indicators = ["yes", "no", "definitely", "absolutely", "sure"]
-            if any(word in combined_text for word in direct_indicators):
+            if BehaviorSignal.DIRECT in hits:
                 behavior_signals.append(BehaviorSignal.DIRECT)
             else:
                 behavior_signals.append(BehaviorSignal.SUBTLE)
         
         # Analyze profile data
         if profile_data:
-            bio = profile_data.get("bio", "").lower()
-            interests = profile_data.get("interests", [])
-            
-            if any(word in bio for word in ["adventure", "travel", "explore", "new"]):
-                behavior_signals.append(BehaviorSignal.PLAYFUL)
-            
-            if any(word in bio for word in ["serious", "focused", "career", "goals"]):
-                behavior_signals.append(BehaviorSignal.SERIOUS)
-            
-            # Detect Web3/tech signals
-            if any(word in bio for word in ["smart contract", "blockchain", "defi", "nft", "crypto", "solidity"]):
-                behavior_signals.append(BehaviorSignal.WEB3_ENTHUSIAST)
+            bio = profile_data.get("bio", "")
             
-            if any(word in bio for word in ["code", "programming", "github", "tech", "developer"]):
-                behavior_signals.append(BehaviorSignal.TECH_SAVVY)
-            
-            if any(word in bio for word in ["algorithm", "data", "analysis", "technical", "nerd"]):
-                behavior_signals.append(BehaviorSignal.NERDY)
+            # Personality and Web3/tech signals from the bio
+            hits = BIO_BEHAVIOR_MATCHER.categories(bio)
+            behavior_signals.extend(ordered_hits(BIO_BEHAVIOR_KEYWORDS, hits))
         
         return list(set(behavior_signals))  # Remove duplicates
     
@@ -150,106 +224,45 @@ class PreferenceManager:
             }
         }
         
-        bio = profile.get("bio", "").lower()
+        bio = profile.get("bio", "")
         interests = profile.get("interests", [])
-        photos = profile.get("photos", [])
         
-        # Music genre detection
-        music_keywords = {
-            "pop": ["pop music", "taylor swift", "beyonce", "pop songs"],
-            "rock": ["rock music", "guitar", "band", "concert", "rock"],
-            "hip_hop": ["hip hop", "rap", "hip-hop", "rapper"],
-            "electronic": ["edm", "electronic", "dance music", "techno", "house"],
-            "jazz": ["jazz", "saxophone", "blues"],
-            "classical": ["classical", "orchestra", "piano", "violin"],
-            "country": ["country", "guitar", "nashville", "country music"],
-            "r_and_b": ["r&b", "rnb", "soul", "r and b"],
-            "alternative": ["alternative", "indie", "underground"],
-            "indie": ["indie", "independent", "small venue", "local band"]
-        }
+        # Scan the bio once for every profile keyword table
+        hits = PROFILE_MATCHER.categories(bio)
         
-        for genre, keywords in music_keywords.items():
-            if any(keyword in bio for keyword in keywords):
-                extracted["music_genres"].append(genre)
+        # Music genre detection
+        extracted["music_genres"] = ordered_hits(MUSIC_KEYWORDS, grouped_hits(hits, "music"))
         
         # Hobby detection
-        hobby_keywords = [
-            "reading", "books", "writing", "photography", "cooking", "baking",
-            "fitness", "gym", "running", "hiking", "travel", "traveling",
-            "movies", "films", "netflix", "art", "painting", "drawing",
-            "music", "singing", "playing", "instrument", "gaming", "games",
-            "sports", "football", "basketball", "soccer", "tennis", "swimming",
-            "dancing", "yoga", "meditation", "gardening", "pets", "animals"
+        bio_hobbies = grouped_hits(hits, "hobby")
+        extracted["hobbies"] = [
+            hobby for hobby in HOBBY_KEYWORDS
+            if hobby in bio_hobbies or hobby in interests
         ]
         
-        for hobby in hobby_keywords:
-            if hobby in bio or hobby in interests:
-                extracted["hobbies"].append(hobby)
-        
         # Personality type detection
-        personality_indicators = {
-            "extrovert": ["outgoing", "social", "party", "friends", "crowd"],
-            "introvert": ["quiet", "home", "alone", "peaceful", "solitude"],
-            "analytical": ["logic", "analysis", "data", "science", "research"],
-            "creative": ["creative", "art", "design", "imagination", "innovative"],
-            "adventurous": ["adventure", "travel", "explore", "new", "experience"],
-            "conservative": ["traditional", "classic", "stable", "consistent"]
-        }
-        
-        for personality, indicators in personality_indicators.items():
-            if any(indicator in bio for indicator in indicators):
-                extracted["personality_types"].append(personality)
+        extracted["personality_types"] = ordered_hits(
+            PERSONALITY_INDICATORS, grouped_hits(hits, "personality")
+        )
         
         # Lifestyle preferences
-        lifestyle_keywords = [
-            "vegan", "vegetarian", "organic", "healthy", "fitness",
-            "night owl", "early bird", "workout", "meditation",
-            "minimalist", "luxury", "budget", "travel", "homebody"
+        bio_lifestyles = grouped_hits(hits, "lifestyle")
+        extracted["lifestyle_preferences"] = [
+            lifestyle for lifestyle in LIFESTYLE_KEYWORDS if lifestyle in bio_lifestyles
         ]
         
-        for lifestyle in lifestyle_keywords:
-            if lifestyle in bio:
-                extracted["lifestyle_preferences"].append(lifestyle)
-        
         # Web3 preference detection
-        blockchain_keywords = {
-            "celo": ["celo", "celo ecosystem", "celo dapp"],
-            "ethereum": ["ethereum", "eth", "mainnet", "layer 1"],
-            "polygon": ["polygon", "matic", "layer 2"],
-            "arbitrum": ["arbitrum", "arb"],
-            "optimism": ["optimism", "op"],
-            "solana": ["solana", "sol"],
-            "avalanche": ["avalanche", "avax"],
-            "cosmos": ["cosmos", "atom"]
-        }
-        
-        for chain, keywords in blockchain_keywords.items():
-            if any(keyword in bio for keyword in keywords):
-                extracted["web3_preferences"]["favorite_chains"].append(chain)
-        
-        # Programming language detection
-        programming_keywords = {
-            "solidity": ["solidity", "smart contract", "ethereum development"],
-            "javascript": ["javascript", "js", "node.js", "react"],
-            "python": ["python", "py", "django", "flask"],
-            "rust": ["rust", "solana development"],
-            "go": ["go", "golang", "cosmos development"]
-        }
-        
-        for lang, keywords in programming_keywords.items():
-            if any(keyword in bio for keyword in keywords):
-                extracted["web3_preferences"]["programming_languages"].append(lang)
-        
-        # NFT interests detection
-        nft_keywords = ["nft", "non-fungible", "digital art", "opensea", "collection"]
-        if any(keyword in bio for keyword in nft_keywords):
-            extracted["web3_preferences"]["nft_interests"].append("art")
+        web3 = extracted["web3_preferences"]
+        web3["favorite_chains"] = ordered_hits(BLOCKCHAIN_KEYWORDS, grouped_hits(hits, "chain"))
+        web3["programming_languages"] = ordered_hits(
+            PROGRAMMING_KEYWORDS, grouped_hits(hits, "language")
+        )
+        web3["nft_interests"] = sorted(grouped_hits(hits, "nft"))
         
-        # Web3 community detection
-        community_keywords = ["gitcoin", "dappcon", "ethglobal", "hackathon", "dao", "governance"]
-        for keyword in community_keywords:
-            if keyword in bio:
-                extracted["web3_preferences"]["web3_communities"].append(keyword)
+        bio_communities = grouped_hits(hits, "community")
+        web3["web3_communities"] = [
+            keyword for keyword in COMMUNITY_KEYWORDS if keyword in bio_communities
+        ]
         
         return extracted
     
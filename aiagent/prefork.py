@@ -0,0 +1,143 @@
+"""
+Pre-fork multi-worker server for the CeloSoul Dating AI Agent
+
+The master binds the listening socket, imports the app and warms read-only
+assets (templates, tone model, hot profiles), then forks the workers so they
+share those pages copy-on-write. Profiles and conversations live in SQLite
+files that every worker reads and writes, so any worker can serve any request.
+
+/chat turns on one conversation run one at a time across workers: the turn
+holds a lease row in the shared conversation database (TURN_LEASE_SECONDS
+frees it if the worker dies mid-turn).
+
+Per-process state that is not shared: LLM refinement results (a refinement
+poll may land on another worker) and Idempotency-Key responses (a retry that
+lands on another worker runs again).
+
+Usage:
+    python prefork.py --workers 4 --port 8000
+"""
+from typing import Dict
+import argparse
+import gc
+import os
+import signal
+import socket
+import sys
+import time
+
+def _bind(host: str, port: int, backlog: int = 2048) -> socket.socket:
+    """Bind the listening socket once, in the master"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+def _run_worker(app_module, sock: socket.socket, log_level: str) -> None:
+    """Serve the app on the inherited socket until told to stop"""
+    import uvicorn
+
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    server = uvicorn.Server(uvicorn.Config(app_module.app, log_level=log_level))
+    server.run(sockets=[sock])
+
+def serve(workers: int, host: str, port: int, log_level: str = "info") -> None:
+    """Run the pre-fork master: bind, warm up, fork and supervise workers"""
+
+    # Imported only now so Config sees the environment set up by main()
+    import main as app_module
+
+    sock = _bind(host, port)
+
+    warm_up = app_module.warm_caches()
+    print(f"🔥 Master {os.getpid()} warmed caches: {warm_up}")
+
+    # No SQLite connection may cross a fork; workers open their own
+    app_module.release_connections()
+
+    # Keep the warmed objects out of the collector so workers don't copy them
+    gc.collect()
+    gc.freeze()
+
+    children: Dict[int, int] = {}
+    stopping = False
+
+    def spawn(slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                _run_worker(app_module, sock, log_level)
+            except Exception as e:
+                print(f"Worker {os.getpid()} crashed: {e}")
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+        children[pid] = slot
+        print(f"👷 Started worker {pid} (slot {slot})")
+
+    def stop(signum, frame) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in list(children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    for slot in range(workers):
+        spawn(slot)
+
+    # Supervise: replace workers that die unless we are shutting down
+    while children:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+
+        slot = children.pop(pid, None)
+        if slot is None:
+            continue
+        if not stopping:
+            print(f"⚠️ Worker {pid} exited with status {status}; restarting")
+            time.sleep(0.5)
+            spawn(slot)
+
+    sock.close()
+    print("👋 All workers stopped")
+
+def main():
+    """Run the multi-worker server from the command line"""
+    parser = argparse.ArgumentParser(description="CeloSoul pre-fork server")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("WORKERS", "2")))
+    parser.add_argument("--host", default=os.getenv("HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("PORT", "8000")))
+    parser.add_argument(
+        "--conversation-db",
+        default=os.getenv("CONVERSATION_DB_PATH", "user_data/conversations.db"),
+        help="SQLite file holding conversation state shared by the workers"
+    )
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args()
+
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+
+    # Shared state must be configured before the app (and Config) is imported
+    os.environ["WORKERS"] = str(args.workers)
+    os.environ["CONVERSATION_DB_PATH"] = args.conversation_db
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+    serve(args.workers, args.host, args.port, args.log_level)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Bulk NDJSON profile ingestion shared by POST /users/bulk and bulk_ingest.py
+"""
+from typing import List, Dict, Any, Optional, Tuple, Iterable, Iterator, AsyncIterable
+from concurrent.futures import Executor, Future, ProcessPoolExecutor
+from pydantic import BaseModel, ValidationError
+from datetime import datetime
+import asyncio
+import multiprocessing
+import time
+import uuid
+
+from models import UserProfile
+from preference_manager import PreferenceManager
+from profile_repository import profile_row
+
+class CreateUserRequest(BaseModel):
+    name: str
+    age: int
+    location: str
+    bio: str
+    interests: List[str] = []
+    photos: List[str] = []
+    personality_types: List[str] = []
+    music_genres: List[str] = []
+    hobbies: List[str] = []
+    behavior_signals: List[str] = []
+    age_range: Optional[Tuple[int, int]] = None  # (min, max)
+    lifestyle_preferences: List[str] = []
+    deal_breakers: List[str] = []
+    must_haves: List[str] = []
+    web3_preferences: Optional[Dict[str, Any]] = None
+
+class BulkUserRecord(CreateUserRequest):
+    """One NDJSON line; an existing user_id is kept (and overwritten) so migrations stay idempotent"""
+    user_id: Optional[str] = None
+
+def build_profile(
+    request: CreateUserRequest,
+    preference_manager: PreferenceManager,
+    user_id: Optional[str] = None
+) -> UserProfile:
+    """Convert a validated request into a stored profile"""
+
+    preferences = preference_manager.create_user_preferences(
+        personality_types=request.personality_types,
+        music_genres=request.music_genres,
+        hobbies=request.hobbies,
+        behavior_signals=request.behavior_signals,
+        age_range=request.age_range,
+        lifestyle_preferences=request.lifestyle_preferences,
+        deal_breakers=request.deal_breakers,
+        must_haves=request.must_haves
+    )
+
+    if request.web3_preferences:
+        preferences.web3_preferences = preference_manager.create_web3_preferences(**request.web3_preferences)
+
+    return UserProfile(
+        user_id=user_id or str(uuid.uuid4()),
+        name=request.name,
+        age=request.age,
+        location=request.location,
+        bio=request.bio,
+        preferences=preferences,
+        interests=request.interests,
+        photos=request.photos
+    )
+
+_preference_manager: Optional[PreferenceManager] = None
+
+def convert_chunk(lines: List[Tuple[int, str]]) -> Tuple[List[Tuple[int, Tuple[Any, ...]]], List[Dict[str, Any]]]:
+    """Validate (line number, line) pairs into database rows; bad lines become errors"""
+    # Module-level so it can run in a worker process; rows pickle far cheaper than models
+    global _preference_manager
+    if _preference_manager is None:
+        _preference_manager = PreferenceManager()
+
+    now = datetime.now().isoformat()
+    rows: List[Tuple[int, Tuple[Any, ...]]] = []
+    errors: List[Dict[str, Any]] = []
+    for line_number, line in lines:
+        try:
+            record = BulkUserRecord.parse_raw(line)
+            profile = build_profile(record, _preference_manager, record.user_id)
+            rows.append((line_number, profile_row(profile, now)))
+        except ValidationError as e:
+            errors.append({"line": line_number, "error": _describe(e)})
+        except Exception as e:
+            errors.append({"line": line_number, "error": str(e)})
+    return rows, errors
+
+def _describe(error: ValidationError) -> str:
+    """Flatten a validation error into one short line"""
+    parts = []
+    for detail in error.errors():
+        location = ".".join(str(part) for part in detail.get("loc", ())) or "line"
+        parts.append(f"{location}: {detail.get('msg')}")
+    return "; ".join(parts)
+
+class IngestReport:
+    """Running totals of a bulk ingest, with the first errors kept per line"""
+
+    def __init__(self, max_errors: int = 1000):
+        """Initialize the report"""
+        self.max_errors = max_errors
+        self.received = 0
+        self.created = 0
+        self.failed = 0
+        self.chunks = 0
+        self.errors: List[Dict[str, Any]] = []
+        self._started = time.perf_counter()
+
+    def add_errors(self, errors: List[Dict[str, Any]]) -> None:
+        self.failed += len(errors)
+        room = self.max_errors - len(self.errors)
+        if room > 0:
+            self.errors.extend(errors[:room])
+
+    def to_dict(self) -> Dict[str, Any]:
+        seconds = time.perf_counter() - self._started
+        return {
+            "received": self.received,
+            "created": self.created,
+            "failed": self.failed,
+            "chunks": self.chunks,
+            "seconds": round(seconds, 3),
+            "profiles_per_second": round(self.created / seconds, 1) if seconds > 0 else None,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors)
+        }
+
+class NDJSONSplitter:
+    """Splits a byte stream into numbered lines without buffering the whole body"""
+
+    def __init__(self, max_line_bytes: int = 1 << 20):
+        """Initialize the splitter"""
+        self.max_line_bytes = max_line_bytes
+        self.line_number = 0
+        self._buffer = b""
+        self._oversized = False
+
+    def feed(self, data: bytes) -> Iterator[Tuple[int, Optional[str]]]:
+        """Yield (line number, text) for every complete line; text is None for oversized lines"""
+
+        self._buffer += data
+        start = 0
+        while True:
+            end = self._buffer.find(b"\n", start)
+            if end < 0:
+                break
+            yield from self._emit(self._buffer[start:end])
+            start = end + 1
+        self._buffer = self._buffer[start:]
+
+        # Drop the head of a runaway line instead of growing the buffer
+        if len(self._buffer) > self.max_line_bytes:
+            self._oversized = True
+            self._buffer = b""
+
+    def close(self) -> Iterator[Tuple[int, Optional[str]]]:
+        """Yield the last line when the stream does not end with a newline"""
+        if self._buffer or self._oversized:
+            yield from self._emit(self._buffer)
+        self._buffer = b""
+
+    def _emit(self, raw: bytes) -> Iterator[Tuple[int, Optional[str]]]:
+        self.line_number += 1
+        if self._oversized:
+            self._oversized = False
+            yield self.line_number, None
+            return
+        if raw.strip():
+            yield self.line_number, raw.decode("utf-8", errors="replace")
+
+def create_executor(workers: int) -> ProcessPoolExecutor:
+    """Process pool for chunk conversion"""
+    # spawn: never fork a process that may be running server threads
+    return ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context("spawn"))
+
+class ProfileIngestor:
+    """Validates NDJSON profiles in chunks and writes each chunk in one transaction"""
+
+    def __init__(
+        self,
+        repository,
+        chunk_size: int = 1000,
+        workers: int = 0,
+        max_errors: int = 1000,
+        max_line_bytes: int = 1 << 20,
+        executor: Optional[Executor] = None
+    ):
+        """Initialize the ingestor; a shared executor (owned by the caller) or workers > 0 converts chunks in processes"""
+        self.repository = repository
+        self.chunk_size = max(1, chunk_size)
+        self.workers = workers
+        self.max_errors = max_errors
+        self.max_line_bytes = max_line_bytes
+        self.shared_executor = executor
+
+    def _executor(self) -> Tuple[Optional[Executor], bool]:
+        """The executor for one ingest and whether this ingest owns (and shuts down) it"""
+        if self.shared_executor is not None:
+            return self.shared_executor, False
+        if self.workers <= 0:
+            return None, False
+        return create_executor(self.workers), True
+
+    def _write(self, rows: List[Tuple[int, Tuple[Any, ...]]]) -> Tuple[int, List[Dict[str, Any]]]:
+        """Write one converted chunk; a failed transaction fails only its own lines"""
+        if not rows:
+            return 0, []
+        try:
+            # Bulk loads are not hot, so they bypass the profile cache
+            return self.repository.save_rows([row for _, row in rows]), []
+        except Exception as e:
+            return 0, [{"line": line_number, "error": f"write failed: {e}"} for line_number, _ in rows]
+
+    def _convert(self, report: IngestReport, result) -> List[Tuple[int, Tuple[Any, ...]]]:
+        rows, errors = result
+        report.chunks += 1
+        report.add_errors(errors)
+        return rows
+
+    def _record_write(self, report: IngestReport, written: Tuple[int, List[Dict[str, Any]]]) -> None:
+        created, errors = written
+        report.created += created
+        report.add_errors(errors)
+
+    def _collect(self, report: IngestReport, result) -> None:
+        self._record_write(report, self._write(self._convert(report, result)))
+
+    def ingest_lines(self, lines: Iterable[Tuple[int, Optional[str]]]) -> IngestReport:
+        """Ingest numbered lines synchronously (used by the CLI)"""
+
+        report = IngestReport(self.max_errors)
+        executor, owned = self._executor()
+        pending: List[Future] = []
+
+        def submit(chunk: List[Tuple[int, str]]) -> None:
+            if executor is None:
+                self._collect(report, convert_chunk(chunk))
+                return
+            pending.append(executor.submit(convert_chunk, chunk))
+            # Bounded in-flight chunks; results are written in input order
+            while len(pending) > self.workers * 2:
+                self._collect(report, pending.pop(0).result())
+
+        try:
+            chunk: List[Tuple[int, str]] = []
+            for line_number, text in lines:
+                report.received += 1
+                if text is None:
+                    report.add_errors([{"line": line_number, "error": f"line exceeds {self.max_line_bytes} bytes"}])
+                    continue
+                chunk.append((line_number, text))
+                if len(chunk) >= self.chunk_size:
+                    submit(chunk)
+                    chunk = []
+            if chunk:
+                submit(chunk)
+            for future in pending:
+                self._collect(report, future.result())
+        finally:
+            if owned:
+                executor.shutdown()
+
+        return report
+
+    def ingest_file(self, stream, read_size: int = 1 << 16) -> IngestReport:
+        """Ingest an NDJSON binary file object"""
+
+        splitter = NDJSONSplitter(self.max_line_bytes)
+
+        def lines() -> Iterator[Tuple[int, Optional[str]]]:
+            while True:
+                data = stream.read(read_size)
+                if not data:
+                    break
+                yield from splitter.feed(data)
+            yield from splitter.close()
+
+        return self.ingest_lines(lines())
+
+    async def ingest_stream(self, body: AsyncIterable[bytes]) -> IngestReport:
+        """Ingest a request body as it arrives; conversion and writes run off the event loop"""
+
+        report = IngestReport(self.max_errors)
+        splitter = NDJSONSplitter(self.max_line_bytes)
+        loop = asyncio.get_running_loop()
+        executor, owned = self._executor()
+        # The next chunk is read and converted while the previous one is written
+        writing: Optional[asyncio.Future] = None
+        chunk: List[Tuple[int, str]] = []
+
+        async def flush(chunk: List[Tuple[int, str]]) -> None:
+            nonlocal writing
+            rows = self._convert(report, await loop.run_in_executor(executor, convert_chunk, chunk))
+            if writing is not None:
+                self._record_write(report, await writing)
+            writing = asyncio.ensure_future(asyncio.to_thread(self._write, rows))
+
+        def take(lines: Iterable[Tuple[int, Optional[str]]]) -> List[List[Tuple[int, str]]]:
+            nonlocal chunk
+            ready = []
+            for line_number, text in lines:
+                report.received += 1
+                if text is None:
+                    report.add_errors([{"line": line_number, "error": f"line exceeds {self.max_line_bytes} bytes"}])
+                    continue
+                chunk.append((line_number, text))
+                if len(chunk) >= self.chunk_size:
+                    ready.append(chunk)
+                    chunk = []
+            return ready
+
+        try:
+            async for data in body:
+                for ready in take(splitter.feed(data)):
+                    await flush(ready)
+            for ready in take(splitter.close()):
+                await flush(ready)
+            if chunk:
+                await flush(chunk)
+            if writing is not None:
+                self._record_write(report, await writing)
+        finally:
+            if owned:
+                executor.shutdown(wait=False)
+
+        return report
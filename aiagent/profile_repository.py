@@ -0,0 +1,395 @@
+"""
+SQLite-backed user profile repository with a write-through LRU cache
+"""
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Tuple
+from collections import OrderedDict
+import itertools
+from datetime import datetime
+import json
+import sqlite3
+import threading
+
+from models import UserProfile
+from sqlite_connections import SQLiteConnections
+
+SCHEMA_VERSION = 1
+
+# Columns the matching engine reads for each candidate, in match_data shape
+CANDIDATE_COLUMNS = (
+    "user_id", "name", "age", "location", "bio", "photos", "music_genres", "hobbies",
+    "personality_types", "behavior_signals", "lifestyle_preferences", "web3_preferences"
+)
+_JSON_COLUMNS = frozenset((
+    "photos", "music_genres", "hobbies", "personality_types", "behavior_signals",
+    "lifestyle_preferences", "web3_preferences"
+))
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS user_profiles (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    age INTEGER NOT NULL,
+    location TEXT NOT NULL,
+    bio TEXT NOT NULL,
+    photos TEXT NOT NULL,
+    music_genres TEXT NOT NULL,
+    hobbies TEXT NOT NULL,
+    personality_types TEXT NOT NULL,
+    behavior_signals TEXT NOT NULL,
+    lifestyle_preferences TEXT NOT NULL,
+    web3_preferences TEXT,
+    profile_json TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_user_profiles_age ON user_profiles (age);
+CREATE INDEX IF NOT EXISTS idx_user_profiles_location ON user_profiles (location COLLATE NOCASE, age);
+"""
+
+_UPSERT = """
+INSERT INTO user_profiles (
+    user_id, name, age, location, bio, photos, music_genres, hobbies,
+    personality_types, behavior_signals, lifestyle_preferences, web3_preferences,
+    profile_json, created_at, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (user_id) DO UPDATE SET
+    name = excluded.name,
+    age = excluded.age,
+    location = excluded.location,
+    bio = excluded.bio,
+    photos = excluded.photos,
+    music_genres = excluded.music_genres,
+    hobbies = excluded.hobbies,
+    personality_types = excluded.personality_types,
+    behavior_signals = excluded.behavior_signals,
+    lifestyle_preferences = excluded.lifestyle_preferences,
+    web3_preferences = excluded.web3_preferences,
+    profile_json = excluded.profile_json,
+    updated_at = excluded.updated_at
+"""
+
+_SELECT_PROFILE = "SELECT profile_json, updated_at FROM user_profiles WHERE user_id = ?"
+_SELECT_UPDATED_AT = "SELECT updated_at FROM user_profiles WHERE user_id = ?"
+_EXISTS = "SELECT 1 FROM user_profiles WHERE user_id = ?"
+_DELETE = "DELETE FROM user_profiles WHERE user_id = ?"
+_COUNT = "SELECT COUNT(*) FROM user_profiles"
+
+# SQLite's default limit on bound parameters is 999 on older builds
+_IN_CHUNK = 500
+
+def profile_row(profile: UserProfile, now: str) -> Tuple[Any, ...]:
+    """Flatten a profile into the table row, candidate columns first"""
+    profile_json = profile.json()
+    data = json.loads(profile_json)
+    preferences = data["preferences"]
+    web3 = preferences.get("web3_preferences")
+    return (
+        profile.user_id, profile.name, profile.age, profile.location, profile.bio,
+        json.dumps(data["photos"]),
+        json.dumps(preferences["music_genres"]),
+        json.dumps(preferences["hobbies"]),
+        json.dumps(preferences["personality_types"]),
+        json.dumps(preferences["behavior_signals"]),
+        json.dumps(preferences["lifestyle_preferences"]),
+        json.dumps(web3) if web3 is not None else None,
+        profile_json,
+        data["created_at"], now
+    )
+
+class ProfileRepository:
+    """Durable profile storage shared by workers, with hot profiles kept in memory"""
+
+    def __init__(
+        self,
+        db_path: str,
+        cache_size: int = 10000,
+        busy_timeout: float = 5.0,
+        mmap_size: int = 0,
+        shared: bool = False
+    ):
+        """Open (or create) the database and its schema"""
+        self.db_path = db_path
+        self.cache_size = cache_size
+        # Other processes write to the same file, so cached profiles are
+        # revalidated against their updated_at stamp
+        self.shared = shared
+        self._connections = SQLiteConnections(db_path, busy_timeout, mmap_size)
+
+        self._cache: "OrderedDict[str, Tuple[UserProfile, str]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+        connection = self._connection()
+        with connection:
+            connection.executescript(_SCHEMA)
+            connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def _connection(self) -> sqlite3.Connection:
+        return self._connections.get()
+
+    def _cache_get(self, user_id: str) -> Optional[Tuple[UserProfile, str]]:
+        with self._cache_lock:
+            entry = self._cache.get(user_id)
+            if entry is None:
+                self.cache_misses += 1
+                return None
+            self._cache.move_to_end(user_id)
+            self.cache_hits += 1
+            return entry
+
+    def _cache_put(self, profile: UserProfile, updated_at: str) -> None:
+        if self.cache_size <= 0:
+            return
+        with self._cache_lock:
+            self._cache[profile.user_id] = (profile, updated_at)
+            self._cache.move_to_end(profile.user_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _cache_drop(self, user_id: str) -> None:
+        with self._cache_lock:
+            self._cache.pop(user_id, None)
+
+    def save(self, profile: UserProfile) -> UserProfile:
+        """Insert or update a profile; the cache is updated after the commit"""
+
+        now = datetime.now().isoformat()
+        connection = self._connection()
+        with connection:
+            connection.execute(_UPSERT, profile_row(profile, now))
+        self._cache_put(profile, now)
+        return profile
+
+    def save_many(self, profiles: Iterable[UserProfile]) -> int:
+        """Insert or update many profiles in one transaction"""
+
+        profiles = list(profiles)
+        now = datetime.now().isoformat()
+        connection = self._connection()
+        with connection:
+            connection.executemany(_UPSERT, [profile_row(profile, now) for profile in profiles])
+        for profile in profiles:
+            self._cache_put(profile, now)
+        return len(profiles)
+
+    def save_rows(self, rows: List[Tuple[Any, ...]]) -> int:
+        """Write rows built by profile_row in one transaction, bypassing the cache"""
+
+        connection = self._connection()
+        with connection:
+            connection.executemany(_UPSERT, rows)
+        for row in rows:
+            self._cache_drop(row[0])
+        return len(rows)
+
+    def delete(self, user_id: str) -> bool:
+        connection = self._connection()
+        with connection:
+            deleted = connection.execute(_DELETE, (user_id,)).rowcount > 0
+        self._cache_drop(user_id)
+        return deleted
+
+    def get(self, user_id: str) -> Optional[UserProfile]:
+        """Get a profile, from the cache when it is hot"""
+
+        entry = self._cache_get(user_id)
+        connection = self._connection()
+        if entry is not None:
+            if not self.shared:
+                return entry[0]
+            # Another worker may have updated it; a key lookup is far cheaper than a parse
+            row = connection.execute(_SELECT_UPDATED_AT, (user_id,)).fetchone()
+            if row is not None and row[0] == entry[1]:
+                return entry[0]
+            self._cache_drop(user_id)
+
+        row = connection.execute(_SELECT_PROFILE, (user_id,)).fetchone()
+        if row is None:
+            return None
+
+        profile = UserProfile.parse_raw(row[0])
+        self._cache_put(profile, row[1])
+        return profile
+
+    def get_many(self, user_ids: Iterable[str]) -> Dict[str, UserProfile]:
+        """Get many profiles at once; missing ids are left out"""
+
+        found: Dict[str, UserProfile] = {}
+        cached: Dict[str, Tuple[UserProfile, str]] = {}
+        missing: List[str] = []
+        for user_id in dict.fromkeys(user_ids):
+            entry = self._cache_get(user_id)
+            if entry is None:
+                missing.append(user_id)
+            else:
+                cached[user_id] = entry
+
+        connection = self._connection()
+
+        if self.shared and cached:
+            ids = list(cached)
+            current: Dict[str, str] = {}
+            for start in range(0, len(ids), _IN_CHUNK):
+                chunk = ids[start:start + _IN_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                current.update(connection.execute(
+                    f"SELECT user_id, updated_at FROM user_profiles WHERE user_id IN ({placeholders})",
+                    chunk
+                ))
+            for user_id, (profile, updated_at) in cached.items():
+                if current.get(user_id) == updated_at:
+                    found[user_id] = profile
+                else:
+                    self._cache_drop(user_id)
+                    missing.append(user_id)
+        else:
+            found.update((user_id, entry[0]) for user_id, entry in cached.items())
+
+        for start in range(0, len(missing), _IN_CHUNK):
+            chunk = missing[start:start + _IN_CHUNK]
+            placeholders = ",".join("?" * len(chunk))
+            rows = connection.execute(
+                f"SELECT user_id, profile_json, updated_at FROM user_profiles WHERE user_id IN ({placeholders})",
+                chunk
+            )
+            for user_id, profile_json, updated_at in rows:
+                profile = UserProfile.parse_raw(profile_json)
+                self._cache_put(profile, updated_at)
+                found[user_id] = profile
+
+        return found
+
+    def exists(self, user_id: str) -> bool:
+        if not self.shared:
+            with self._cache_lock:
+                if user_id in self._cache:
+                    return True
+        return self._connection().execute(_EXISTS, (user_id,)).fetchone() is not None
+
+    def __contains__(self, user_id: object) -> bool:
+        return isinstance(user_id, str) and self.exists(user_id)
+
+    def count(self) -> int:
+        return self._connection().execute(_COUNT).fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def _candidate_query(
+        self,
+        columns: str,
+        min_age: Optional[int],
+        max_age: Optional[int],
+        location: Optional[str],
+        exclude_user_id: Optional[str]
+    ) -> Tuple[str, List[Any]]:
+        clauses, params = [], []
+        if location:
+            clauses.append("location = ? COLLATE NOCASE")
+            params.append(location)
+        if min_age is not None:
+            clauses.append("age >= ?")
+            params.append(min_age)
+        if max_age is not None:
+            clauses.append("age <= ?")
+            params.append(max_age)
+        if exclude_user_id:
+            clauses.append("user_id != ?")
+            params.append(exclude_user_id)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return f"SELECT {columns} FROM user_profiles{where}", params
+
+    def find_ids(
+        self,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+        location: Optional[str] = None,
+        exclude_user_id: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[str]:
+        """Get ids of profiles matching the age/location filters (index-backed)"""
+
+        sql, params = self._candidate_query("user_id", min_age, max_age, location, exclude_user_id)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return [row[0] for row in self._connection().execute(sql, params)]
+
+    def iter_candidates(
+        self,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+        location: Optional[str] = None,
+        exclude_user_id: Optional[str] = None,
+        batch_size: int = 1000
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Stream candidate feature columns in batches, shaped like match_data dicts"""
+
+        sql, params = self._candidate_query(
+            ", ".join(CANDIDATE_COLUMNS), min_age, max_age, location, exclude_user_id
+        )
+        cursor = self._connection().execute(sql, params)
+        loads = json.loads
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            batch = []
+            for row in rows:
+                candidate = {}
+                for column, value in zip(CANDIDATE_COLUMNS, row):
+                    candidate[column] = loads(value) if column in _JSON_COLUMNS and value is not None else value
+                batch.append(candidate)
+            yield batch
+
+    def load_candidates(
+        self,
+        min_age: Optional[int] = None,
+        max_age: Optional[int] = None,
+        location: Optional[str] = None,
+        exclude_user_id: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Load candidate feature columns for the matching engine"""
+
+        candidates: List[Dict[str, Any]] = []
+        for batch in self.iter_candidates(min_age, max_age, location, exclude_user_id):
+            candidates.extend(batch)
+            if limit is not None and len(candidates) >= limit:
+                return candidates[:limit]
+        return candidates
+
+    def cache_stats(self) -> Dict[str, Any]:
+        with self._cache_lock:
+            return {
+                "cached_profiles": len(self._cache),
+                "cache_size": self.cache_size,
+                "hits": self.cache_hits,
+                "misses": self.cache_misses
+            }
+
+    def cache_sample(self, limit: int) -> List[UserProfile]:
+        """Get up to `limit` cached profiles, least recently used first (for memory estimates)"""
+        with self._cache_lock:
+            return [profile for profile, _ in itertools.islice(self._cache.values(), limit)]
+
+    def warm(self, limit: int) -> int:
+        """Load the most recently updated profiles into the cache"""
+
+        # A cache inherited across a fork is left alone so its pages stay shared
+        with self._cache_lock:
+            if self._cache:
+                return len(self._cache)
+        rows = self._connection().execute(
+            "SELECT profile_json, updated_at FROM user_profiles ORDER BY updated_at DESC LIMIT ?",
+            (min(limit, self.cache_size),)
+        ).fetchall()
+        for profile_json, updated_at in reversed(rows):
+            self._cache_put(UserProfile.parse_raw(profile_json), updated_at)
+        return len(rows)
+
+    def close(self) -> None:
+        """Close every connection opened by any thread"""
+        self._connections.close()
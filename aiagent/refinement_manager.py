@@ -0,0 +1,130 @@
+"""
+Background LLM refinement of template replies
+"""
+from typing import List, Dict, Any, Optional, Callable, Set, AsyncIterator
+from collections import OrderedDict
+from datetime import datetime
+import asyncio
+
+class RefinementManager:
+    """Runs LLM rewrites of sent replies in the background and keeps the results as suggested edits"""
+
+    def __init__(self, max_concurrency: int = 4, max_records: int = 10000, timeout: float = 30.0):
+        """Initialize the refinement manager"""
+        self.max_concurrency = max_concurrency
+        self.max_records = max_records
+        self.timeout = timeout
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+
+    def schedule(
+        self,
+        conversation_id: str,
+        message_id: str,
+        original: str,
+        generate: Callable[..., str],
+        *args: Any
+    ) -> Dict[str, Any]:
+        """Start refining a reply; must be called from the event loop"""
+
+        record = {
+            "conversation_id": conversation_id,
+            "message_id": message_id,
+            "status": "pending",
+            "original": original,
+            "refined": None,
+            "requested_at": datetime.now().isoformat(),
+            "completed_at": None
+        }
+        self._store(message_id, record)
+
+        task = asyncio.get_running_loop().create_task(self._run(record, generate, args))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return record
+
+    def _store(self, message_id: str, record: Dict[str, Any]) -> None:
+        self._records[message_id] = record
+        self._records.move_to_end(message_id)
+        while len(self._records) > self.max_records:
+            self._records.popitem(last=False)
+
+    async def _run(self, record: Dict[str, Any], generate: Callable[..., str], args: tuple) -> None:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        try:
+            await self._semaphore.acquire()
+            # The slot belongs to the worker thread, not to this task: a timed-out
+            # or cancelled call keeps talking to the LLM until it returns, so the
+            # slot is released only then and the concurrency cap still holds
+            work = asyncio.ensure_future(asyncio.to_thread(generate, *args))
+            work.add_done_callback(self._release)
+            refined = await asyncio.wait_for(asyncio.shield(work), self.timeout)
+        except asyncio.CancelledError:
+            record["status"] = "cancelled"
+            raise
+        except Exception as e:
+            print(f"Error refining message {record['message_id']}: {e}")
+            record["status"] = "failed"
+        else:
+            refined = (refined or "").strip()
+            # Nothing to suggest if the model produced the same text
+            record["status"] = "ready" if refined and refined != record["original"] else "unchanged"
+            record["refined"] = refined or None
+        finally:
+            record["completed_at"] = datetime.now().isoformat()
+
+        self._publish(record)
+
+    def _release(self, work: "asyncio.Future[str]") -> None:
+        if not work.cancelled():
+            work.exception()  # Retrieved here in case nobody waited for the result
+        self._semaphore.release()
+
+    def _publish(self, record: Dict[str, Any]) -> None:
+        for queue in list(self._subscribers.get(record["conversation_id"], ())):
+            queue.put_nowait(dict(record))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def get(self, message_id: str) -> Optional[Dict[str, Any]]:
+        """Get the refinement record for an AI message"""
+        record = self._records.get(message_id)
+        return dict(record) if record else None
+
+    def for_conversation(self, conversation_id: str) -> List[Dict[str, Any]]:
+        """Get every retained refinement record for a conversation"""
+        return [
+            dict(record) for record in self._records.values()
+            if record["conversation_id"] == conversation_id
+        ]
+
+    async def subscribe(self, conversation_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Yield refinement records for a conversation as they complete"""
+
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(conversation_id, set()).add(queue)
+        try:
+            while True:
+                yield await queue.get()
+        finally:
+            subscribers = self._subscribers.get(conversation_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[conversation_id]
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def close(self) -> None:
+        """Cancel refinements that are still running"""
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,209 @@
+"""
+On-demand profiling of single requests, guarded by the admin token
+"""
+from typing import List, Dict, Any, Optional, Tuple
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qs
+import cProfile
+import hmac
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+
+PROFILE_MODES = ("sample", "cprofile")
+PROFILE_OUTPUTS = ("attachment", "file")
+
+# Leaf frames of threads that are parked, not working
+IDLE_FRAMES = {
+    ("selectors.py", "select"),
+    ("threading.py", "wait"),
+    ("thread.py", "_worker"),
+    ("queue.py", "get"),
+}
+
+def is_admin(headers: Dict[str, str], admin_token: Optional[str]) -> bool:
+    """Check the X-Admin-Token header in constant time; no token configured means no admin"""
+    if not admin_token:
+        return False
+    supplied = headers.get("x-admin-token", "")
+    return hmac.compare_digest(supplied.encode(), admin_token.encode())
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """Samples every thread's Python stack on a timer and counts collapsed stacks"""
+
+    def __init__(self, interval: float = 0.002, max_depth: int = 128):
+        """Initialize the sampler"""
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None and len(stack) < self.max_depth:
+                    stack.append(_frame_label(frame))
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        """Brendan Gregg collapsed-stack format, for flamegraph.pl or speedscope"""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+class RequestProfilerMiddleware:
+    """ASGI middleware profiling requests that ask for it with a valid admin token"""
+
+    # Opt in with "X-Profile: sample|cprofile" or ?_profile=...; the profile comes
+    # back as an attachment, or with "X-Profile-Output: file" it is written to
+    # output_dir and the normal response goes through. One profile at a time.
+
+    def __init__(
+        self,
+        app,
+        admin_token: str,
+        output_dir: str = "profiles",
+        default_output: str = "attachment",
+        sample_interval: float = 0.002
+    ):
+        """Wrap an ASGI app"""
+        self.app = app
+        self.admin_token = admin_token
+        self.output_dir = output_dir
+        self.default_output = default_output
+        self.sample_interval = sample_interval
+        self._busy = threading.Lock()
+
+    def _requested(self, scope) -> Optional[Tuple[str, str]]:
+        """Get (mode, output) when the request asks for a profile and is authorized"""
+
+        headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope.get("headers", ())}
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        mode = headers.get("x-profile") or (query.get("_profile") or [None])[0]
+        if not mode:
+            return None
+        if not is_admin(headers, self.admin_token):
+            return None  # ignored rather than refused, so the flag reveals nothing
+        mode = mode if mode in PROFILE_MODES else "sample"
+        output = headers.get("x-profile-output") or (query.get("_profile_output") or [self.default_output])[0]
+        return mode, output if output in PROFILE_OUTPUTS else self.default_output
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope.get("headers"):
+            await self.app(scope, receive, send)
+            return
+
+        requested = self._requested(scope)
+        if requested is None:
+            await self.app(scope, receive, send)
+            return
+
+        if not self._busy.acquire(blocking=False):
+            async def send_busy(message):
+                if message["type"] == "http.response.start":
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-profile-skipped", b"busy")]
+                await send(message)
+
+            await self.app(scope, receive, send_busy)
+            return
+
+        try:
+            await self._profile(scope, receive, send, *requested)
+        finally:
+            self._busy.release()
+
+    async def _profile(self, scope, receive, send, mode: str, output: str) -> None:
+        started = datetime.now()
+        route_hint = re.sub(r"[^A-Za-z0-9]+", "_", scope.get("path", "")).strip("_") or "root"
+        extension = "collapsed" if mode == "sample" else "prof"
+        path = os.path.join(
+            self.output_dir,
+            f"{started.strftime('%Y%m%d-%H%M%S-%f')}-{scope['method'].lower()}-{route_hint}.{extension}"
+        )
+        messages: List[Dict[str, Any]] = []
+
+        async def capture(message):
+            if output == "attachment":
+                messages.append(message)
+                return
+            if message["type"] == "http.response.start":
+                message = dict(message)
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-path", path.encode())]
+            await send(message)
+
+        if mode == "cprofile":
+            # Deterministic, but only sees the event-loop thread
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                await self.app(scope, receive, capture)
+            finally:
+                profiler.disable()
+            if output == "file":
+                os.makedirs(self.output_dir, exist_ok=True)
+                profiler.dump_stats(path)
+            else:
+                buffer = io.StringIO()
+                pstats.Stats(profiler, stream=buffer).sort_stats("cumulative").print_stats(80)
+                body = buffer.getvalue().encode()
+        else:
+            # Sees every thread, including to_thread work, plus whatever else
+            # this worker runs concurrently
+            sampler = StackSampler(self.sample_interval)
+            sampler.start()
+            try:
+                await self.app(scope, receive, capture)
+            finally:
+                sampler.stop()
+            if output == "file":
+                os.makedirs(self.output_dir, exist_ok=True)
+                with open(path, "w", encoding="utf-8") as f:
+                    f.write(sampler.collapsed())
+            else:
+                body = sampler.collapsed().encode()
+
+        if output == "file":
+            return
+
+        status = next((message["status"] for message in messages if message["type"] == "http.response.start"), 500)
+        filename = os.path.basename(path).replace(".prof", ".txt")
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-type", b"text/plain; charset=utf-8"),
+                (b"content-length", str(len(body)).encode()),
+                (b"content-disposition", f'attachment; filename="{filename}"'.encode()),
+                (b"x-profiled-status", str(status).encode()),
+            ]
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,66 @@
+"""
+Per-thread SQLite connections shared by the local stores
+"""
+from typing import List, Optional
+import os
+import sqlite3
+import threading
+
+class SQLiteConnections:
+    """Opens one WAL-mode connection per thread for a database file"""
+
+    def __init__(self, db_path: str, busy_timeout: float = 5.0, mmap_size: int = 0):
+        """Initialize the pool; connections are opened lazily"""
+        self.db_path = db_path
+        self.busy_timeout = busy_timeout
+        self.mmap_size = mmap_size
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def get(self) -> sqlite3.Connection:
+        """Get this thread's connection; statements are cached per connection"""
+
+        # A connection must never be used on both sides of a fork
+        if self._pid != os.getpid():
+            self.reset_after_fork()
+
+        connection: Optional[sqlite3.Connection] = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.db_path,
+                timeout=self.busy_timeout,
+                check_same_thread=False,
+                cached_statements=256
+            )
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            connection.execute("PRAGMA temp_store = MEMORY")
+            if self.mmap_size:
+                # Reads go through the OS page cache, shared by every worker
+                connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def reset_after_fork(self) -> None:
+        """Forget connections inherited from the parent without touching them"""
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+    def close(self) -> None:
+        """Close every connection opened by any thread"""
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
@@ -0,0 +1,206 @@
+"""
+Cold-start benchmark: fresh interpreter to first requests served, per warm-up mode
+"""
+from typing import List, Dict, Any, Optional
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+MODES = ("lazy", "background", "blocking")
+# Seconds since the interpreter was spawned, compared across runs and against a baseline
+TRACKED_MILESTONES = ("imported", "started", "first_response", "first_chat", "ready")
+
+def _first_requests() -> List[Dict[str, Any]]:
+    """The first things a fresh worker is asked to do, in order"""
+    from synthetic_profiles import SyntheticProfileGenerator
+
+    generator = SyntheticProfileGenerator(7)
+    return [
+        {"name": "health", "method": "GET", "url": "/health"},
+        {"name": "create_user", "method": "POST", "url": "/users", "json": generator.create_user_request()},
+        {"name": "create_match", "method": "POST", "url": "/users", "json": generator.create_user_request()},
+        {"name": "analyze", "method": "POST", "url": "/matches/analyze", "json": {"potential_matches": list(generator.candidates(5))}},
+        {"name": "create_conversation", "method": "POST", "url": "/conversations", "json": {"intensity": "moderate"}},
+        {"name": "chat", "method": "POST", "url": "/chat", "json": {"message": "Hey! How's your week going?"}}
+    ]
+
+async def _serve_first_requests(app_module, spawned_at: float) -> Dict[str, Any]:
+    import httpx
+
+    app = app_module.app
+    milestones: Dict[str, float] = {}
+    latencies: Dict[str, float] = {}
+    ids: Dict[str, str] = {}
+
+    async with app.router.lifespan_context(app):
+        milestones["started"] = time.time() - spawned_at
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://startup", timeout=None) as client:
+            for request in _first_requests():
+                body = dict(request.get("json") or {})
+                params = None
+                if request["name"] == "analyze":
+                    body["user_id"] = ids["create_user"]
+                elif request["name"] == "create_conversation":
+                    params = {"user_id": ids["create_user"], "match_user_id": ids["create_match"]}
+                elif request["name"] == "chat":
+                    body.update({
+                        "conversation_id": ids["create_conversation"],
+                        "sender_id": ids["create_user"],
+                        "receiver_id": ids["create_match"]
+                    })
+
+                started = time.perf_counter()
+                response = await client.request(request["method"], request["url"], params=params, json=body or None)
+                latencies[request["name"]] = round((time.perf_counter() - started) * 1e3, 2)
+                if response.status_code >= 400:
+                    raise RuntimeError(f"{request['name']} returned {response.status_code}: {response.text[:200]}")
+                data = response.json().get("data") or {}
+                ids[request["name"]] = data.get("user_id") or data.get("conversation_id")
+                if request["name"] == "health":
+                    milestones["first_response"] = time.time() - spawned_at
+
+            milestones["first_chat"] = time.time() - spawned_at
+            if app_module.warm_up_task is not None:
+                await asyncio.wait([app_module.warm_up_task])
+            milestones["ready"] = time.time() - spawned_at
+
+    return {
+        "milestones": {name: round(seconds, 4) for name, seconds in milestones.items()},
+        "first_request_ms": latencies,
+        "startup": app_module.components.startup_report()
+    }
+
+def run_child(spawned_at: float, workdir: str) -> Dict[str, Any]:
+    """Runs inside the fresh interpreter: import the app, start it, serve the first requests"""
+    from load_test import load_app, StubLLMClient
+
+    app_module, _ = load_app(workdir, StubLLMClient(latency=0.0))
+    imported_at = time.time() - spawned_at
+    result = asyncio.run(_serve_first_requests(app_module, spawned_at))
+    result["milestones"]["imported"] = round(imported_at, 4)
+    return result
+
+def run_mode(mode: str, runs: int) -> Dict[str, Any]:
+    """Spawn `runs` fresh interpreters with STARTUP_WARM_UP=mode and take medians"""
+
+    samples = []
+    for _ in range(runs):
+        with tempfile.TemporaryDirectory(prefix="celosoul-startup-") as workdir:
+            env = {**os.environ, "STARTUP_WARM_UP": mode, "OPENAI_API_KEY": os.environ.get("OPENAI_API_KEY", "startup")}
+            spawned_at = time.time()
+            completed = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", str(spawned_at), workdir],
+                env=env, capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+            )
+        if completed.returncode != 0:
+            raise RuntimeError(f"{mode} run failed:\n{completed.stderr[-2000:]}")
+        # The child's last line is its report; anything before it is app output
+        samples.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    def median(values: List[float]) -> float:
+        return round(statistics.median(values), 4)
+
+    milestones = {
+        name: median([sample["milestones"][name] for sample in samples])
+        for name in TRACKED_MILESTONES if all(name in sample["milestones"] for sample in samples)
+    }
+    first_request_ms = {
+        name: median([sample["first_request_ms"][name] for sample in samples])
+        for name in samples[0]["first_request_ms"]
+    }
+    steps: Dict[str, List[float]] = {}
+    for sample in samples:
+        for step in sample["startup"]["steps"]:
+            steps.setdefault(f"{step['kind']}:{step['name']}", []).append(step["seconds"])
+
+    return {
+        "mode": mode,
+        "runs": runs,
+        "milestones": milestones,
+        "first_request_ms": first_request_ms,
+        "steps": {name: median(values) for name, values in steps.items()}
+    }
+
+def compare_reports(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float = 0.1) -> List[str]:
+    """Describe every milestone that got slower than the baseline by more than tolerance"""
+
+    previous = {result["mode"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in current["results"]:
+        before = previous.get(result["mode"])
+        if before is None:
+            continue
+        for name in TRACKED_MILESTONES:
+            old = before["milestones"].get(name)
+            new = result["milestones"].get(name)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if change > tolerance:
+                regressions.append(f"{result['mode']} {name}: {old}s -> {new}s ({change:+.1%})")
+    return regressions
+
+def main():
+    """Run the startup benchmark from the command line"""
+    if len(sys.argv) == 4 and sys.argv[1] == "--child":
+        print(json.dumps(run_child(float(sys.argv[2]), sys.argv[3])))
+        return
+
+    parser = argparse.ArgumentParser(description="CeloSoul cold-start benchmark")
+    parser.add_argument("--modes", default=",".join(MODES), help=f"Comma-separated warm-up modes from: {', '.join(MODES)}")
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per mode (medians are reported)")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    parser.add_argument("--baseline", help="JSON report to compare against; exits 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown")
+    args = parser.parse_args()
+
+    modes = [mode.strip() for mode in args.modes.split(",") if mode.strip()]
+    unknown = set(modes) - set(MODES)
+    if unknown:
+        parser.error(f"Unknown modes: {', '.join(sorted(unknown))}")
+
+    report = {
+        "benchmark": "startup",
+        "created_at": datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "results": [run_mode(mode, args.runs) for mode in modes]
+    }
+    regressions: Optional[List[str]] = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_reports(json.load(f), report, args.tolerance)
+        report["regressions"] = regressions
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    if args.json:
+        print(json.dumps(report))
+    else:
+        for result in report["results"]:
+            milestones = result["milestones"]
+            print(f"⏱️  {result['mode']:<10} (median of {result['runs']}) "
+                  + "  ".join(f"{name} {milestones[name]}s" for name in TRACKED_MILESTONES if name in milestones))
+            print("    first requests: " + "  ".join(f"{name} {ms} ms" for name, ms in result["first_request_ms"].items()))
+            slowest = sorted(result["steps"].items(), key=lambda item: item[1], reverse=True)[:6]
+            print("    slowest steps:  " + "  ".join(f"{name} {seconds}s" for name, seconds in slowest))
+        if regressions:
+            print("❌ Regressions against the baseline:")
+            for line in regressions:
+                print(f"   {line}")
+
+    if regressions:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Seeded synthetic users and candidates for benchmarks and load tests
+"""
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple
+import random
+
+from models import (
+    UserProfile, UserPreferences, Web3Preferences,
+    PersonalityType, MusicGenre, BehaviorSignal,
+    BlockchainChain, TradingStyle, Web3Experience, ProgrammingLanguage
+)
+
+FIRST_NAMES = [
+    "Amara", "Kofi", "Wanjiru", "Tunde", "Zara", "Diego", "Mei", "Lena", "Arjun", "Nia",
+    "Sofia", "Kwame", "Yuki", "Omar", "Ines", "Malik", "Chloe", "Ravi", "Ama", "Luca"
+]
+LOCATIONS = [
+    "Nairobi", "Lagos", "Accra", "Berlin", "Lisbon", "Buenos Aires", "Mexico City",
+    "Singapore", "Bangalore", "New York", "San Francisco", "London", "Kampala", "Cape Town"
+]
+HOBBIES = [
+    "hiking", "photography", "cooking", "reading", "gaming", "yoga", "running", "travel",
+    "painting", "dancing", "cycling", "chess", "gardening", "surfing", "board games", "writing"
+]
+LIFESTYLES = [
+    "active", "night owl", "early bird", "foodie", "homebody", "social", "minimalist",
+    "vegetarian", "fitness", "remote work"
+]
+INTERESTS = [
+    "music", "movies", "art", "sports", "blockchain", "defi", "nfts", "startups",
+    "climate", "science", "fashion", "coffee"
+]
+BIO_OPENERS = [
+    "Weekend hiker and weekday builder.",
+    "Jazz on vinyl, coffee before code.",
+    "Trying every street food stall in town.",
+    "Runner, reader and reluctant early riser.",
+    "Part-time painter, full-time optimist.",
+    "Always planning the next trip.",
+    "Board game strategist with a soft spot for puzzles."
+]
+BIO_MIDDLES = [
+    "I spend my evenings shipping side projects and learning new languages.",
+    "Looking for someone who laughs at bad puns and good memes alike.",
+    "Big fan of live music, long walks and longer conversations.",
+    "I care about climate, community and a well-made cup of tea.",
+    "Currently obsessed with photography and finding the best sunset spots.",
+    "Happiest outdoors, whether it is the beach or a mountain trail."
+]
+WEB3_BIO_LINES = [
+    "Building on Celo and dreaming in Solidity.",
+    "Long-term HODLer, short-term meme enjoyer.",
+    "Hackathon regular, currently deep into DeFi protocols.",
+    "Collecting generative art NFTs and meeting the artists behind them.",
+    "Contributing to public goods funding in my spare time."
+]
+BIO_CLOSERS = [
+    "Tell me your favourite album.",
+    "Swipe right if you have a dog.",
+    "Let's grab coffee and argue about movies.",
+    "Ask me about my last trip.",
+    ""
+]
+
+# Rough shares of the user base, used as sampling weights
+CHAIN_WEIGHTS = {
+    BlockchainChain.CELO: 30, BlockchainChain.ETHEREUM: 28, BlockchainChain.POLYGON: 12,
+    BlockchainChain.ARBITRUM: 8, BlockchainChain.OPTIMISM: 7, BlockchainChain.SOLANA: 6,
+    BlockchainChain.BINANCE_SMART_CHAIN: 4, BlockchainChain.AVALANCHE: 3,
+    BlockchainChain.COSMOS: 1, BlockchainChain.FANTOM: 1
+}
+TRADING_WEIGHTS = {
+    TradingStyle.HODLER: 35, TradingStyle.BUILDER: 20, TradingStyle.CAUTIOUS: 18,
+    TradingStyle.TRADER: 15, TradingStyle.DEGEN: 8, TradingStyle.YOLO: 4
+}
+EXPERIENCE_WEIGHTS = {
+    Web3Experience.BEGINNER: 45, Web3Experience.INTERMEDIATE: 32,
+    Web3Experience.EXPERT: 15, Web3Experience.BUILDER: 8
+}
+LANGUAGE_WEIGHTS = {
+    ProgrammingLanguage.JAVASCRIPT: 30, ProgrammingLanguage.TYPESCRIPT: 25,
+    ProgrammingLanguage.SOLIDITY: 22, ProgrammingLanguage.PYTHON: 12,
+    ProgrammingLanguage.RUST: 6, ProgrammingLanguage.GO: 3,
+    ProgrammingLanguage.VYPER: 1, ProgrammingLanguage.MOVE: 1
+}
+NFT_INTERESTS = ["art", "gaming", "utility", "pfp", "music", "photography"]
+DEV_FRAMEWORKS = ["react", "vue", "hardhat", "foundry", "truffle", "nextjs", "wagmi"]
+IDES = ["vscode", "remix", "foundry", "neovim"]
+COMMUNITIES = ["celo", "gitcoin", "ethglobal", "dappcon", "devfolio", "buidlguidl", "refi"]
+CONFERENCES = ["devcon", "consensus", "celocon", "ethdenver", "token2049"]
+PORTFOLIO_SIZES = ["small", "small", "small", "medium", "medium", "large", "whale"]
+RISK_TOLERANCES = ["conservative", "moderate", "moderate", "aggressive"]
+PHILOSOPHIES = ["long_term", "short_term", "speculative", "yield", "public_goods"]
+MENTORSHIP = ["mentor", "mentee", "both", "neither"]
+
+class SyntheticProfileGenerator:
+    """Generates reproducible users and candidate dicts from a seed"""
+
+    def __init__(self, seed: int = 42, web3_share: float = 0.45, developer_share: float = 0.35):
+        """Initialize the generator; shares are fractions of all users and of web3 users"""
+        self.rng = random.Random(seed)
+        self.web3_share = web3_share
+        self.developer_share = developer_share
+        self._serial = 0
+
+    def _weighted(self, weights: Dict[Any, int], count: int) -> List[Any]:
+        """Draw up to count distinct values, most popular first in expectation"""
+        picked = self.rng.choices(list(weights), weights=list(weights.values()), k=count)
+        return list(dict.fromkeys(picked))
+
+    def _some(self, values: Sequence[Any], low: int, high: int) -> List[Any]:
+        return self.rng.sample(values, self.rng.randint(low, min(high, len(values))))
+
+    def _bio(self, web3: bool) -> str:
+        parts = [self.rng.choice(BIO_OPENERS), self.rng.choice(BIO_MIDDLES)]
+        if web3:
+            parts.append(self.rng.choice(WEB3_BIO_LINES))
+        if self.rng.random() < 0.3:
+            # A minority write long bios; they dominate TF-IDF cost
+            parts.extend(self.rng.sample(BIO_MIDDLES, 2))
+        parts.append(self.rng.choice(BIO_CLOSERS))
+        return " ".join(part for part in parts if part)
+
+    def web3_preferences(self) -> Dict[str, Any]:
+        """Web3 preferences as the plain dict stored with candidates"""
+
+        rng = self.rng
+        developer = rng.random() < self.developer_share
+        style = self._weighted(TRADING_WEIGHTS, 1)[0]
+        return {
+            "favorite_chains": [chain.value for chain in self._weighted(CHAIN_WEIGHTS, rng.randint(1, 3))],
+            "trading_style": style.value if rng.random() < 0.85 else None,
+            "defi_experience": self._weighted(EXPERIENCE_WEIGHTS, 1)[0].value,
+            "nft_interests": self._some(NFT_INTERESTS, 0, 3),
+            "programming_languages": [
+                language.value for language in self._weighted(LANGUAGE_WEIGHTS, rng.randint(1, 3))
+            ] if developer else [],
+            "dev_frameworks": self._some(DEV_FRAMEWORKS, 1, 3) if developer else [],
+            "preferred_ide": rng.choice(IDES) if developer else None,
+            "web3_communities": self._some(COMMUNITIES, 0, 3),
+            "conference_attendance": self._some(CONFERENCES, 0, 2),
+            "mentorship_interest": rng.choice(MENTORSHIP),
+            "crypto_portfolio_size": rng.choice(PORTFOLIO_SIZES),
+            "risk_tolerance": rng.choice(RISK_TOLERANCES),
+            "investment_philosophy": self._some(PHILOSOPHIES, 1, 2)
+        }
+
+    def candidate(self, user_id: Optional[str] = None) -> Dict[str, Any]:
+        """One candidate shaped like ProfileRepository.iter_candidates output"""
+
+        rng = self.rng
+        self._serial += 1
+        web3 = rng.random() < self.web3_share
+        behavior = self._some(list(BehaviorSignal), 1, 4)
+        if web3 and BehaviorSignal.WEB3_ENTHUSIAST not in behavior and rng.random() < 0.6:
+            behavior.append(BehaviorSignal.WEB3_ENTHUSIAST)
+        return {
+            "user_id": user_id or f"synthetic-{self._serial}",
+            "name": rng.choice(FIRST_NAMES),
+            "age": rng.randint(18, 55),
+            "location": rng.choice(LOCATIONS),
+            "bio": self._bio(web3),
+            "photos": [f"https://example.com/photos/{self._serial}/{i}.jpg" for i in range(rng.randint(1, 4))],
+            "music_genres": [genre.value for genre in self._some(list(MusicGenre), 1, 4)],
+            "hobbies": self._some(HOBBIES, 1, 5),
+            "personality_types": [kind.value for kind in self._some(list(PersonalityType), 1, 2)],
+            "behavior_signals": [signal.value for signal in behavior],
+            "lifestyle_preferences": self._some(LIFESTYLES, 0, 3),
+            "web3_preferences": self.web3_preferences() if web3 else None
+        }
+
+    def candidates(self, count: int) -> Iterator[Dict[str, Any]]:
+        for _ in range(count):
+            yield self.candidate()
+
+    def user_profile(self, user_id: Optional[str] = None, web3: Optional[bool] = None) -> UserProfile:
+        """A full UserProfile built from a candidate draw, so users and candidates share distributions"""
+
+        data = self.candidate(user_id)
+        if web3 is True and data["web3_preferences"] is None:
+            data["web3_preferences"] = self.web3_preferences()
+        elif web3 is False:
+            data["web3_preferences"] = None
+
+        preferences = UserPreferences(
+            personality_types=data["personality_types"],
+            music_genres=data["music_genres"],
+            hobbies=data["hobbies"],
+            behavior_signals=data["behavior_signals"],
+            age_range=(max(18, data["age"] - 5), data["age"] + 8),
+            lifestyle_preferences=data["lifestyle_preferences"],
+            deal_breakers=self._some(["smoking", "no ambition", "rudeness"], 0, 1),
+            must_haves=self._some(["kindness", "humor", "curiosity"], 0, 2),
+            web3_preferences=Web3Preferences(**data["web3_preferences"]) if data["web3_preferences"] else None
+        )
+        return UserProfile(
+            user_id=data["user_id"],
+            name=data["name"],
+            age=data["age"],
+            location=data["location"],
+            bio=data["bio"],
+            preferences=preferences,
+            interests=self._some(INTERESTS, 1, 4),
+            photos=data["photos"]
+        )
+
+    def create_user_request(self) -> Dict[str, Any]:
+        """A POST /users body"""
+        data = self.candidate()
+        return {
+            "name": data["name"],
+            "age": data["age"],
+            "location": data["location"],
+            "bio": data["bio"],
+            "interests": self._some(INTERESTS, 1, 4),
+            "photos": data["photos"],
+            "personality_types": data["personality_types"],
+            "music_genres": data["music_genres"],
+            "hobbies": data["hobbies"],
+            "behavior_signals": data["behavior_signals"],
+            "lifestyle_preferences": data["lifestyle_preferences"],
+            "web3_preferences": data["web3_preferences"]
+        }
+
+def candidate_pool(count: int, seed: int = 42) -> Tuple[List[Dict[str, Any]], SyntheticProfileGenerator]:
+    """Build a list of candidates plus the generator, for drawing matching users"""
+    generator = SyntheticProfileGenerator(seed)
+    return list(generator.candidates(count)), generator
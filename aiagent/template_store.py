@@ -0,0 +1,189 @@
+"""
+Precompiled, versioned template store for flirting message generation
+"""
+from typing import List, Dict, Any, Optional, Tuple, Callable, Hashable, Sequence, TypeVar
+import json
+import os
+import random
+import string
+import threading
+import time
+
+TEMPLATE_FORMAT_VERSION = 1
+
+T = TypeVar("T")
+
+_formatter = string.Formatter()
+
+class CompiledTemplate:
+    """Template text with its format placeholders split out ahead of time"""
+
+    __slots__ = ("text", "literals", "fields")
+
+    def __init__(self, text: str):
+        self.text = text
+        literals: List[str] = []
+        fields: List[str] = []
+        for literal, field, _, _ in _formatter.parse(text):
+            literals.append(literal)
+            if field is not None:
+                fields.append(field)
+        self.literals = tuple(literals)
+        self.fields = tuple(fields)
+
+    def render(self, **values: Any) -> str:
+        """Fill the placeholders without re-parsing the template"""
+
+        if not self.fields:
+            return self.text
+
+        parts = []
+        for index, literal in enumerate(self.literals):
+            parts.append(literal)
+            if index < len(self.fields):
+                parts.append(str(values[self.fields[index]]))
+        return "".join(parts)
+
+    def __repr__(self) -> str:
+        return f"CompiledTemplate({self.text!r})"
+
+class TemplateSet:
+    """Immutable snapshot of one version of the template file"""
+
+    def __init__(self, data: Dict[str, Any], source_mtime: float = 0.0):
+        """Compile the raw template data into flat tables and index arrays"""
+        version = data.get("version")
+        if version != TEMPLATE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported template format version: {version}")
+
+        self.version = version
+        self.source_mtime = source_mtime
+        self.flirting_templates: Dict[str, Dict[str, List[str]]] = data["flirting_templates"]
+        self.context_patterns: Dict[str, Dict[str, List[str]]] = data["context_patterns"]
+        self.topics: Tuple[str, ...] = tuple(self.context_patterns)
+
+        # Every template lives once in a flat table; pools are index arrays
+        # into it keyed by ("style", intensity, kind) or ("topic", topic, kind)
+        table: List[CompiledTemplate] = []
+        index: Dict[Tuple[str, str, str], Tuple[int, ...]] = {}
+        for section, groups in (("style", self.flirting_templates), ("topic", self.context_patterns)):
+            for group, kinds in groups.items():
+                for kind, texts in kinds.items():
+                    start = len(table)
+                    table.extend(CompiledTemplate(text) for text in texts)
+                    index[(section, group, kind)] = tuple(range(start, len(table)))
+
+        self.templates: Tuple[CompiledTemplate, ...] = tuple(table)
+        self._index = index
+        self._derived: Dict[str, Any] = {}
+        self._derived_lock = threading.Lock()
+
+    def pool(self, section: str, group: str, kind: str) -> Tuple[int, ...]:
+        """Get the template indexes for a style or topic pool (empty if unknown)"""
+        return self._index.get((section, group, kind), ())
+
+    def pick(self, pool: Tuple[int, ...], position: int) -> CompiledTemplate:
+        """Get the template at a position within a pool"""
+        return self.templates[pool[position]]
+
+    def derived(self, key: str, build: Callable[["TemplateSet"], Any]) -> Any:
+        """Build a structure derived from this version once and share it"""
+
+        value = self._derived.get(key)
+        if value is None:
+            with self._derived_lock:
+                value = self._derived.get(key)
+                if value is None:
+                    value = self._derived[key] = build(self)
+        return value
+
+class TemplateStore:
+    """Loads a template file once and hot-reloads it when it changes on disk"""
+
+    def __init__(self, path: str, reload_interval: float = 2.0):
+        """Load the initial template set"""
+        self.path = path
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._checked_at = time.monotonic()
+        self._current = self._load()
+
+    def _load(self) -> TemplateSet:
+        mtime = os.stat(self.path).st_mtime
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return TemplateSet(data, mtime)
+
+    @property
+    def current(self) -> TemplateSet:
+        """Get the live template set, picking up file changes at most once per interval"""
+
+        if self.reload_interval >= 0 and time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+        return self._current
+
+    def reload(self, force: bool = False) -> bool:
+        """Swap in the file's templates if it changed; keep the old set on errors"""
+
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.path).st_mtime
+                if not force and mtime == self._current.source_mtime:
+                    return False
+                self._current = self._load()
+                return True
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Error reloading templates from {self.path}: {e}")
+                return False
+
+_stores: Dict[str, TemplateStore] = {}
+_stores_lock = threading.Lock()
+
+def get_template_store(path: str, reload_interval: float = 2.0) -> TemplateStore:
+    """Get the process-wide store for a template file, loading it on first use"""
+
+    path = os.path.abspath(path)
+    with _stores_lock:
+        store = _stores.get(path)
+        if store is None:
+            store = _stores[path] = TemplateStore(path, reload_interval)
+        return store
+
+class TemplateSelector:
+    """Seeded picker that avoids repeating a pool entry until the pool is used up"""
+
+    __slots__ = ("rng", "_used", "_last")
+
+    def __init__(self, seed: Optional[Any] = None):
+        self.rng = random.Random(seed)
+        # Per pool: bitset of positions already used this cycle, and the last pick
+        self._used: Dict[Hashable, int] = {}
+        self._last: Dict[Hashable, int] = {}
+
+    def position(self, pool_key: Hashable, size: int) -> int:
+        """Pick a position in a pool of the given size that was not used recently"""
+
+        if size <= 1:
+            return 0
+
+        full = (1 << size) - 1
+        used = self._used.get(pool_key, 0) & full
+        if used == full:
+            # Start a new cycle, but never hand out the previous pick twice in a row
+            used = (1 << self._last.get(pool_key, 0)) & full
+
+        # Take the k-th unused position; pools are small so the scan is bounded
+        k = self.rng.randrange(size - bin(used).count("1"))
+        free = ~used & full
+        for _ in range(k):
+            free &= free - 1
+        position = (free & -free).bit_length() - 1
+
+        self._used[pool_key] = used | (1 << position)
+        self._last[pool_key] = position
+        return position
+
+    def choice(self, pool_key: Hashable, items: Sequence[T]) -> T:
+        """Pick an item from a sequence without recent repeats"""
+        return items[self.position(pool_key, len(items))]
@@ -0,0 +1,297 @@
+"""
+Test script for Idempotency-Key handling, message history paging and journal recovery
+"""
+import asyncio
+import os
+import sys
+import tempfile
+from typing import List, Dict, Any, Optional
+
+from models import PotentialMatch, UserPreferences, FlirtingStyle
+
+STYLE = FlirtingStyle(intensity="moderate", humor_level="medium", directness="balanced", emoji_usage="moderate")
+
+class ConversationReliabilityTester:
+    """Runs the app in-process against scratch storage, with the LLM stubbed out"""
+
+    def __init__(self, workdir: str):
+        from load_test import load_app, StubLLMClient
+
+        self.workdir = workdir
+        self.app_module, _ = load_app(os.path.join(workdir, "app"), StubLLMClient(latency=0.0))
+        self.client = None
+        self.user_ids: List[str] = []
+
+    def _manager(self, name: str, **stores: str):
+        """A ConversationManager of its own, with one conversation, on scratch storage"""
+        from conversation_manager import ConversationManager
+
+        manager = ConversationManager(max_history=20, **{
+            key: os.path.join(self.workdir, f"{name}-{value}") for key, value in stores.items()
+        })
+        match = PotentialMatch(user_id="match", name="Sam", age=27, location="Lisbon", bio="DJ", compatibility_score=0.8)
+        conversation_id = manager.create_conversation("user", match, UserPreferences(), STYLE)
+        return manager, conversation_id
+
+    async def _new_conversation(self) -> str:
+        if not self.user_ids:
+            for name in ("Ada Builder", "Sam Collector"):
+                response = await self.client.post("/users", json={
+                    "name": name, "age": 28, "location": "Nairobi", "bio": "Into music, travel and DeFi"
+                })
+                self.user_ids.append(response.json()["data"]["user_id"])
+        response = await self.client.post(
+            "/conversations",
+            params={"user_id": self.user_ids[0], "match_user_id": self.user_ids[1]},
+            json={"intensity": "moderate"}
+        )
+        return response.json()["data"]["conversation_id"]
+
+    def _chat(self, conversation_id: str, message: str) -> Dict[str, Any]:
+        return {
+            "conversation_id": conversation_id,
+            "sender_id": self.user_ids[0],
+            "receiver_id": self.user_ids[1],
+            "message": message,
+            "refine_with_llm": False
+        }
+
+    async def _total_messages(self, conversation_id: str) -> int:
+        response = await self.client.get(f"/conversations/{conversation_id}")
+        return response.json()["data"]["total_messages"]
+
+    async def test_duplicate_idempotency_key(self) -> bool:
+        """Test that concurrent and later duplicates of a /chat request run it once"""
+        print("\n🧪 Testing duplicate Idempotency-Key on /chat...")
+
+        conversation_id = await self._new_conversation()
+        body = self._chat(conversation_id, "Hey! What's the best concert you've been to?")
+        headers = {"Idempotency-Key": "chat-duplicate-1"}
+
+        responses = await asyncio.gather(*[self.client.post("/chat", json=body, headers=headers) for _ in range(3)])
+        responses.append(await self.client.post("/chat", json=body, headers=headers))
+
+        replies = {response.json()["data"]["ai_response"]["message_id"] for response in responses}
+        replayed = [response.headers.get("idempotent-replayed") == "true" for response in responses]
+        total = await self._total_messages(conversation_id)
+
+        if all(response.status_code == 200 for response in responses) and len(replies) == 1 \
+                and replayed.count(False) == 1 and total == 2:
+            print("✅ One message pair stored; 3 of 4 responses replayed")
+            return True
+        print(f"❌ Statuses {[r.status_code for r in responses]}, replies {len(replies)}, replayed {replayed}, stored {total}")
+        return False
+
+    async def test_idempotency_key_reuse(self) -> bool:
+        """Test that a key reused for a different request is refused with 422"""
+        print("\n🧪 Testing Idempotency-Key reuse...")
+
+        conversation_id = await self._new_conversation()
+        headers = {"Idempotency-Key": "chat-reuse-1"}
+        first = await self.client.post("/chat", json=self._chat(conversation_id, "First message"), headers=headers)
+        second = await self.client.post("/chat", json=self._chat(conversation_id, "Something else"), headers=headers)
+
+        if first.status_code == 200 and second.status_code == 422:
+            print(f"✅ Reused key refused: {second.json()['detail']}")
+            return True
+        print(f"❌ Expected 200 then 422, got {first.status_code} then {second.status_code}")
+        return False
+
+    async def test_retry_after_failure(self) -> bool:
+        """Test that a retry after a failed turn does not store the user message twice"""
+        print("\n🧪 Testing retry after a failed /chat...")
+
+        conversation_id = await self._new_conversation()
+        body = self._chat(conversation_id, "Are you going to the hackathon this weekend?")
+        headers = {"Idempotency-Key": "chat-retry-1"}
+        engine = self.app_module.components.flirting_engine
+
+        def unavailable(*args, **kwargs):
+            raise RuntimeError("generation unavailable")
+
+        engine.generate_contextual_flirty_message = unavailable
+        try:
+            failed = await self.client.post("/chat", json=body, headers=headers)
+        finally:
+            del engine.generate_contextual_flirty_message
+        retried = await self.client.post("/chat", json=body, headers=headers)
+        total = await self._total_messages(conversation_id)
+
+        if failed.status_code == 500 and retried.status_code == 200 and total == 2:
+            print("✅ Retry completed the turn with the user message stored once")
+            return True
+        print(f"❌ Statuses {failed.status_code}, {retried.status_code}; {total} messages stored (expected 2)")
+        return False
+
+    async def test_malformed_cursor(self) -> bool:
+        """Test that a malformed `before` cursor is a 400, not a 500"""
+        print("\n🧪 Testing malformed message cursor...")
+
+        conversation_id = await self._new_conversation()
+        response = await self.client.get(f"/conversations/{conversation_id}/messages", params={"before": "not-a-cursor"})
+
+        if response.status_code == 400:
+            print("✅ Malformed cursor rejected with 400")
+            return True
+        print(f"❌ Expected 400, got {response.status_code}")
+        return False
+
+    async def test_api_paging(self) -> bool:
+        """Test cursor paging through GET /conversations/{id}/messages"""
+        print("\n🧪 Testing message paging through the API...")
+
+        conversation_id = await self._new_conversation()
+        for i in range(7):
+            await self.client.post("/chat", json=self._chat(conversation_id, f"Message {i}"))
+
+        seen: List[Dict[str, Any]] = []
+        cursor: Optional[str] = None
+        while True:
+            params = {"limit": 3, **({"before": cursor} if cursor else {})}
+            data = (await self.client.get(f"/conversations/{conversation_id}/messages", params=params)).json()["data"]
+            seen = data["messages"] + seen
+            cursor = data.get("next_cursor")
+            if not cursor:
+                break
+
+        return self._check_pages("API", [message["message_id"] for message in seen], 14)
+
+    def _page_all(self, manager, conversation_id: str, limit: int, between_pages=None) -> List[str]:
+        """Walk every page from newest to oldest and return the message ids oldest first"""
+        ids: List[str] = []
+        before = None
+        while True:
+            page, before = manager.get_message_page(conversation_id, limit, before)
+            ids = [message["message_id"] for message in page] + ids
+            if before is None:
+                return ids
+            if between_pages:
+                between_pages()
+
+    def _check_pages(self, source: str, ids: List[str], expected: int) -> bool:
+        if len(ids) == expected and len(set(ids)) == expected:
+            print(f"✅ {source}: {expected} messages paged with no gaps or duplicates")
+            return True
+        print(f"❌ {source}: paged {len(ids)} messages ({len(set(ids))} distinct), expected {expected}")
+        return False
+
+    def test_memory_paging(self) -> bool:
+        """Test paging a conversation held only in the in-memory log"""
+        print("\n🧪 Testing message paging from memory...")
+
+        manager, conversation_id = self._manager("memory", archive_dir="archive")
+        for i in range(15):
+            manager.add_message(conversation_id, "user", "match", f"Message {i}")
+        return self._check_pages("memory", self._page_all(manager, conversation_id, 4), 15)
+
+    def test_shared_db_paging(self) -> bool:
+        """Test paging past the in-memory log into SQLite while new messages arrive"""
+        print("\n🧪 Testing message paging from the shared SQLite store...")
+
+        manager, conversation_id = self._manager("shared", shared_db_path="conversations.db")
+        try:
+            for i in range(50):
+                manager.add_message(conversation_id, "user", "match", f"Message {i}")
+            expected = [message["message_id"] for message in manager.get_message_page(conversation_id, 50)[0]]
+
+            # Messages added mid-walk are newer than the cursor, so they must not show up
+            ids = self._page_all(
+                manager, conversation_id, 7,
+                lambda: manager.add_message(conversation_id, "match", "user", "Arrived while paging")
+            )
+            if ids != expected:
+                print(f"❌ shared: paged {len(ids)} messages, expected the original {len(expected)} in order")
+                return False
+            return self._check_pages("shared", ids, 50)
+        finally:
+            manager.close()
+
+    def test_archive_paging(self) -> bool:
+        """Test paging an archived conversation from the on-disk archive"""
+        print("\n🧪 Testing message paging from the archive...")
+
+        manager, conversation_id = self._manager("archived", archive_dir="archive")
+        for i in range(12):
+            manager.add_message(conversation_id, "user", "match", f"Message {i}")
+        manager.archive_conversation(conversation_id)
+        return self._check_pages("archive", self._page_all(manager, conversation_id, 5), 12)
+
+    def test_journal_recovery(self) -> bool:
+        """Test that a durable-mode manager rebuilds its conversations from the journal"""
+        print("\n🧪 Testing journal recovery...")
+        from conversation_manager import ConversationManager
+
+        manager, conversation_id = self._manager("durable", journal_dir="journal")
+        for i in range(5):
+            manager.add_message(conversation_id, "user", "match", f"Message {i}")
+        manager.update_conversation_tone(conversation_id, "flirty")
+        expected = [message.message_id for message in manager.get_recent_messages(conversation_id, 0)]
+        manager.close()
+
+        recovered = ConversationManager(max_history=20, journal_dir=os.path.join(self.workdir, "durable-journal"))
+        try:
+            context = recovered.get_conversation_context(conversation_id)
+            ids = [message.message_id for message in recovered.get_recent_messages(conversation_id, 0)]
+        finally:
+            recovered.close()
+
+        if context is not None and context.conversation_tone == "flirty" and ids == expected:
+            print(f"✅ Recovered the conversation, its tone and {len(ids)} messages")
+            return True
+        print(f"❌ Recovered context {context is not None}, messages {len(ids)}/{len(expected)}")
+        return False
+
+    async def run_all_tests(self) -> bool:
+        """Run all reliability tests"""
+        import httpx
+
+        print("🚀 CeloSoul Dating AI Agent - Conversation Reliability Tests\n")
+
+        tests = [
+            self.test_duplicate_idempotency_key,
+            self.test_idempotency_key_reuse,
+            self.test_retry_after_failure,
+            self.test_malformed_cursor,
+            self.test_api_paging,
+            self.test_memory_paging,
+            self.test_shared_db_paging,
+            self.test_archive_paging,
+            self.test_journal_recovery
+        ]
+
+        passed = 0
+        total = len(tests)
+
+        transport = httpx.ASGITransport(app=self.app_module.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://reliability") as client:
+            self.client = client
+            for test in tests:
+                try:
+                    result = test()
+                    if asyncio.iscoroutine(result):
+                        result = await result
+                    if result:
+                        passed += 1
+                except Exception as e:
+                    print(f"❌ Test failed with exception: {e}")
+
+        print(f"\n{'='*60}")
+        print(f"📊 Conversation Reliability Test Results: {passed}/{total} tests passed")
+
+        if passed == total:
+            print("🎉 All conversation reliability tests passed!")
+            return True
+        print(f"❌ {total - passed} tests failed.")
+        return False
+
+def main():
+    """Run conversation reliability tests"""
+    with tempfile.TemporaryDirectory(prefix="celosoul-reliability-") as workdir:
+        tester = ConversationReliabilityTester(workdir)
+        success = asyncio.run(tester.run_all_tests())
+
+    if not success:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,256 @@
+"""
+Local tone and response-strategy classifier for the LLM cascade
+"""
+from typing import List, Dict, Any, Optional, Sequence, Tuple
+import json
+import math
+import os
+import threading
+
+import numpy as np
+
+from keyword_matcher import KeywordMatcher
+from topic_keywords import TOPIC_KEYWORDS, TOPIC_MATCHER
+
+MODEL_FORMAT_VERSION = 1
+
+# Keyword features; each group contributes log(1 + hits) to the feature vector
+TONE_FEATURE_KEYWORDS = {
+    "flirty": [
+        "cute", "beautiful", "gorgeous", "handsome", "attractive", "sexy", "date",
+        "dinner", "crush", "kiss", "miss you", "blush", "charming", "irresistible",
+        "chemistry", "heart", "sweet", "smile", "babe", "darling", "dangerous"
+    ],
+    "flirty_emoji": ["😉", "😘", "😍", "🥰", "😏", "❤️", "💕", "💋", "😊"],
+    "playful": [
+        "bet", "challenge", "dare", "race", "prove", "win", "lose", "loser", "joke",
+        "pun", "meme", "roast", "silly", "goofy", "dork", "nerd", "ridiculous",
+        "would you rather", "plot twist", "tease"
+    ],
+    "laughter": ["haha", "hahaha", "hehe", "lol", "lmao", "rofl", "😂", "🤣", "😜", "😆"],
+    "serious": [
+        "honestly", "career", "future", "goals", "values", "family", "relationship",
+        "commitment", "trust", "respect", "boundaries", "expectations", "important",
+        "priorities", "long term", "kids", "stability", "mental health", "faith",
+        "perspective", "tough time", "sick", "lost my job", "discuss", "seriously"
+    ],
+    "casual": [
+        "hey", "hi", "what's up", "sup", "cool", "nice", "ok", "okay", "sure",
+        "alright", "chilling", "weekend", "lunch", "gym", "traffic", "weather",
+        "tonight", "talk later", "netflix", "coffee"
+    ],
+    "negative": ["sad", "upset", "disappointed", "frustrated", "angry", "sorry", "tired", "stressed"],
+    "question": ["?"],
+    "exclaim": ["!"]
+}
+
+TONE_FEATURE_MATCHER = KeywordMatcher(TONE_FEATURE_KEYWORDS)
+
+FEATURE_NAMES: Tuple[str, ...] = tuple(TONE_FEATURE_KEYWORDS) + ("avg_words", "message_count")
+
+EMOJI_MATCHER = KeywordMatcher({
+    "emoji": ["😉", "😘", "😍", "🥰", "😏", "❤️", "💕", "💋", "😊", "😂", "🤣", "😜", "😆", "🙂", "😅", "🔥"]
+})
+
+RESPONSE_SUGGESTIONS = {
+    "flirty": ["Match their energy with a warm compliment", "Suggest meeting up"],
+    "playful": ["Keep the banter going", "Answer the tease with a light challenge"],
+    "serious": ["Respond thoughtfully and without jokes", "Ask an open question about what matters to them"],
+    "casual": ["Ask a light follow-up question", "Share something about your day"]
+}
+
+def extract_features(texts: Sequence[str]) -> np.ndarray:
+    """Build the feature vector for a message or a window of messages"""
+
+    counts = dict.fromkeys(TONE_FEATURE_KEYWORDS, 0)
+    words = 0
+    for text in texts:
+        words += len(text.split())
+        for _, _, _, categories in TONE_FEATURE_MATCHER.iter_matches(text):
+            for category in categories:
+                counts[category] += 1
+
+    message_count = max(len(texts), 1)
+    vector = [math.log1p(counts[group]) for group in TONE_FEATURE_KEYWORDS]
+    vector.append(min(words / message_count, 40) / 20)
+    vector.append(min(message_count, 5) / 5)
+    return np.asarray(vector, dtype=np.float64)
+
+class ToneClassifier:
+    """Multinomial linear model over keyword features, trained offline"""
+
+    def __init__(
+        self,
+        classes: List[str],
+        coef: Sequence[Sequence[float]],
+        intercept: Sequence[float],
+        metadata: Optional[Dict[str, Any]] = None
+    ):
+        """Initialize from trained weights"""
+        self.classes = list(classes)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.metadata = metadata or {}
+
+        expected = (len(self.classes), len(FEATURE_NAMES))
+        if self.coef.shape != expected:
+            raise ValueError(f"Model weights have shape {self.coef.shape}, expected {expected}")
+        if self.intercept.shape != (len(self.classes),):
+            raise ValueError(f"Model intercept has shape {self.intercept.shape}, expected ({len(self.classes)},)")
+
+    @classmethod
+    def load(cls, path: str) -> "ToneClassifier":
+        """Load a model written by train_tone_classifier.py"""
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("version") != MODEL_FORMAT_VERSION:
+            raise ValueError(f"Unsupported tone model version: {data.get('version')}")
+        if list(data["feature_names"]) != list(FEATURE_NAMES):
+            raise ValueError("Tone model was trained with a different feature set")
+        metadata = {key: value for key, value in data.items() if key not in ("coef", "intercept")}
+        return cls(data["classes"], data["coef"], data["intercept"], metadata)
+
+    def predict_proba(self, texts: Sequence[str]) -> Dict[str, float]:
+        """Get class probabilities for a message window"""
+        logits = self.coef @ extract_features(texts) + self.intercept
+        logits -= logits.max()
+        probabilities = np.exp(logits)
+        probabilities /= probabilities.sum()
+        return dict(zip(self.classes, probabilities.tolist()))
+
+    def classify(self, texts: Sequence[str]) -> Tuple[str, float, Dict[str, float]]:
+        """Get (label, confidence, probabilities) for a message window"""
+        probabilities = self.predict_proba(texts)
+        label = max(probabilities, key=probabilities.get)
+        return label, probabilities[label], probabilities
+
+def engagement_level(texts: Sequence[str]) -> str:
+    """Engagement from average message length, same thresholds as the flirting engine"""
+    if not texts:
+        return "low"
+    average = sum(len(text.split()) for text in texts) / len(texts)
+    if average > 15:
+        return "high"
+    if average > 8:
+        return "medium"
+    return "low"
+
+def mood_indicators(texts: Sequence[str]) -> List[str]:
+    """Get the feature groups that fired in the texts"""
+    hits = set()
+    for text in texts:
+        hits |= TONE_FEATURE_MATCHER.categories(text)
+    return [group for group in TONE_FEATURE_KEYWORDS if group in hits]
+
+def local_tone_analysis(classifier: ToneClassifier, texts: Sequence[str]) -> Tuple[Dict[str, Any], float]:
+    """Build a tone analysis from the local model; returns (analysis, confidence)"""
+
+    label, confidence, _ = classifier.classify(texts)
+    analysis = {
+        "tone": label,
+        "engagement": engagement_level(texts),
+        "response_suggestions": list(RESPONSE_SUGGESTIONS.get(label, [])),
+        "mood_indicators": mood_indicators(texts)
+    }
+    return analysis, confidence
+
+def local_strategy(
+    classifier: ToneClassifier,
+    history: Sequence[str],
+    incoming_message: str
+) -> Tuple[Dict[str, Any], float]:
+    """Build a response strategy from the local model; returns (strategy, confidence)"""
+
+    label, confidence, probabilities = classifier.classify(list(history) + [incoming_message])
+    history_probabilities = classifier.predict_proba(history) if history else probabilities
+    incoming_hits = TONE_FEATURE_MATCHER.categories(incoming_message)
+
+    if "negative" in incoming_hits:
+        tone_adjustment = "decrease"
+    elif probabilities.get("flirty", 0) > history_probabilities.get("flirty", 0) + 0.2:
+        tone_adjustment = "increase"
+    else:
+        tone_adjustment = "maintain"
+
+    words = len(incoming_message.split())
+    emojis = sum(1 for _ in EMOJI_MATCHER.iter_matches(incoming_message))
+
+    topics = TOPIC_MATCHER.categories(" ".join(list(history[-2:]) + [incoming_message]))
+    strategy = {
+        "response_type": label,
+        "tone_adjustment": tone_adjustment,
+        "suggested_topics": [topic for topic in TOPIC_KEYWORDS if topic in topics][:3],
+        "response_length": "short" if words < 6 else "medium" if words < 20 else "long",
+        "emoji_usage": "minimal" if emojis == 0 else "moderate" if emojis == 1 else "frequent"
+    }
+    return strategy, confidence
+
+class CascadeMetrics:
+    """Counts local answers, LLM escalations and local/LLM agreement per task"""
+
+    def __init__(self):
+        """Initialize the counters"""
+        self._lock = threading.Lock()
+        self._counts: Dict[str, Dict[str, int]] = {}
+
+    def _task(self, task: str) -> Dict[str, int]:
+        counts = self._counts.get(task)
+        if counts is None:
+            counts = self._counts[task] = {
+                "requests": 0, "local": 0, "escalated": 0,
+                "compared": 0, "agreed": 0, "llm_errors": 0
+            }
+        return counts
+
+    def record_local(self, task: str) -> None:
+        with self._lock:
+            counts = self._task(task)
+            counts["requests"] += 1
+            counts["local"] += 1
+
+    def record_escalation(
+        self,
+        task: str,
+        local_label: Optional[str],
+        llm_label: Optional[str],
+        error: bool = False
+    ) -> None:
+        with self._lock:
+            counts = self._task(task)
+            counts["requests"] += 1
+            counts["escalated"] += 1
+            if error:
+                counts["llm_errors"] += 1
+            elif local_label is not None and llm_label is not None:
+                counts["compared"] += 1
+                counts["agreed"] += int(local_label == llm_label)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get counters plus escalation rate and agreement with the LLM per task"""
+        with self._lock:
+            result = {}
+            for task, counts in self._counts.items():
+                stats = dict(counts)
+                stats["escalation_rate"] = round(counts["escalated"] / counts["requests"], 4) if counts["requests"] else 0.0
+                # Accuracy of the local model measured against the LLM on escalated cases
+                stats["agreement_with_llm"] = round(counts["agreed"] / counts["compared"], 4) if counts["compared"] else None
+                result[task] = stats
+            return result
+
+_classifiers: Dict[str, Optional[ToneClassifier]] = {}
+_classifiers_lock = threading.Lock()
+
+def load_tone_classifier(path: Optional[str]) -> Optional[ToneClassifier]:
+    """Load a model once per process; None (LLM only) when it is missing or invalid"""
+
+    if not path:
+        return None
+    path = os.path.abspath(path)
+    with _classifiers_lock:
+        if path not in _classifiers:
+            try:
+                _classifiers[path] = ToneClassifier.load(path)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"Tone classifier unavailable ({path}): {e}")
+                _classifiers[path] = None
+        return _classifiers[path]
@@ -0,0 +1,23 @@
+"""
+Conversation topic keyword tables, shared by conversation analysis and the tone classifier
+"""
+from keyword_matcher import KeywordMatcher
+
+TOPIC_KEYWORDS = {
+    "music": ["music", "song", "band", "concert", "artist"],
+    "travel": ["travel", "trip", "vacation", "destination", "country"],
+    "food": ["food", "restaurant", "cooking", "recipe", "meal"],
+    "work": ["work", "job", "career", "office", "business"],
+    "hobbies": ["hobby", "hobbies", "interest", "activity", "fun", "enjoy"],
+    "movies": ["movie", "film", "cinema", "netflix", "watch"],
+    "sports": ["sport", "game", "team", "player", "match"],
+    "books": ["book", "read", "author", "novel", "story"],
+    "defi": ["defi", "yield", "farming", "liquidity", "protocol", "dex", "uniswap", "compound"],
+    "nft": ["nft", "token", "collection", "mint", "opensea", "digital art", "blockchain art"],
+    "coding": ["code", "programming", "smart contract", "solidity", "javascript", "python", "github"],
+    "crypto": ["crypto", "bitcoin", "ethereum", "trading", "hodl", "altcoin", "wallet"],
+    "blockchain": ["blockchain", "web3", "dapp", "dao", "consensus", "mining", "validator"]
+}
+
+# Compiled once at import; matches whole words so "go" never fires inside "good"
+TOPIC_MATCHER = KeywordMatcher(TOPIC_KEYWORDS)
@@ -0,0 +1,370 @@
+"""
+Lightweight in-process tracing: nested spans, head sampling, JSON/OTLP file export
+"""
+from typing import List, Dict, Any, Optional, Sequence, Callable
+from collections import deque
+from contextvars import ContextVar
+import functools
+import json
+import os
+import random
+import threading
+import time
+
+from request_profiler import is_admin
+
+class Span:
+    """One timed stage of a trace"""
+
+    __slots__ = ("trace", "name", "span_id", "parent_id", "start_ns", "end_ns", "attributes", "error")
+
+    def __init__(self, trace: "Trace", name: str, parent_id: Optional[str], attributes: Dict[str, Any]):
+        self.trace = trace
+        self.name = name
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = attributes
+        self.error: Optional[str] = None
+
+    @property
+    def trace_id(self) -> str:
+        return self.trace.trace_id
+
+    @property
+    def sampled(self) -> bool:
+        return True
+
+    def set(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round((self.end_ns - self.start_ns) / 1e6, 3) if self.end_ns else None,
+            "attributes": dict(self.attributes),
+            "error": self.error
+        }
+
+class _NoopSpan:
+    """Stands in for spans of unsampled traces; every call is a no-op"""
+
+    __slots__ = ()
+    trace_id = None
+    span_id = None
+    sampled = False
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+NOOP_SPAN = _NoopSpan()
+
+_current: ContextVar[Any] = ContextVar("celosoul_current_span", default=None)
+
+class Trace:
+    """Spans sharing one trace id; exported when the root span ends"""
+
+    def __init__(self, max_spans: int):
+        """Initialize an empty trace"""
+        self.trace_id = os.urandom(16).hex()
+        self.max_spans = max_spans
+        self.spans: List[Span] = []
+        self.dropped = 0
+        self.exported = False
+        self.lock = threading.Lock()
+
+    def admit(self) -> bool:
+        """Reserve room for one more span; stages in hot loops stop recording at the cap"""
+        with self.lock:
+            if len(self.spans) + self.dropped >= self.max_spans:
+                self.dropped += 1
+                return False
+            return True
+
+class _SpanScope:
+    """Context manager returned by Tracer.span"""
+
+    __slots__ = ("tracer", "name", "attributes", "force", "span", "token")
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any], force: bool):
+        self.tracer = tracer
+        self.name = name
+        self.attributes = attributes
+        self.force = force
+        self.span = None
+        self.token = None
+
+    def __enter__(self):
+        parent = _current.get()
+        if parent is None:
+            # Head sampling: the decision is made once, at the root
+            if not (self.force or self.tracer.should_sample()):
+                self.token = _current.set(NOOP_SPAN)
+                return NOOP_SPAN
+            trace = Trace(self.tracer.max_spans)
+            parent_id = None
+        else:
+            trace = parent.trace
+            parent_id = parent.span_id
+            if not trace.admit():
+                return NOOP_SPAN
+
+        self.span = Span(trace, self.name, parent_id, self.attributes)
+        self.token = _current.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if self.token is not None:
+            _current.reset(self.token)
+        span = self.span
+        if span is None:
+            return
+        span.end_ns = time.time_ns()
+        if exc is not None:
+            span.error = f"{exc_type.__name__}: {exc}"
+        self.tracer._finish(span)
+
+class _NoopScope:
+    """Shared context manager for spans inside unsampled traces"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return NOOP_SPAN
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+_NOOP_SCOPE = _NoopScope()
+
+class Tracer:
+    """Creates spans and hands finished traces to the exporters"""
+
+    def __init__(
+        self,
+        sample_rate: float = 0.0,
+        exporters: Sequence[Any] = (),
+        max_spans: int = 2000
+    ):
+        """Initialize the tracer; sample_rate 0 disables tracing except forced traces"""
+        self.sample_rate = sample_rate
+        self.exporters = list(exporters)
+        self.max_spans = max_spans
+        self._random = random.Random()
+
+    def configure(
+        self,
+        sample_rate: Optional[float] = None,
+        exporters: Optional[Sequence[Any]] = None,
+        max_spans: Optional[int] = None
+    ) -> None:
+        if sample_rate is not None:
+            self.sample_rate = sample_rate
+        if exporters is not None:
+            self.exporters = list(exporters)
+        if max_spans is not None:
+            self.max_spans = max_spans
+
+    def should_sample(self) -> bool:
+        return self.sample_rate > 0 and (self.sample_rate >= 1 or self._random.random() < self.sample_rate)
+
+    def span(self, name: str, force: bool = False, **attributes: Any):
+        """Open a span; a root span is sampled (or forced), children follow their root"""
+        # Fast path for stages inside an unsampled request: nothing to allocate
+        if _current.get() is NOOP_SPAN:
+            return _NOOP_SCOPE
+        return _SpanScope(self, name, attributes, force)
+
+    def current(self):
+        """Get the active span, or the no-op span outside a sampled trace"""
+        span = _current.get()
+        return NOOP_SPAN if span is None else span
+
+    def traced(self, name: Optional[str] = None) -> Callable:
+        """Decorator wrapping a function in a span"""
+        def decorator(function: Callable) -> Callable:
+            span_name = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.span(span_name):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _finish(self, span: Span) -> None:
+        trace = span.trace
+        with trace.lock:
+            if trace.exported:
+                # Late span, e.g. background work that outlived its request
+                late = [span]
+            else:
+                trace.spans.append(span)
+                if span.parent_id is not None:
+                    return
+                trace.exported = True
+                late = None
+
+        batch = late or trace.spans
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace, batch)
+            except Exception as e:
+                print(f"Trace export failed ({type(exporter).__name__}): {e}")
+
+def trace_to_dict(trace: Trace, spans: Sequence[Span]) -> Dict[str, Any]:
+    """Plain JSON layout of a trace"""
+    root = next((span for span in spans if span.parent_id is None), None)
+    return {
+        "trace_id": trace.trace_id,
+        "root": root.name if root else None,
+        "duration_ms": round((root.end_ns - root.start_ns) / 1e6, 3) if root else None,
+        "dropped_spans": trace.dropped,
+        "spans": [span.to_dict() for span in sorted(spans, key=lambda span: span.start_ns)]
+    }
+
+class MemoryExporter:
+    """Keeps the most recent traces for GET /debug/traces"""
+
+    def __init__(self, max_traces: int = 100):
+        """Initialize the ring buffer"""
+        self._traces: deque = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace, spans: Sequence[Span]) -> None:
+        entry = trace_to_dict(trace, spans)
+        with self._lock:
+            self._traces.append(entry)
+
+    def recent(self, limit: int = 20, name: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            traces = list(self._traces)
+        if name:
+            traces = [trace for trace in traces if trace["root"] and name in trace["root"]]
+        return traces[-limit:][::-1]
+
+class _FileExporter:
+    """Appends one JSON document per line"""
+
+    def __init__(self, path: str):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+
+    def _write(self, document: Dict[str, Any]) -> None:
+        line = json.dumps(document, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+class JSONFileExporter(_FileExporter):
+    """Writes traces in the plain layout used by /debug/traces"""
+
+    def export(self, trace: Trace, spans: Sequence[Span]) -> None:
+        self._write(trace_to_dict(trace, spans))
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+class OTLPFileExporter(_FileExporter):
+    """Writes OTLP/JSON ExportTraceServiceRequest lines, as the collector's file exporter does"""
+
+    def __init__(self, path: str, service_name: str = "celosoul-ai-agent"):
+        super().__init__(path)
+        self.service_name = service_name
+
+    def export(self, trace: Trace, spans: Sequence[Span]) -> None:
+        otlp_spans = []
+        for span in spans:
+            otlp_span = {
+                "traceId": trace.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                # SERVER for request roots, INTERNAL for stages
+                "kind": 2 if span.parent_id is None else 1,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.end_ns),
+                "attributes": [{"key": key, "value": _otlp_value(value)} for key, value in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+            }
+            if span.parent_id:
+                otlp_span["parentSpanId"] = span.parent_id
+            if span.parent_id is None and trace.dropped:
+                otlp_span["attributes"].append({"key": "celosoul.dropped_spans", "value": _otlp_value(trace.dropped)})
+            otlp_spans.append(otlp_span)
+
+        self._write({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{"scope": {"name": "celosoul.tracing"}, "spans": otlp_spans}]
+            }]
+        })
+
+# Process-wide tracer; main.py configures sampling and exporters from Config
+TRACER = Tracer()
+
+class TracingMiddleware:
+    """ASGI middleware opening a root span per HTTP request"""
+
+    def __init__(
+        self,
+        app,
+        tracer: Tracer = TRACER,
+        force_header: bytes = b"x-trace-sample",
+        admin_token: Optional[str] = None
+    ):
+        """Wrap an ASGI app; admin requests with the force header set to 1 are always traced"""
+        self.app = app
+        self.tracer = tracer
+        self.force_header = force_header
+        self.admin_token = admin_token
+
+    def _forced(self, headers) -> bool:
+        # Anyone else could bypass the sample rate and flush real traces out of the buffer
+        if not any(name == self.force_header and value == b"1" for name, value in headers):
+            return False
+        return is_admin({name.decode("latin-1"): value.decode("latin-1") for name, value in headers}, self.admin_token)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        force = self._forced(scope.get("headers", ()))
+        with self.tracer.span(f"HTTP {scope['method']}", force=force, **{"http.method": scope["method"]}) as span:
+            if not span.sampled:
+                await self.app(scope, receive, send)
+                return
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    span.set("http.status_code", message["status"])
+                    message = dict(message)
+                    message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", span.trace_id.encode())]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                route = scope.get("route")
+                route_label = getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched"
+                span.name = f"HTTP {scope['method']} {route_label}"
+                span.set("http.route", route_label)
@@ -0,0 +1,232 @@
+"""
+Opt-in capture of sanitized API traffic for replay (see traffic_replay.py)
+"""
+from typing import List, Dict, Any, Optional, Iterator, Sequence
+from urllib.parse import parse_qsl
+import gzip
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+# Free text and identifying fields; values are replaced by filler of the same shape
+SENSITIVE_KEYS = {
+    "name", "bio", "message", "content", "location", "photos", "email",
+    "wallet_address", "phone", "deal_breakers", "must_haves"
+}
+FILLER_WORDS = [
+    "lorem", "ipsum", "dolor", "sit", "amet", "music", "coffee", "travel", "code", "weekend",
+    "sunset", "laugh", "story", "city", "trail", "chain", "build", "friend", "dance", "book"
+]
+# Responses whose ids later requests refer to; replay maps recorded ids to new ones
+CREATING_ROUTES = {
+    ("POST", "/users"): "user_id",
+    ("POST", "/conversations"): "conversation_id"
+}
+DEFAULT_EXCLUDED_PREFIXES = ("/metrics", "/debug", "/health", "/ready", "/docs", "/openapi.json")
+
+def _header(scope, name: bytes) -> Optional[str]:
+    return next((value.decode("latin-1") for key, value in scope.get("headers", ()) if key == name), None)
+
+def hash_idempotency_key(key: str) -> str:
+    """Stable stand-in for a client's Idempotency-Key; retries share it, the raw key is never stored"""
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+def _filler(text: str) -> str:
+    """Deterministic pseudo-words with the same length and word count as text"""
+    rng = random.Random(hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest())
+    words = []
+    for word in text.split(" "):
+        filler = rng.choice(FILLER_WORDS)
+        words.append((filler * (len(word) // len(filler) + 1))[:len(word)])
+    return " ".join(words)
+
+def sanitize(value: Any, sensitive: bool = False) -> Any:
+    """Replace free text under sensitive keys, keeping lengths, list sizes and enum-like values"""
+    if isinstance(value, dict):
+        return {key: sanitize(item, sensitive or key in SENSITIVE_KEYS) for key, item in value.items()}
+    if isinstance(value, list):
+        return [sanitize(item, sensitive) for item in value]
+    if sensitive and isinstance(value, str):
+        return _filler(value)
+    return value
+
+def sanitize_query(query_string: bytes) -> List[List[str]]:
+    return [
+        [key, _filler(value) if key in SENSITIVE_KEYS else value]
+        for key, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    ]
+
+class TrafficLogWriter:
+    """Appends records to a gzip NDJSON file from a background thread"""
+
+    def __init__(self, path: str, flush_interval: float = 1.0):
+        """Initialize the writer; "{pid}" in the path gives each worker process its own file"""
+        self.path_template = path
+        self.path: Optional[str] = None
+        self.flush_interval = flush_interval
+        self.written = 0
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+        self._queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+
+    def _start(self) -> None:
+        # Opened on first write, in the process that serves requests: a
+        # pre-fork master creates the writer but its thread would not survive fork
+        self.path = self.path_template.replace("{pid}", str(os.getpid()))
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._queue = queue.SimpleQueue()
+        # Appending starts a new gzip member; readers see one continuous stream
+        file = gzip.open(self.path, "at", encoding="utf-8", compresslevel=6)
+        self._thread = threading.Thread(target=self._run, args=(file, self._queue), name="traffic-recorder", daemon=True)
+        self._thread.start()
+        self._pid = os.getpid()
+
+    def write(self, record: Dict[str, Any]) -> None:
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._start()
+        self._queue.put(record)
+
+    def _run(self, file, records: "queue.SimpleQueue[Optional[Dict[str, Any]]]") -> None:
+        dirty = False
+        while True:
+            try:
+                record = records.get(timeout=self.flush_interval)
+            except queue.Empty:
+                if dirty:
+                    # Sync flush so a crash loses at most the last interval
+                    file.flush()
+                    dirty = False
+                continue
+            if record is None:
+                break
+            try:
+                file.write(json.dumps(record, separators=(",", ":"), default=str) + "\n")
+                self.written += 1
+                dirty = True
+            except Exception as e:
+                print(f"Traffic record write failed: {e}")
+        file.close()
+
+    def close(self) -> None:
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+def read_traffic(path: str) -> Iterator[Dict[str, Any]]:
+    """Yield records from a traffic log, skipping a torn last line"""
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        try:
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        continue
+        except EOFError:
+            # The recorder was killed mid-member; everything before it is intact
+            return
+
+class TrafficRecorderMiddleware:
+    """ASGI middleware recording sanitized requests with their status and latency"""
+
+    def __init__(
+        self,
+        app,
+        writer: TrafficLogWriter,
+        sample_rate: float = 1.0,
+        max_body_bytes: int = 1 << 20,
+        excluded_prefixes: Sequence[str] = DEFAULT_EXCLUDED_PREFIXES
+    ):
+        """Wrap an ASGI app"""
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.max_body_bytes = max_body_bytes
+        self.excluded_prefixes = tuple(excluded_prefixes)
+        self._random = random.Random()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"].startswith(self.excluded_prefixes)
+            or (self.sample_rate < 1 and self._random.random() >= self.sample_rate)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        chunks: List[bytes] = []
+        body_size = 0
+        response: Dict[str, Any] = {"status": 500, "body": []}
+        creates = CREATING_ROUTES.get((scope["method"], scope["path"]))
+
+        async def receive_wrapper():
+            nonlocal body_size
+            message = await receive()
+            if message["type"] == "http.request":
+                data = message.get("body", b"")
+                body_size += len(data)
+                if body_size <= self.max_body_bytes:
+                    chunks.append(data)
+            return message
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+            elif message["type"] == "http.response.body" and creates:
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        started_at = time.time()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            duration = time.perf_counter() - started
+            route = scope.get("route")
+            record = {
+                "t": round(started_at, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "route": getattr(route, "path_format", None) or getattr(route, "path", None) or "unmatched",
+                "query": sanitize_query(scope.get("query_string", b"")),
+                "status": response["status"],
+                "duration_ms": round(duration * 1e3, 3),
+                "body_bytes": body_size
+            }
+            record.update(self._body(scope, chunks, body_size))
+            idempotency_key = _header(scope, b"idempotency-key")
+            if idempotency_key:
+                # Replay resends it so client retries take the cheap replay path again
+                record["idempotency_key"] = hash_idempotency_key(idempotency_key)
+            if creates and response["status"] < 400:
+                record["created"] = self._created_id(b"".join(response["body"]), creates)
+            self.writer.write(record)
+
+    def _body(self, scope, chunks: List[bytes], body_size: int) -> Dict[str, Any]:
+        if not body_size:
+            return {}
+        if body_size > self.max_body_bytes:
+            return {"body_omitted": "too_large"}
+        content_type = _header(scope, b"content-type") or ""
+        if "json" not in content_type or "ndjson" in content_type:
+            return {"body_omitted": content_type or "unknown"}
+        try:
+            return {"body": sanitize(json.loads(b"".join(chunks)))}
+        except ValueError:
+            return {"body_omitted": "invalid_json"}
+
+    def _created_id(self, body: bytes, field: str) -> Optional[str]:
+        try:
+            return json.loads(body)["data"][field]
+        except (ValueError, KeyError, TypeError):
+            return None
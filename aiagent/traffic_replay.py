@@ -0,0 +1,271 @@
+"""
+Replay a recorded traffic log against a build and compare latency distributions
+"""
+from typing import List, Dict, Any, Iterator
+from datetime import datetime
+import argparse
+import asyncio
+import json
+import sys
+import time
+import uuid
+
+from matching_benchmark import percentile
+from traffic_recorder import read_traffic, CREATING_ROUTES
+
+def latency_summary(durations_ms: List[float]) -> Dict[str, Any]:
+    durations = sorted(durations_ms)
+    return {
+        "requests": len(durations),
+        "p50_ms": round(percentile(durations, 0.50), 2),
+        "p90_ms": round(percentile(durations, 0.90), 2),
+        "p99_ms": round(percentile(durations, 0.99), 2),
+        "max_ms": round(durations[-1], 2) if durations else None
+    }
+
+class TrafficReplayer:
+    """Reissues recorded requests at their original (or scaled) pacing"""
+
+    def __init__(self, client, records: List[Dict[str, Any]], speed: float = 1.0, concurrency: int = 256):
+        """Initialize the replayer; speed 2 halves every gap, speed 0 sends as fast as possible"""
+        self.client = client
+        # Bodies that were not captured (NDJSON uploads, oversized JSON) cannot be replayed
+        self.skipped = sum(1 for record in records if "body_omitted" in record)
+        self.records = sorted((record for record in records if "body_omitted" not in record), key=lambda record: record["t"])
+        self.speed = speed
+        self.semaphore = asyncio.Semaphore(concurrency)
+        # Recorded id -> id created by this replay, resolved as creations finish
+        self.ids: Dict[str, asyncio.Future] = {}
+        self.results: List[Dict[str, Any]] = []
+        self.lag_ms: List[float] = []
+        # Recorded retries share a key within this run but not with earlier runs against the same server
+        self.key_prefix = uuid.uuid4().hex[:8]
+
+    def _resolve(self, value: str) -> str:
+        future = self.ids.get(value)
+        if future is None or not future.done():
+            return value
+        return future.result() or value
+
+    def _remap(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return {key: self._remap(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self._remap(item) for item in value]
+        if isinstance(value, str):
+            return self._resolve(value)
+        return value
+
+    def _strings(self, value: Any) -> Iterator[str]:
+        if isinstance(value, dict):
+            for item in value.values():
+                yield from self._strings(item)
+        elif isinstance(value, list):
+            for item in value:
+                yield from self._strings(item)
+        elif isinstance(value, str):
+            yield value
+
+    async def _dependencies(self, record: Dict[str, Any]) -> None:
+        """Wait until every recorded id this request mentions has been created by the replay"""
+        mentioned = self._strings([record["path"].split("/"), record.get("query"), record.get("body")])
+        pending = {self.ids[value] for value in mentioned if value in self.ids and not self.ids[value].done()}
+        if pending:
+            await asyncio.wait(pending)
+
+    async def _send(self, record: Dict[str, Any]) -> None:
+        async with self.semaphore:
+            await self._dependencies(record)
+            path = "/".join(self._resolve(segment) for segment in record["path"].split("/"))
+
+            request: Dict[str, Any] = {"params": self._remap(record.get("query") or [])}
+            if "body" in record:
+                request["json"] = self._remap(record["body"])
+            if record.get("idempotency_key"):
+                request["headers"] = {"Idempotency-Key": f"{self.key_prefix}-{record['idempotency_key']}"}
+
+            started = time.perf_counter()
+            status = 0
+            created = None
+            try:
+                response = await self.client.request(record["method"], path, **request)
+                status = response.status_code
+                if record.get("created") and status < 400:
+                    field = CREATING_ROUTES[(record["method"], record["route"])]
+                    created = response.json()["data"][field]
+            except Exception as e:
+                print(f"Replay of {record['method']} {record['route']} failed: {e}")
+            finally:
+                elapsed_ms = (time.perf_counter() - started) * 1e3
+                future = self.ids.get(record.get("created") or "")
+                if future is not None and not future.done():
+                    future.set_result(created)
+
+            self.results.append({
+                "route": f"{record['method']} {record['route']}",
+                "status": status,
+                "duration_ms": elapsed_ms,
+                "recorded_ms": record["duration_ms"],
+                "recorded_status": record["status"]
+            })
+
+    async def run(self) -> float:
+        """Replay every record; returns the wall-clock seconds taken"""
+
+        loop = asyncio.get_running_loop()
+        for record in self.records:
+            if record.get("created"):
+                self.ids[record["created"]] = loop.create_future()
+
+        origin = self.records[0]["t"] if self.records else 0.0
+        started = time.perf_counter()
+        tasks = []
+        for record in self.records:
+            if self.speed > 0:
+                due = (record["t"] - origin) / self.speed
+                delay = due - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                # How far behind schedule the replay issued this request
+                self.lag_ms.append(max(0.0, -delay) * 1e3)
+            tasks.append(asyncio.ensure_future(self._send(record)))
+        await asyncio.gather(*tasks)
+        for future in self.ids.values():
+            if not future.done():
+                future.set_result(None)
+        return time.perf_counter() - started
+
+    def report(self, seconds: float) -> Dict[str, Any]:
+        routes: Dict[str, Dict[str, List[Any]]] = {}
+        for result in self.results:
+            entry = routes.setdefault(result["route"], {"replayed": [], "recorded": [], "errors": [], "mismatched": []})
+            entry["replayed"].append(result["duration_ms"])
+            entry["recorded"].append(result["recorded_ms"])
+            entry["errors"].append(result["status"] == 0 or result["status"] >= 500)
+            # Same request, different outcome: usually state missing from the target
+            entry["mismatched"].append(result["status"] != result["recorded_status"])
+
+        return {
+            "benchmark": "replay",
+            "created_at": datetime.now().isoformat(),
+            "speed": self.speed,
+            "seconds": round(seconds, 3),
+            "requests": len(self.results),
+            "skipped": self.skipped,
+            "schedule_lag_p99_ms": round(percentile(sorted(self.lag_ms), 0.99), 2),
+            "routes": {
+                route: {
+                    "replayed": latency_summary(entry["replayed"]),
+                    "recorded": latency_summary(entry["recorded"]),
+                    "errors": sum(entry["errors"]),
+                    "status_mismatches": sum(entry["mismatched"])
+                }
+                for route, entry in sorted(routes.items())
+            }
+        }
+
+def compare_routes(
+    baseline: Dict[str, Dict[str, Any]],
+    current: Dict[str, Dict[str, Any]],
+    tolerance: float = 0.1,
+    min_delta_ms: float = 5.0
+) -> List[Dict[str, Any]]:
+    """Per-route p50/p99 change between two latency summaries; regressions are flagged"""
+
+    rows = []
+    for route in sorted(set(baseline) & set(current)):
+        before, after = baseline[route], current[route]
+        row: Dict[str, Any] = {"route": route}
+        for metric in ("p50_ms", "p99_ms"):
+            old, new = before.get(metric), after.get(metric)
+            change = (new - old) / old if old else None
+            row[metric] = {"before": old, "after": new, "change": round(change, 3) if change is not None else None}
+        # Relative and absolute: a 1 ms route jittering by 0.3 ms is not a regression
+        row["regressed"] = any(
+            row[metric]["change"] is not None
+            and row[metric]["change"] > tolerance
+            and row[metric]["after"] - row[metric]["before"] > min_delta_ms
+            for metric in ("p50_ms", "p99_ms")
+        )
+        rows.append(row)
+    return rows
+
+def main():
+    """Replay a traffic log from the command line"""
+    parser = argparse.ArgumentParser(description="Replay recorded CeloSoul API traffic")
+    parser.add_argument("log", help="Traffic log written by the recorder (.ndjson.gz)")
+    parser.add_argument("--url", help="Base URL of a running server; default replays in-process with a stub LLM")
+    parser.add_argument("--speed", type=float, default=1.0, help="Pacing multiplier; 0 sends as fast as possible")
+    parser.add_argument("--concurrency", type=int, default=256, help="Cap on requests in flight")
+    parser.add_argument("--limit", type=int, help="Replay only the first N records")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Stub LLM latency for in-process replay")
+    parser.add_argument("--baseline", help="Replay report of another build to diff against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Allowed relative slowdown")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="Ignore slowdowns smaller than this")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable output")
+    parser.add_argument("--output", help="Also write the JSON report to this file")
+    args = parser.parse_args()
+
+    records = list(read_traffic(args.log))
+    if args.limit:
+        records = sorted(records, key=lambda record: record["t"])[:args.limit]
+    if not records:
+        print("❌ No records in the traffic log")
+        sys.exit(1)
+
+    async def replay() -> Dict[str, Any]:
+        import httpx
+
+        if args.url:
+            async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+                replayer = TrafficReplayer(client, records, args.speed, args.concurrency)
+                return replayer.report(await replayer.run())
+
+        from load_test import load_app, StubLLMClient
+        app_module, _ = load_app(client=StubLLMClient(args.llm_latency))
+        async with app_module.app.router.lifespan_context(app_module.app):
+            transport = httpx.ASGITransport(app=app_module.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://replay", timeout=None) as client:
+                replayer = TrafficReplayer(client, records, args.speed, args.concurrency)
+                return replayer.report(await replayer.run())
+
+    report = asyncio.run(replay())
+    routes = report["routes"]
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = {route: entry["replayed"] for route, entry in json.load(f)["routes"].items()}
+        report["comparison"] = {"against": args.baseline, "rows": compare_routes(
+            baseline, {route: entry["replayed"] for route, entry in routes.items()}, args.tolerance, args.min_delta_ms
+        )}
+    else:
+        report["comparison"] = {"against": "recorded", "rows": compare_routes(
+            {route: entry["recorded"] for route, entry in routes.items()},
+            {route: entry["replayed"] for route, entry in routes.items()},
+            args.tolerance,
+            args.min_delta_ms
+        )}
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+    regressed = [row for row in report["comparison"]["rows"] if row["regressed"]]
+    if args.json:
+        print(json.dumps(report))
+    else:
+        print(f"🔁 Replayed {report['requests']} requests in {report['seconds']}s at {args.speed}x "
+              f"(schedule lag p99 {report['schedule_lag_p99_ms']} ms), compared with {report['comparison']['against']}")
+        for row in report["comparison"]["rows"]:
+            entry = routes[row["route"]]
+            marker = "❌" if row["regressed"] else "  "
+            p50, p99 = row["p50_ms"], row["p99_ms"]
+            print(f" {marker} {row['route']:<45} n={entry['replayed']['requests']:<6} "
+                  f"p50 {p50['before']} -> {p50['after']} ms  p99 {p99['before']} -> {p99['after']} ms  "
+                  f"errors {entry['errors']}  status mismatches {entry['status_mismatches']}")
+
+    # Only a build-to-build diff is a meaningful gate; recorded timings came from other hardware
+    if args.baseline and regressed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""
+Offline trainer for the local tone classifier
+"""
+from typing import List, Tuple
+import argparse
+import json
+import os
+from datetime import datetime
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from tone_classifier import FEATURE_NAMES, MODEL_FORMAT_VERSION, extract_features
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+def load_examples(path: str) -> Tuple[List[List[str]], List[str]]:
+    """Read JSONL rows of {"text": ..., "tone": ...}; newlines separate messages"""
+    windows, labels = [], []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                row = json.loads(line)
+                windows.append(row["text"].split("\n"))
+                labels.append(row["tone"])
+            except (json.JSONDecodeError, KeyError) as e:
+                print(f"Skipping line {line_number}: {e}")
+    return windows, labels
+
+def train(data_path: str, output_path: str, regularization: float = 5.0) -> dict:
+    """Fit the model, report cross-validated accuracy and write the weights as JSON"""
+
+    windows, labels = load_examples(data_path)
+    features = np.vstack([extract_features(window) for window in windows])
+    targets = np.asarray(labels)
+
+    model = LogisticRegression(C=regularization, max_iter=2000)
+    folds = min(5, int(np.bincount(np.unique(targets, return_inverse=True)[1]).min()))
+    cv_accuracy = None
+    if folds >= 2:
+        scores = cross_val_score(
+            model, features, targets,
+            cv=StratifiedKFold(n_splits=folds, shuffle=True, random_state=0)
+        )
+        cv_accuracy = round(float(scores.mean()), 4)
+
+    model.fit(features, targets)
+
+    artifact = {
+        "version": MODEL_FORMAT_VERSION,
+        "classes": [str(label) for label in model.classes_],
+        "feature_names": list(FEATURE_NAMES),
+        "coef": model.coef_.round(6).tolist(),
+        "intercept": model.intercept_.round(6).tolist(),
+        "samples": len(labels),
+        "cv_accuracy": cv_accuracy,
+        "train_accuracy": round(float(model.score(features, targets)), 4),
+        "trained_at": datetime.now().isoformat(timespec="seconds")
+    }
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, indent=2)
+        f.write("\n")
+
+    return artifact
+
+def main():
+    """Train the tone classifier from the command line"""
+    parser = argparse.ArgumentParser(description="Train the CeloSoul local tone classifier")
+    parser.add_argument("--data", default=os.path.join(HERE, "tone_training_data.jsonl"))
+    parser.add_argument("--output", default=os.path.join(HERE, "tone_model.json"))
+    parser.add_argument("--C", type=float, default=5.0, help="Inverse regularization strength")
+    args = parser.parse_args()
+
+    artifact = train(args.data, args.output, args.C)
+    print(f"✅ Trained on {artifact['samples']} examples ({', '.join(artifact['classes'])})")
+    print(f"   Cross-validated accuracy: {artifact['cv_accuracy']}")
+    print(f"   Model written to {args.output}")
+
+if __name__ == "__main__":
+    main()